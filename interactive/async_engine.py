@@ -0,0 +1,226 @@
+"""
+Asyncio Query Engine
+====================
+Purpose: Keep thousands of queries in flight from one process with a handful
+of threads
+
+The thread-per-query model needs one blocked thread (and usually one session)
+per in-flight query. AsyncQueryEngine instead submits each query with
+cursor.execute_async(), which returns as soon as Snowflake has accepted it,
+and polls conn.get_query_status_throw_if_error() / is_still_running() until it
+finishes, then fetches the rows with get_results_from_sfqid(). Every query is a
+coroutine; the blocking connector calls run on a small thread pool, and
+queries are spread round-robin over a few sessions (one session runs many
+async queries at once).
+
+Status checks for all outstanding queries come from one poller loop, which
+sleeps until the next query is due instead of every query running its own
+sleep loop. Each query's check interval starts at a few ms and grows by half
+after every check that finds it still running (capped at max_poll_interval),
+so short lookups are seen quickly and long queries stop costing round trips.
+
+Latency is measured up to the poll that sees the query finished, so it is
+quantised by the poll interval and includes one status round trip.
+
+No third-party imports.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class AsyncOutcome:
+    sfqid: Optional[str]
+    rows: List[tuple] = field(default_factory=list)
+    submitted_at: float = None  # epoch seconds, once an in-flight slot was free
+    finished_at: float = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _Waiter:
+    """One submitted query the poller is watching"""
+    conn: object
+    sfqid: str
+    done: asyncio.Future
+    interval: float
+
+
+# (sql, params, not_before[, warehouse]): not_before is an epoch time to wait
+# for before submitting (open loop), warehouse one to submit the query on
+Statement = Tuple
+
+
+class AsyncQueryEngine:
+    def __init__(
+        self,
+        connections: Sequence,
+        max_in_flight: int = 1000,
+        io_threads: int = 8,
+        poll_interval: float = 0.005,
+        max_poll_interval: float = 0.1,
+        fetch: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not connections:
+            raise ValueError("AsyncQueryEngine needs at least one connection")
+        self.connections = list(connections)
+        self.max_in_flight = max_in_flight
+        self.io_threads = io_threads
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.fetch = fetch
+        self.clock = clock
+        self._next_connection = itertools.cycle(self.connections)
+        self._executor = None
+        self._slots = None
+        self._submit_locks: Dict[int, asyncio.Lock] = {}
+        self._due: List[Tuple[float, int, _Waiter]] = []  # heap of (next check, order, query)
+        self._order = itertools.count()
+        self._checks = set()
+        self._wakeup = None
+
+    # Blocking connector calls, run on the I/O threads
+
+    @staticmethod
+    def _submit(conn, sql: str, params: Optional[tuple], warehouse: Optional[str]) -> str:
+        cursor = conn.cursor()
+        try:
+            if warehouse:
+                # Async queries keep the warehouse that was current when they were submitted
+                cursor.execute(f"USE WAREHOUSE {warehouse}")
+            cursor.execute_async(sql, params)
+            return cursor.sfqid
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _finished(conn, sfqid: str) -> bool:
+        """True once the query finished; raises if it failed"""
+        status = conn.get_query_status_throw_if_error(sfqid)
+        return not conn.is_still_running(status)
+
+    @staticmethod
+    def _results(conn, sfqid: str) -> List[tuple]:
+        cursor = conn.cursor()
+        try:
+            cursor.get_results_from_sfqid(sfqid)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    # Status polling: one loop for every outstanding query
+
+    def _schedule(self, waiter: _Waiter) -> None:
+        due = asyncio.get_running_loop().time() + waiter.interval
+        heapq.heappush(self._due, (due, next(self._order), waiter))
+        self._wakeup.set()
+
+    async def _wait_finished(self, conn, sfqid: str) -> None:
+        """Hand the query to the poller; returns once it finished, raises if it failed"""
+        waiter = _Waiter(conn, sfqid, asyncio.get_running_loop().create_future(), self.poll_interval)
+        self._schedule(waiter)
+        await waiter.done
+
+    async def _check(self, waiter: _Waiter) -> None:
+        try:
+            finished = await self._call(self._finished, waiter.conn, waiter.sfqid)
+        except Exception as e:
+            if not waiter.done.cancelled():
+                waiter.done.set_exception(e)
+            return
+        if waiter.done.cancelled():
+            return
+        if finished:
+            waiter.done.set_result(None)
+        else:
+            waiter.interval = min(waiter.interval * 1.5, self.max_poll_interval)
+            self._schedule(waiter)
+
+    async def _poll(self) -> None:
+        """Start the status check of every query that is due, then sleep until the next one is"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            while self._due and self._due[0][0] <= now:
+                _, _, waiter = heapq.heappop(self._due)
+                check = loop.create_task(self._check(waiter))
+                self._checks.add(check)
+                check.add_done_callback(self._checks.discard)
+            timeout = self._due[0][0] - now if self._due else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def execute(
+        self, sql: str, params: Optional[tuple] = None, not_before: Optional[float] = None,
+        warehouse: Optional[str] = None,
+    ) -> AsyncOutcome:
+        """
+        Submit one query (after `not_before`, once fewer than max_in_flight are
+        running) and wait for it to finish. With `warehouse`, the session is
+        switched to it just before submission. Errors are returned, not raised.
+        """
+        if not_before is not None:
+            delay = not_before - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with self._slots:
+            conn = next(self._next_connection)
+            outcome = AsyncOutcome(sfqid=None, submitted_at=self.clock())
+            try:
+                if warehouse:
+                    # USE WAREHOUSE + submit must not interleave with another submission on the session
+                    async with self._submit_locks.setdefault(id(conn), asyncio.Lock()):
+                        outcome.sfqid = await self._call(self._submit, conn, sql, params, warehouse)
+                else:
+                    outcome.sfqid = await self._call(self._submit, conn, sql, params, None)
+                await self._wait_finished(conn, outcome.sfqid)
+                outcome.finished_at = self.clock()
+                if self.fetch:
+                    outcome.rows = await self._call(self._results, conn, outcome.sfqid)
+            except Exception as e:
+                outcome.finished_at = self.clock()
+                outcome.error = str(e)
+            return outcome
+
+    async def run_async(
+        self, statements: Iterable[Statement], on_done: Callable[[AsyncOutcome], None] = None
+    ) -> List[AsyncOutcome]:
+        """Run every statement concurrently; outcomes come back in statement order"""
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._submit_locks = {}
+        self._due = []
+        self._wakeup = asyncio.Event()
+        with ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="async-query") as executor:
+            self._executor = executor
+
+            async def tracked(sql, params=None, not_before=None, warehouse=None):
+                outcome = await self.execute(sql, params, not_before, warehouse)
+                if on_done:
+                    on_done(outcome)
+                return outcome
+
+            poller = asyncio.get_running_loop().create_task(self._poll())
+            try:
+                return await asyncio.gather(*(tracked(*statement) for statement in statements))
+            finally:
+                poller.cancel()
+                self._executor = None
+
+    def run(
+        self, statements: Iterable[Statement], on_done: Callable[[AsyncOutcome], None] = None
+    ) -> List[AsyncOutcome]:
+        """Blocking wrapper around run_async() for callers without an event loop"""
+        return asyncio.run(self.run_async(statements, on_done))
@@ -0,0 +1 @@
+../pipeline/connections.py
\ No newline at end of file
@@ -0,0 +1 @@
+../pipeline/dt_refresh.py
\ No newline at end of file
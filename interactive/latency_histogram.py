@@ -0,0 +1,229 @@
+"""
+Latency Histograms for Load Tests
+=================================
+Purpose: Percentiles that stay correct for small samples and can be merged
+
+LatencyHistogram is an HDR-style histogram: latencies are recorded in
+microseconds into log-linear buckets (2048 sub-buckets per power of two, so
+any value is reported within ~0.1%). Buckets are kept sparse, so histograms
+from different threads, processes or saved runs merge by adding counts.
+Percentiles use the nearest-rank definition (the smallest value with at least
+q% of samples at or below it) instead of indexing int(len * q).
+
+LatencyRecorder keeps one histogram overall, one per query type and one per
+time window, and exports them as JSON (reloadable, mergeable) or CSV.
+compare_runs() lines up two saved runs, e.g. standard vs interactive.
+
+No third-party imports.
+"""
+
+import csv
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PERCENTILES: List[Tuple[str, float]] = [
+    ("p50", 50.0),
+    ("p90", 90.0),
+    ("p95", 95.0),
+    ("p99", 99.0),
+    ("p99.9", 99.9),
+]
+
+SUB_BUCKET_BITS = 11
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    @staticmethod
+    def _bucket(value_ms: float) -> int:
+        micros = max(0, int(round(value_ms * 1000)))
+        shift = max(0, micros.bit_length() - SUB_BUCKET_BITS)
+        return shift * SUB_BUCKET_COUNT + (micros >> shift)
+
+    @staticmethod
+    def _bucket_upper_ms(bucket: int) -> float:
+        """Highest value (ms) that lands in `bucket`"""
+        shift, sub_bucket = divmod(bucket, SUB_BUCKET_COUNT)
+        return (((sub_bucket + 1) << shift) - 1) / 1000
+
+    def record(self, value_ms: float, count: int = 1):
+        bucket = self._bucket(value_ms)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += count
+        self.total_ms += value_ms * count
+        self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+        self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        if other.count:
+            self.min_ms = other.min_ms if self.min_ms is None else min(self.min_ms, other.min_ms)
+            self.max_ms = other.max_ms if self.max_ms is None else max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile in ms (None when empty), clamped to the recorded min/max"""
+        if not self.count:
+            return None
+        # Rounded first: 99.9 / 100 * 1000 is 999.0000000000001 in floating point
+        rank = max(1, math.ceil(round(q * self.count / 100, 9)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(max(self._bucket_upper_ms(bucket), self.min_ms), self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> Optional[float]:
+        return self.total_ms / self.count if self.count else None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        result = {"count": self.count, "min": self.min_ms, "mean": self.mean_ms}
+        for name, q in PERCENTILES:
+            result[name] = self.percentile(q)
+        result["max"] = self.max_ms
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "counts": {str(bucket): count for bucket, count in sorted(self.counts.items())},
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(bucket): count for bucket, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total_ms = data["total_ms"]
+        histogram.min_ms = data["min_ms"]
+        histogram.max_ms = data["max_ms"]
+        return histogram
+
+
+class LatencyRecorder:
+    """Histograms overall, per query type and per `window_s`-second window since `started_at`"""
+
+    def __init__(self, window_s: float = 10.0, started_at: Optional[float] = None):
+        self.window_s = window_s
+        self.started_at = started_at
+        self.overall = LatencyHistogram()
+        self.by_type: Dict[str, LatencyHistogram] = {}
+        self.by_window: Dict[int, LatencyHistogram] = {}
+
+    def record(self, query_type: str, latency_ms: float, at: Optional[float] = None):
+        self.overall.record(latency_ms)
+        self.by_type.setdefault(query_type, LatencyHistogram()).record(latency_ms)
+        if at is not None:
+            if self.started_at is None:
+                self.started_at = at
+            window = max(0, int((at - self.started_at) // self.window_s))
+            self.by_window.setdefault(window, LatencyHistogram()).record(latency_ms)
+
+    def merge(self, other: "LatencyRecorder") -> "LatencyRecorder":
+        """Add another recorder's samples (windows are aligned on each recorder's own start)"""
+        self.overall.merge(other.overall)
+        for query_type, histogram in other.by_type.items():
+            self.by_type.setdefault(query_type, LatencyHistogram()).merge(histogram)
+        for window, histogram in other.by_window.items():
+            self.by_window.setdefault(window, LatencyHistogram()).merge(histogram)
+        if self.started_at is None:
+            self.started_at = other.started_at
+        return self
+
+    def rows(self) -> Iterable[Tuple[str, str, Dict[str, Optional[float]]]]:
+        """(scope, key, summary) for overall, each query type and each window"""
+        yield "overall", "all", self.overall.summary()
+        for query_type in sorted(self.by_type):
+            yield "query_type", query_type, self.by_type[query_type].summary()
+        for window in sorted(self.by_window):
+            start = window * self.window_s
+            yield "window", f"{start:g}-{start + self.window_s:g}s", self.by_window[window].summary()
+
+    def to_dict(self) -> Dict:
+        return {
+            "window_s": self.window_s,
+            "started_at": self.started_at,
+            "overall": self.overall.to_dict(),
+            "by_type": {query_type: h.to_dict() for query_type, h in self.by_type.items()},
+            "by_window": {str(window): h.to_dict() for window, h in self.by_window.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyRecorder":
+        recorder = cls(data["window_s"], data.get("started_at"))
+        recorder.overall = LatencyHistogram.from_dict(data["overall"])
+        recorder.by_type = {query_type: LatencyHistogram.from_dict(h) for query_type, h in data["by_type"].items()}
+        recorder.by_window = {int(window): LatencyHistogram.from_dict(h) for window, h in data["by_window"].items()}
+        return recorder
+
+
+CSV_COLUMNS = ["label", "scope", "key", "count", "min", "mean"] + [name for name, _ in PERCENTILES] + ["max"]
+
+
+def write_csv(path: str, recorders: List[Tuple[str, LatencyRecorder]]):
+    """One row per (recorder label, scope, key) with count, mean and percentiles in ms"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for label, recorder in recorders:
+            for scope, key, summary in recorder.rows():
+                writer.writerow([label, scope, key] + [
+                    "" if summary[column] is None else round(summary[column], 3)
+                    for column in CSV_COLUMNS[3:]
+                ])
+
+
+def save_run(path: str, run: Dict):
+    """Save a load-test run: metadata plus {"recorders": {label: LatencyRecorder}}"""
+    data = dict(run)
+    data["recorders"] = {label: recorder.to_dict() for label, recorder in run["recorders"].items()}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_run(path: str) -> Dict:
+    with open(path) as f:
+        data = json.load(f)
+    data["recorders"] = {label: LatencyRecorder.from_dict(r) for label, r in data["recorders"].items()}
+    return data
+
+
+def compare_runs(baseline: Dict, candidate: Dict) -> List[Dict]:
+    """
+    Per recorder label and query type present in both runs: baseline vs.
+    candidate p50/p95/p99/max and the candidate/baseline ratio for each.
+    """
+    report = []
+    for label, base_recorder in baseline["recorders"].items():
+        cand_recorder = candidate["recorders"].get(label)
+        if cand_recorder is None:
+            continue
+        pairs = [("all", base_recorder.overall, cand_recorder.overall)]
+        pairs += [
+            (query_type, histogram, cand_recorder.by_type[query_type])
+            for query_type, histogram in sorted(base_recorder.by_type.items())
+            if query_type in cand_recorder.by_type
+        ]
+        for key, base, cand in pairs:
+            entry = {"label": label, "query_type": key, "baseline_count": base.count, "candidate_count": cand.count}
+            for name in ("p50", "p95", "p99", "max"):
+                b, c = base.summary()[name], cand.summary()[name]
+                entry[name] = (b, c, c / b if b and c is not None else None)
+            report.append(entry)
+    return report
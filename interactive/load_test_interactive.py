@@ -7,247 +7,88 @@ This script simulates 50-100 concurrent users querying the system to show:
 1. Standard warehouse: queuing, variable latency, P95 spikes
 2. Interactive warehouse: consistent sub-100ms, no queuing
 
+Closed loop (default): a fixed thread pool runs a fixed query list as fast as
+it can. Open loop (--mode open): queries arrive at a target rate (Poisson or
+constant inter-arrival times) whether or not earlier ones have finished, and
+latency is measured from each query's intended send time, so time spent
+waiting for a free session counts. Several --qps levels produce a
+throughput-vs-latency curve.
+
+Keys come from real customer and order ids sampled once into a local key file
+(workload.py), drawn uniformly or with Zipfian / hot-set skew and an optional
+share of never-queried (cold) keys; --synthetic-keys keeps random integers.
+
+--engine async submits every query with execute_async and polls for its
+status from an asyncio event loop (async_engine.py), so --threads becomes the
+number of queries in flight, held on a few sessions and I/O threads instead
+of one thread and session each.
+
+--slo-p95 MS searches for capacity instead: open-loop levels ramp up (doubling
+then bisecting, or in fixed steps) until p95 (and --slo-p99) breaks the
+target, and the highest rate that met it is reported with the curve
+(slo_search.py).
+
+--processes N spreads the load over N worker processes, each with its own
+session pool, started together at a barrier; their histograms are merged into
+one report (multiprocess_runner.py). A client process that saturates its CPU (GIL contention, result
+fetching) inflates latencies, so client CPU use is reported and flagged.
+
+--scenario FILE runs a declarative scenario (scenario.py): weighted query
+templates per target table/warehouse and a sequence of phases (warm-up, ramp,
+steady, spike) with a concurrency or arrival rate each, reported per phase
+(scenario_runner.py).
+
+--server-timings records each query's id and afterwards looks them all up in
+QUERY_HISTORY (query_history.py) to split latency into client wait, queueing,
+compilation, execution and network/client time per warehouse (per QPS level
+in open loop).
+
+Latencies are aggregated in mergeable histograms (latency_histogram.py) and
+broken out per query type and time window (report.py); --save/--csv export a
+run and --compare lines up two saved runs.
+
+Sessions are opened (and bound to the warehouse) before the timer starts and
+reused from a pool, so latencies are query latencies; connect + setup time is
+reported separately.
+
 Usage:
     python load_test_interactive.py --warehouse standard --queries 100 --threads 50
     python load_test_interactive.py --warehouse interactive --queries 100 --threads 50
+    python load_test_interactive.py --warehouse interactive --mode open --qps 10,25,50,100 --duration 30
+    python load_test_interactive.py --warehouse interactive --threads 400 --queries 4000 --processes 8
+    python load_test_interactive.py --warehouse interactive --threads 2000 --queries 20000 --engine async
+    python load_test_interactive.py --warehouse interactive --distribution zipf --cold-ratio 0.2
+    python load_test_interactive.py --warehouse interactive --scenario scenarios/lookup_mix.json
+    python load_test_interactive.py --warehouse interactive --slo-p95 100 --qps-start 10 --duration 30
+    python load_test_interactive.py --warehouse standard --save standard.json
+    python load_test_interactive.py --compare standard.json interactive.json
 """
 
 import argparse
 import os
-import random
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from typing import List, Literal
+from pathlib import Path
+from typing import Dict, Optional
 
 import snowflake.connector
 
+from load_tester import ASYNC_IO_THREADS, ASYNC_SESSIONS, LoadTester
+from multiprocess_runner import run_distributed
+from scenario_runner import run_scenario
+from slo_search import SEARCH_MODES, SloSearch
+from workload import DISTRIBUTIONS, Workload, sample_keys, save_keys
+from scenario import load_scenario
+from latency_histogram import load_run
+from report import (
+    analyze_results, print_capacity, print_client_cpu, print_comparison, print_latency_curve, save_outputs,
+    server_timings,
+)
 
-@dataclass
-class QueryResult:
-    query_id: int
-    query_type: str
-    duration_ms: float
-    row_count: int
-    success: bool
-    error: str = None
-
-
-class LoadTester:
-    def __init__(self, warehouse_type: Literal["standard", "interactive"], connection_name: str):
-        self.warehouse_type = warehouse_type
-        self.connection_name = connection_name
-        
-        if warehouse_type == "standard":
-            self.warehouse = "automated_intelligence_wh"
-            self.schema_prefix = "raw"
-        else:
-            self.warehouse = "automated_intelligence_interactive_wh"
-            self.schema_prefix = "interactive"
-    
-    def get_connection(self):
-        """Create a new connection for each thread"""
-        return snowflake.connector.connect(connection_name=self.connection_name)
-    
-    def execute_query(self, query_id: int, query_type: str, sql: str) -> QueryResult:
-        """Execute a single query and measure performance"""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(f"USE WAREHOUSE {self.warehouse}")
-            
-            start_time = time.time()
-            cursor.execute(sql)
-            results = cursor.fetchall()
-            end_time = time.time()
-            
-            duration_ms = (end_time - start_time) * 1000
-            
-            cursor.close()
-            
-            return QueryResult(
-                query_id=query_id,
-                query_type=query_type,
-                duration_ms=duration_ms,
-                row_count=len(results),
-                success=True
-            )
-        
-        except Exception as e:
-            return QueryResult(
-                query_id=query_id,
-                query_type=query_type,
-                duration_ms=-1,
-                row_count=0,
-                success=False,
-                error=str(e)
-            )
-        
-        finally:
-            if conn:
-                conn.close()
-    
-    def generate_customer_lookup_query(self) -> str:
-        """Generate a random customer lookup query"""
-        customer_id = random.randint(1, 20000)
-        
-        if self.warehouse_type == "standard":
-            return f"""
-            SELECT 
-                customer_id,
-                order_id,
-                order_date,
-                order_status,
-                total_amount
-            FROM automated_intelligence.raw.orders
-            WHERE customer_id = {customer_id}
-            ORDER BY order_date DESC
-            LIMIT 10
-            """
-        else:
-            return f"""
-            SELECT 
-                customer_id,
-                order_id,
-                order_date,
-                order_status,
-                total_amount
-            FROM automated_intelligence.interactive.customer_order_analytics
-            WHERE customer_id = {customer_id}
-            ORDER BY order_date DESC
-            LIMIT 10
-            """
-    
-    def generate_order_lookup_query(self) -> str:
-        """Generate a random order lookup query"""
-        order_id = random.randint(1, 20000)
-        
-        if self.warehouse_type == "standard":
-            return f"""
-            SELECT 
-                order_id,
-                customer_id,
-                order_date,
-                order_status,
-                total_amount
-            FROM automated_intelligence.raw.orders
-            WHERE order_id = {order_id}
-            """
-        else:
-            return f"""
-            SELECT 
-                order_id,
-                customer_id,
-                order_date,
-                order_status,
-                total_amount
-            FROM automated_intelligence.interactive.order_lookup
-            WHERE order_id = {order_id}
-            """
-    
-    def generate_customer_summary_query(self) -> str:
-        """Generate a customer summary query"""
-        customer_id = random.randint(1, 20000)
-        
-        if self.warehouse_type == "standard":
-            return f"""
-            SELECT 
-                customer_id,
-                COUNT(*) as order_count,
-                SUM(total_amount) as total_spent,
-                AVG(total_amount) as avg_order
-            FROM automated_intelligence.raw.orders
-            WHERE customer_id = {customer_id}
-            GROUP BY customer_id
-            """
-        else:
-            return f"""
-            SELECT 
-                customer_id,
-                COUNT(*) as order_count,
-                SUM(total_amount) as total_spent,
-                AVG(total_amount) as avg_order
-            FROM automated_intelligence.interactive.customer_order_analytics
-            WHERE customer_id = {customer_id}
-            GROUP BY customer_id
-            """
-    
-    def run_load_test(self, num_queries: int, num_threads: int) -> List[QueryResult]:
-        """Run concurrent load test"""
-        results = []
-        
-        print(f"{self.warehouse_type.upper()} WAREHOUSE - {num_queries} queries @ {num_threads} threads")
-        print(f"{'-'*80}")
-        
-        queries = []
-        for i in range(num_queries):
-            query_type_choice = random.random()
-            if query_type_choice < 0.5:
-                query_type = "customer_lookup"
-                sql = self.generate_customer_lookup_query()
-            elif query_type_choice < 0.8:
-                query_type = "order_lookup"
-                sql = self.generate_order_lookup_query()
-            else:
-                query_type = "customer_summary"
-                sql = self.generate_customer_summary_query()
-            
-            queries.append((i + 1, query_type, sql))
-        
-        start_time = time.time()
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = {
-                executor.submit(self.execute_query, query_id, query_type, sql): query_id
-                for query_id, query_type, sql in queries
-            }
-            
-            completed = 0
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-                completed += 1
-                
-                if completed % 25 == 0 or completed == num_queries:
-                    print(f"  {completed}/{num_queries}...", end=' ')
-        
-        total_time = time.time() - start_time
-        print(f"\n\nCompleted in {total_time:.1f}s")
-        
-        return results
-
+DEFAULT_KEY_FILE = Path(__file__).resolve().parent / ".workload_keys.json"
 
-def analyze_results(results: List[QueryResult], warehouse_type: str):
-    """Analyze and print test results"""
-    successful = [r for r in results if r.success]
-    failed = [r for r in results if not r.success]
-    
-    if not successful:
-        print("❌ All queries failed!")
-        for result in failed[:5]:
-            print(f"  Error: {result.error}")
-        return
-    
-    durations = sorted([r.duration_ms for r in successful])
-    
-    min_latency = durations[0]
-    max_latency = durations[-1]
-    avg_latency = sum(durations) / len(durations)
-    median_latency = durations[len(durations) // 2]
-    p95_latency = durations[int(len(durations) * 0.95)]
-    p99_latency = durations[int(len(durations) * 0.99)]
-    
-    print(f"\nRESULTS: {len(successful)}/{len(results)} success | P95: {p95_latency:.2f} ms | Median: {median_latency:.0f}ms | Avg: {avg_latency:.0f}ms")
-    print(f"{'-'*80}\n")
-    
-    if failed:
-        print(f"⚠️  {len(failed)} queries failed:")
-        for result in failed[:3]:
-            print(f"  #{result.query_id}: {result.error}")
-        if len(failed) > 3:
-            print(f"  ... and {len(failed) - 3} more")
+# --binding compare: each binding's queries are split into this many rounds,
+# run literal/bound in alternating order so warm-up and drift hit both alike
+BINDING_ROUNDS = 4
 
 
 def main():
@@ -255,8 +96,7 @@ def main():
     parser.add_argument(
         "--warehouse",
         choices=["standard", "interactive"],
-        required=True,
-        help="Warehouse type to test"
+        help="Warehouse type to test (required unless --compare)"
     )
     parser.add_argument(
         "--queries",
@@ -276,17 +116,403 @@ def main():
         default=None,
         help="Snowflake connection name (default: from SNOWFLAKE_CONNECTION_NAME env var)"
     )
+    parser.add_argument(
+        "--mode",
+        choices=["closed", "open"],
+        default=None,
+        help="closed: fixed query list as fast as the threads allow; open: fixed arrival rate (default: closed)"
+    )
+    parser.add_argument(
+        "--qps",
+        type=str,
+        default="10,25,50",
+        help="Open loop: comma-separated target rates to sweep, in queries/second (default: 10,25,50)"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=30,
+        help="Open loop and SLO search: seconds per QPS level (default: 30)"
+    )
+    parser.add_argument(
+        "--arrival",
+        choices=["poisson", "constant"],
+        default="poisson",
+        help="Open loop and SLO search: inter-arrival times (default: poisson)"
+    )
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=10,
+        help="Seconds per time window in the latency breakdown (default: 10)"
+    )
+    parser.add_argument(
+        "--save",
+        metavar="PATH",
+        help="Save latency histograms as JSON (for --compare)"
+    )
+    parser.add_argument(
+        "--csv",
+        metavar="PATH",
+        help="Export percentiles per query type and window as CSV"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="Compare two runs saved with --save (e.g. standard.json interactive.json) and exit"
+    )
+    parser.add_argument(
+        "--key-file",
+        default=str(DEFAULT_KEY_FILE),
+        help=f"Sampled customer/order keys, created on first use (default: {DEFAULT_KEY_FILE.name} next to this script)"
+    )
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=10000,
+        help="Keys of each kind to sample into the key file (default: 10000)"
+    )
+    parser.add_argument(
+        "--resample",
+        action="store_true",
+        help="Sample a fresh key file before running"
+    )
+    parser.add_argument(
+        "--synthetic-keys",
+        action="store_true",
+        help="Use random integer ids instead of sampled keys (order lookups then mostly miss)"
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=DISTRIBUTIONS,
+        default="uniform",
+        help="How keys are drawn from the key file (default: uniform)"
+    )
+    parser.add_argument(
+        "--zipf-s",
+        type=float,
+        default=1.1,
+        help="Zipf exponent: larger means fewer, hotter keys (default: 1.1)"
+    )
+    parser.add_argument(
+        "--hot-fraction",
+        type=float,
+        default=0.1,
+        help="Hotset: fraction of keys that are hot (default: 0.1)"
+    )
+    parser.add_argument(
+        "--hot-share",
+        type=float,
+        default=0.9,
+        help="Hotset: fraction of queries that hit the hot keys (default: 0.9)"
+    )
+    parser.add_argument(
+        "--cold-ratio",
+        type=float,
+        default=None,
+        help="At least this fraction of queries use a key not queried before in the run (cache misses)"
+    )
+    parser.add_argument(
+        "--binding",
+        choices=["literal", "bound", "compare"],
+        default="literal",
+        help="literal: keys inlined in the SQL text; bound: ? placeholders bound server-side; "
+             "compare: closed-loop runs of each, interleaved with the result cache off and "
+             "reported side by side (default: literal)"
+    )
+    parser.add_argument(
+        "--scenario",
+        metavar="FILE",
+        help="Run a scenario file (JSON, or YAML with PyYAML): query mix and phases, reported per phase"
+    )
+    parser.add_argument(
+        "--server-timings",
+        action="store_true",
+        help="After the run, split latency into client wait/queued/compilation/execution/network "
+             "time from QUERY_HISTORY"
+    )
+    parser.add_argument(
+        "--slo-p95",
+        type=float,
+        metavar="MS",
+        help="Search for the highest open-loop QPS whose p95 stays within MS milliseconds"
+    )
+    parser.add_argument(
+        "--slo-p99",
+        type=float,
+        metavar="MS",
+        help="SLO search: also require p99 within MS milliseconds"
+    )
+    parser.add_argument(
+        "--search",
+        choices=SEARCH_MODES,
+        default="binary",
+        help="SLO search: binary doubles the rate until the SLO breaks, then bisects; "
+             "step adds --qps-step per level (default: binary)"
+    )
+    parser.add_argument(
+        "--qps-start",
+        type=float,
+        default=10,
+        help="SLO search: first rate to try, in queries/second (default: 10)"
+    )
+    parser.add_argument(
+        "--qps-step",
+        type=float,
+        default=None,
+        help="SLO search with --search step: rate increment per level (default: --qps-start)"
+    )
+    parser.add_argument(
+        "--qps-max",
+        type=float,
+        default=1000,
+        help="SLO search: highest rate to try (default: 1000)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        default="threads",
+        help="threads: one thread and session per in-flight query; async: execute_async + status polling "
+             f"from an asyncio loop on {ASYNC_SESSIONS} sessions and {ASYNC_IO_THREADS} I/O threads, "
+             "--threads queries in flight (default: threads)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes generating load; --threads and --queries/--qps are split across them (default: 1)"
+    )
     
     args = parser.parse_args()
     
+    if args.compare:
+        print_comparison(load_run(args.compare[0]), load_run(args.compare[1]))
+        return
+    
+    # Every argument problem is reported here, before keys are sampled or sessions opened
+    if args.queries < 1 or args.threads < 1:
+        parser.error("--queries and --threads must be at least 1")
+    if args.duration <= 0 or args.window <= 0:
+        parser.error("--duration and --window must be positive")
+    if args.sample_size < 1:
+        parser.error("--sample-size must be at least 1")
+    if not 0 < args.hot_fraction <= 1 or not 0 <= args.hot_share <= 1:
+        parser.error("--hot-fraction must be in (0, 1] and --hot-share in [0, 1]")
+    if args.cold_ratio is not None and not 0 <= args.cold_ratio <= 1:
+        parser.error("--cold-ratio must be between 0 and 1")
+    
+    scenario = None
+    if args.scenario:
+        try:
+            scenario = load_scenario(args.scenario)
+        except (OSError, ValueError) as e:
+            parser.error(f"invalid scenario {args.scenario}: {e}")
+        args.warehouse = args.warehouse or scenario.warehouse
+        if args.processes > 1 or args.binding == "compare" or args.engine == "async":
+            parser.error("--scenario runs in a single process with --engine threads and --binding literal or bound")
+    if not args.warehouse:
+        parser.error("--warehouse is required (or set \"warehouse\" in the scenario)")
+    if scenario:
+        try:
+            scenario.validate_for(args.warehouse)
+        except ValueError as e:
+            parser.error(f"invalid scenario {args.scenario}: {e}")
+    
     connection_name = args.connection or os.getenv("SNOWFLAKE_CONNECTION_NAME")
     if not connection_name:
-        print("❌ Error: No connection specified. Use --connection or set SNOWFLAKE_CONNECTION_NAME")
+        parser.error("no connection specified: use --connection or set SNOWFLAKE_CONNECTION_NAME")
+    
+    if not 1 <= args.processes <= args.threads:
+        parser.error("--processes must be between 1 and --threads")
+    if args.slo_p95 is not None and args.mode is not None:
+        parser.error("--slo-p95 picks its own open-loop rates; it can't be combined with --mode")
+    args.mode = args.mode or "closed"
+    if args.binding == "compare" and (args.mode != "closed" or args.processes > 1):
+        parser.error("--binding compare runs closed-loop in a single process")
+    if args.server_timings and args.binding == "compare":
+        parser.error("--server-timings can't be combined with --binding compare")
+    
+    search = None
+    if args.slo_p95 is not None:
+        if scenario or args.processes > 1 or args.binding == "compare":
+            parser.error("--slo-p95 runs in a single process, without --scenario or --binding compare")
+        try:
+            search = SloSearch(
+                args.slo_p95, args.slo_p99, args.qps_start, args.qps_max, args.search, args.qps_step)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    qps_levels = None
+    if args.mode == "open":
+        try:
+            qps_levels = [float(q) for q in args.qps.split(",") if q.strip()]
+        except ValueError:
+            parser.error(f"--qps must be comma-separated numbers, got {args.qps!r}")
+        if not qps_levels or min(qps_levels) <= 0:
+            parser.error("--qps levels must be positive")
+    
+    try:
+        workload = prepare_workload(args, connection_name)
+    except Exception as e:
+        print(f"❌ Error: could not sample keys: {e}")
+        return
+    if workload:
+        print(f"Workload: {Workload.from_file(workload['key_file'], **workload['options']).describe()}")
+    
+    if scenario:
+        run_scenario(scenario, args, connection_name, workload)
+        return
+    
+    if args.binding == "compare":
+        compare_binding(args, connection_name, workload)
+        return
+    
+    if args.processes > 1:
+        run_distributed(args, connection_name, qps_levels, workload)
+        return
+    
+    tester = LoadTester(
+        args.warehouse, connection_name,
+        Workload.from_file(workload["key_file"], **workload["options"]) if workload else None,
+        args.binding,
+        args.engine,
+    )
+    if search:
+        run_started = time.time()
+        try:
+            curve = tester.run_slo_search(search, args.duration, args.threads, args.arrival, args.window)
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            return
+        print_latency_curve(curve, args.warehouse)
+        print_capacity(search, args.warehouse)
+        results = {f"{point['target_qps']:g} qps": point.pop("results") for point in curve}
+        recorders = {f"{point['target_qps']:g} qps": point.pop("recorder") for point in curve}
+        if args.server_timings:
+            recorders.update(server_timings(results, connection_name, run_started, args.window))
+        slo = {"p95_ms": args.slo_p95, "p99_ms": args.slo_p99, "search": args.search}
+        save_outputs(args, recorders, {"mode": "slo-search", "arrival": args.arrival, "duration_s": args.duration,
+                                       "slo": slo, "capacity": search.best, "curve": curve})
         return
     
-    tester = LoadTester(args.warehouse, connection_name)
-    results = tester.run_load_test(args.queries, args.threads)
-    analyze_results(results, args.warehouse)
+    if args.mode == "open":
+        try:
+            run_started = time.time()
+            curve = tester.run_qps_sweep(qps_levels, args.duration, args.threads, args.arrival, args.window)
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            return
+        print_latency_curve(curve, args.warehouse)
+        results = {f"{point['target_qps']:g} qps": point.pop("results") for point in curve}
+        recorders = {f"{point['target_qps']:g} qps": point.pop("recorder") for point in curve}
+        if args.server_timings:
+            recorders.update(server_timings(results, connection_name, run_started, args.window))
+        save_outputs(args, recorders, {"arrival": args.arrival, "duration_s": args.duration, "curve": curve})
+        return
+    
+    run_started = time.time()
+    try:
+        results = tester.run_load_test(args.queries, args.threads)
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        return
+    recorder = analyze_results(results, args.warehouse, args.window)
+    recorders = {"closed": recorder}
+    if args.server_timings:
+        recorders.update(server_timings({"": results}, connection_name, run_started, args.window))
+    save_outputs(args, recorders, {"queries": args.queries})
+
+
+def prepare_workload(args, connection_name: str) -> Optional[Dict]:
+    """
+    Key file and key-choice options for the query generators (None with
+    --synthetic-keys). Samples keys into the key file on first use or with --resample.
+    """
+    if args.synthetic_keys:
+        return None
+    key_file = Path(args.key_file)
+    if args.resample or not key_file.exists():
+        print(f"Sampling up to {args.sample_size:,} customer and order keys into {key_file}...")
+        conn = snowflake.connector.connect(connection_name=connection_name)
+        try:
+            keys = sample_keys(conn, args.sample_size)
+        finally:
+            conn.close()
+        if not all(keys.values()):
+            raise RuntimeError("No keys sampled - are the RAW tables populated? (or use --synthetic-keys)")
+        save_keys(str(key_file), keys)
+    return {
+        "key_file": str(key_file),
+        "options": {
+            "distribution": args.distribution,
+            "zipf_s": args.zipf_s,
+            "hot_fraction": args.hot_fraction,
+            "hot_share": args.hot_share,
+            "cold_ratio": args.cold_ratio,
+        },
+    }
+
+
+def compare_binding(args, connection_name: str, workload: Dict = None):
+    """
+    --binding compare: the closed-loop test with literal SQL and with bound
+    parameters, interleaved in BINDING_ROUNDS rounds that alternate which one
+    goes first, each on its own sessions with the result cache off
+    """
+    testers = {
+        binding: LoadTester(
+            args.warehouse, connection_name,
+            Workload.from_file(workload["key_file"], **workload["options"]) if workload else None,
+            binding,
+            args.engine,
+            result_cache=False,
+        )
+        for binding in ("literal", "bound")
+    }
+    rounds = max(1, min(BINDING_ROUNDS, args.queries))
+    concurrency = "threads" if args.engine == "threads" else "async in flight"
+    print(f"{args.warehouse.upper()} WAREHOUSE - {args.queries} queries per binding @ {args.threads} {concurrency}, "
+          f"literal and bound interleaved in {rounds} rounds (result cache off)")
+    print(f"{'-'*80}")
+    
+    results = {binding: [] for binding in testers}
+    elapsed = {binding: 0.0 for binding in testers}
+    cpu = {binding: [] for binding in testers}
+    try:
+        for tester in testers.values():
+            tester.open_sessions_and_report(tester.session_count(args.threads))
+        next_id = 1
+        for round_index in range(rounds):
+            size = args.queries // rounds + (1 if round_index < args.queries % rounds else 0)
+            order = ("literal", "bound") if round_index % 2 == 0 else ("bound", "literal")
+            for binding in order:
+                tester = testers[binding]
+                queries = [(query_id, *tester.random_query()) for query_id in range(next_id, next_id + size)]
+                round_results, round_elapsed, round_cpu = tester.run_queries(queries, args.threads, progress=False)
+                results[binding] += round_results
+                elapsed[binding] += round_elapsed
+                cpu[binding].append(round_cpu)
+            next_id += size
+            print(f"  Round {round_index + 1}/{rounds}: {order[0]}, then {order[1]}")
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        return
+    finally:
+        for tester in testers.values():
+            tester.close_sessions()
+    
+    recorders = {}
+    for binding in testers:
+        print(f"\n{binding.upper()}: {len(results[binding])} queries in {elapsed[binding]:.1f}s")
+        print_client_cpu([max(cpu[binding])])
+        recorders[binding] = analyze_results(results[binding], args.warehouse, args.window)
+    
+    print_comparison(
+        {"warehouse": "literal SQL", "recorders": {args.warehouse: recorders["literal"]}},
+        {"warehouse": "bound parameters", "recorders": {args.warehouse: recorders["bound"]}},
+    )
+    save_outputs(args, recorders, {"queries": args.queries, "rounds": rounds, "result_cache": False})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,525 @@
+"""
+Interactive Tables Load Tester
+==============================
+Purpose: Time lookup queries against a standard or interactive warehouse
+
+LoadTester opens a pool of sessions on the target warehouse before the clock
+starts, generates the customer lookup / order lookup / customer summary mix
+(or renders scenario templates) with literal or bound keys, and runs them:
+
+- closed loop: a fixed query list as fast as --threads allow
+- open loop:   queries sent at a target rate, latency measured from each
+               query's intended send time
+- SLO search:  the open-loop levels an SloSearch asks for
+
+With engine="async" the queries go through execute_async on a few shared
+sessions (async_engine.py) instead of one thread and session each.
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from string import Formatter
+from typing import Dict, List, Literal, Optional, Tuple
+
+import snowflake.connector
+from snowflake.connector.errors import ProgrammingError
+
+from async_engine import AsyncQueryEngine
+from connection_pool import ConnectionPool
+from slo_search import SloSearch
+from workload import Workload
+from scenario import QueryTemplate
+from report import QueryResult, cpu_fraction, curve_point, print_client_cpu, print_curve_point, record_results
+
+# --engine async: sessions that carry all in-flight queries, and the threads
+# making the blocking submit / status / fetch calls for them
+ASYNC_SESSIONS = 8
+ASYNC_IO_THREADS = 32
+
+
+class LoadTester:
+    def __init__(
+        self,
+        warehouse_type: Literal["standard", "interactive"],
+        connection_name: str,
+        workload: Workload = None,
+        binding: Literal["literal", "bound"] = "literal",
+        engine: Literal["threads", "async"] = "threads",
+        result_cache: bool = True,
+    ):
+        self.warehouse_type = warehouse_type
+        self.connection_name = connection_name
+        self.workload = workload
+        self.binding = binding
+        self.engine = engine
+        self.result_cache = result_cache
+        
+        if warehouse_type == "standard":
+            self.warehouse = "automated_intelligence_wh"
+            self.schema_prefix = "raw"
+        else:
+            self.warehouse = "automated_intelligence_interactive_wh"
+            self.schema_prefix = "interactive"
+        
+        self.pool = None
+        self.setup_ms: List[float] = []
+    
+    def get_connection(self):
+        """Open a new Snowflake connection (qmark params are bound server-side, not interpolated)"""
+        return snowflake.connector.connect(connection_name=self.connection_name, paramstyle="qmark")
+    
+    def open_sessions(self, num_sessions: int):
+        """
+        Open `num_sessions` pooled connections, already on the target warehouse,
+        before any query is timed. Records each session's connect + setup time.
+        """
+        init_sql = [f"USE WAREHOUSE {self.warehouse}"]
+        if not self.result_cache:
+            init_sql.append("ALTER SESSION SET USE_CACHED_RESULT = FALSE")
+        self.pool = ConnectionPool(
+            self.get_connection,
+            max_size=num_sessions,
+            init_sql=init_sql,
+        )
+        
+        def open_one():
+            start_time = time.time()
+            conn = self.pool.acquire()
+            return conn, (time.time() - start_time) * 1000
+        
+        # Hold every session until all are open so the pool creates num_sessions of them
+        opened = []
+        with ThreadPoolExecutor(max_workers=num_sessions) as executor:
+            for future in as_completed([executor.submit(open_one) for _ in range(num_sessions)]):
+                try:
+                    conn, setup_ms = future.result()
+                except Exception as e:
+                    print(f"  Could not open session: {e}")
+                    continue
+                opened.append(conn)
+                self.setup_ms.append(setup_ms)
+        for conn in opened:
+            self.pool.release(conn)
+        if not opened:
+            raise RuntimeError("No sessions could be opened")
+    
+    def session_count(self, concurrency: int) -> int:
+        """Sessions needed for `concurrency` in-flight queries: one each, or a few shared ones with --engine async"""
+        return concurrency if self.engine == "threads" else min(concurrency, ASYNC_SESSIONS)
+    
+    def close_sessions(self):
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+    
+    def execute_query(
+        self, query_id: int, query_type: str, sql: str, params: tuple = None, intended_at: float = None
+    ) -> QueryResult:
+        """
+        Execute a single query on a pooled session and measure performance.
+        With `intended_at` (open loop), latency runs from that intended send
+        time, including any wait for the thread pool or a session.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                start_time = time.time()
+                try:
+                    cursor.execute(sql, params)
+                    results = cursor.fetchall()
+                except ProgrammingError as e:
+                    # The statement failed (timeout, bad key...), not the session: keep it
+                    # pooled, or the next query's latency would include a fresh login
+                    cursor.close()
+                    return QueryResult(query_id, query_type, -1, 0, False, error=str(e), sfqid=e.sfqid)
+                end_time = time.time()
+                
+                sfqid = cursor.sfqid
+                cursor.close()
+            
+            measured_from = intended_at if intended_at is not None else start_time
+            return QueryResult(
+                query_id=query_id,
+                query_type=query_type,
+                duration_ms=(end_time - measured_from) * 1000,
+                row_count=len(results),
+                success=True,
+                queue_ms=(start_time - measured_from) * 1000,
+                sent_at=measured_from,
+                sfqid=sfqid,
+            )
+        
+        except Exception as e:
+            # Connection-level failure: the pool has discarded the session
+            return QueryResult(
+                query_id=query_id,
+                query_type=query_type,
+                duration_ms=-1,
+                row_count=0,
+                success=False,
+                error=str(e)
+            )
+    
+    def customer_key(self) -> int:
+        """Customer id: a sampled key, or a random id with --synthetic-keys"""
+        if self.workload is None:
+            return random.randint(1, 20000)
+        return int(self.workload.customer_id())
+    
+    def order_key(self):
+        """Order id: a sampled ORDER_ID (UUID string), or a random integer with --synthetic-keys"""
+        if self.workload is None:
+            return random.randint(1, 20000)
+        return str(self.workload.order_id())
+    
+    def bind(self, value) -> Tuple[str, Optional[tuple]]:
+        """
+        (SQL for `value`, params): a "?" placeholder plus the value when binding,
+        else the value as a SQL literal (every query text then differs).
+        """
+        if self.binding == "bound":
+            return "?", (value,)
+        if isinstance(value, str):
+            escaped = value.replace("'", "''")
+            return f"'{escaped}'", None
+        return str(value), None
+    
+    def generate_customer_lookup_query(self) -> Tuple[str, Optional[tuple]]:
+        """Generate a random customer lookup query"""
+        customer_id, params = self.bind(self.customer_key())
+        
+        if self.warehouse_type == "standard":
+            return f"""
+            SELECT 
+                customer_id,
+                order_id,
+                order_date,
+                order_status,
+                total_amount
+            FROM automated_intelligence.raw.orders
+            WHERE customer_id = {customer_id}
+            ORDER BY order_date DESC
+            LIMIT 10
+            """, params
+        else:
+            return f"""
+            SELECT 
+                customer_id,
+                order_id,
+                order_date,
+                order_status,
+                total_amount
+            FROM automated_intelligence.interactive.customer_order_analytics
+            WHERE customer_id = {customer_id}
+            ORDER BY order_date DESC
+            LIMIT 10
+            """, params
+    
+    def generate_order_lookup_query(self) -> Tuple[str, Optional[tuple]]:
+        """Generate a random order lookup query"""
+        order_id, params = self.bind(self.order_key())
+        
+        if self.warehouse_type == "standard":
+            return f"""
+            SELECT 
+                order_id,
+                customer_id,
+                order_date,
+                order_status,
+                total_amount
+            FROM automated_intelligence.raw.orders
+            WHERE order_id = {order_id}
+            """, params
+        else:
+            return f"""
+            SELECT 
+                order_id,
+                customer_id,
+                order_date,
+                order_status,
+                total_amount
+            FROM automated_intelligence.interactive.order_lookup
+            WHERE order_id = {order_id}
+            """, params
+    
+    def generate_customer_summary_query(self) -> Tuple[str, Optional[tuple]]:
+        """Generate a customer summary query"""
+        customer_id, params = self.bind(self.customer_key())
+        
+        if self.warehouse_type == "standard":
+            return f"""
+            SELECT 
+                customer_id,
+                COUNT(*) as order_count,
+                SUM(total_amount) as total_spent,
+                AVG(total_amount) as avg_order
+            FROM automated_intelligence.raw.orders
+            WHERE customer_id = {customer_id}
+            GROUP BY customer_id
+            """, params
+        else:
+            return f"""
+            SELECT 
+                customer_id,
+                COUNT(*) as order_count,
+                SUM(total_amount) as total_spent,
+                AVG(total_amount) as avg_order
+            FROM automated_intelligence.interactive.customer_order_analytics
+            WHERE customer_id = {customer_id}
+            GROUP BY customer_id
+            """, params
+    
+    def scenario_query(self, template: QueryTemplate) -> Tuple[str, Optional[tuple]]:
+        """Render a scenario template for this warehouse: (sql, params)"""
+        keys = {}
+        params = []
+        parts = []
+        for literal, field_name, _, _ in Formatter().parse(template.sql):
+            parts.append(literal)
+            if field_name is None:
+                continue
+            if field_name == "table":
+                parts.append(template.tables[self.warehouse_type])
+                continue
+            # A key used twice in one template gets the same value
+            if field_name not in keys:
+                keys[field_name] = self.customer_key() if field_name == "customer_id" else self.order_key()
+            fragment, bound = self.bind(keys[field_name])
+            parts.append(fragment)
+            params.extend(bound or ())
+        return "".join(parts), tuple(params) if params else None
+    
+    def random_query(self) -> Tuple[str, str, Optional[tuple]]:
+        """Pick a query from the workload mix: (query_type, sql, params)"""
+        query_type_choice = random.random()
+        if query_type_choice < 0.5:
+            return ("customer_lookup", *self.generate_customer_lookup_query())
+        elif query_type_choice < 0.8:
+            return ("order_lookup", *self.generate_order_lookup_query())
+        else:
+            return ("customer_summary", *self.generate_customer_summary_query())
+    
+    def open_sessions_and_report(self, num_sessions: int):
+        setup_start = time.time()
+        self.open_sessions(num_sessions)
+        setup_time = time.time() - setup_start
+        setup = sorted(self.setup_ms)
+        print(f"Session setup: {len(setup)} sessions on {self.warehouse} in {setup_time:.1f}s | "
+              f"connect + USE WAREHOUSE median {setup[len(setup) // 2]:.0f}ms, max {setup[-1]:.0f}ms (not in query latency)")
+    
+    def run_async(
+        self,
+        queries: List[Tuple[int, str, str, Optional[tuple]]],
+        max_in_flight: int,
+        intended: List[float] = None,
+        progress: bool = True,
+    ) -> Tuple[List[QueryResult], float, float]:
+        """
+        --engine async: run `queries` with up to `max_in_flight` submitted at
+        once over all open sessions. With `intended` (open loop: send time per
+        query), each is submitted at its time and latency runs from it.
+        Returns the results, wall-clock seconds and CPU use, like run_queries.
+        """
+        connections = [self.pool.acquire() for _ in range(self.pool.size)]
+        completed = 0
+        
+        def on_done(outcome):
+            nonlocal completed
+            completed += 1
+            if progress and (completed % 25 == 0 or completed == len(queries)):
+                print(f"  {completed}/{len(queries)}...", end=' ')
+        
+        start_time = time.time()
+        cpu_start = time.process_time()
+        try:
+            engine = AsyncQueryEngine(connections, max_in_flight, io_threads=ASYNC_IO_THREADS)
+            outcomes = engine.run(
+                [(sql, params, intended[i] if intended else None) for i, (_, _, sql, params) in enumerate(queries)],
+                on_done,
+            )
+        finally:
+            for conn in connections:
+                self.pool.release(conn)
+        elapsed = time.time() - start_time
+        
+        results = []
+        for i, ((query_id, query_type, _, _), outcome) in enumerate(zip(queries, outcomes)):
+            if outcome.error is not None:
+                results.append(QueryResult(query_id, query_type, -1, 0, False, error=outcome.error))
+                continue
+            measured_from = intended[i] if intended else outcome.submitted_at
+            results.append(QueryResult(
+                query_id=query_id,
+                query_type=query_type,
+                duration_ms=(outcome.finished_at - measured_from) * 1000,
+                row_count=len(outcome.rows),
+                success=True,
+                queue_ms=(outcome.submitted_at - measured_from) * 1000,
+                sent_at=measured_from,
+                sfqid=outcome.sfqid,
+            ))
+        return results, elapsed, cpu_fraction(cpu_start, elapsed)
+    
+    def run_queries(
+        self, queries: List[Tuple[int, str, str, Optional[tuple]]], num_threads: int, progress: bool = True
+    ) -> Tuple[List[QueryResult], float, float]:
+        """
+        Run `queries` as fast as `num_threads` threads (or in-flight async
+        queries) allow on the open sessions. Returns the results, wall-clock
+        seconds and this process's CPU use (fraction of one core) over the run.
+        """
+        if self.engine == "async":
+            return self.run_async(queries, num_threads, progress=progress)
+        results = []
+        start_time = time.time()
+        cpu_start = time.process_time()
+        
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = {
+                executor.submit(self.execute_query, query_id, query_type, sql, params): query_id
+                for query_id, query_type, sql, params in queries
+            }
+            
+            completed = 0
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                completed += 1
+                
+                if progress and (completed % 25 == 0 or completed == len(queries)):
+                    print(f"  {completed}/{len(queries)}...", end=' ')
+        
+        elapsed = time.time() - start_time
+        return results, elapsed, cpu_fraction(cpu_start, elapsed)
+    
+    def run_load_test(self, num_queries: int, num_threads: int) -> List[QueryResult]:
+        """Run concurrent load test"""
+        binding = " (bound parameters)" if self.binding == "bound" else ""
+        concurrency = "threads" if self.engine == "threads" else "async in flight"
+        print(f"{self.warehouse_type.upper()} WAREHOUSE - {num_queries} queries @ {num_threads} {concurrency}{binding}")
+        print(f"{'-'*80}")
+        
+        queries = [(i + 1, *self.random_query()) for i in range(num_queries)]
+        
+        self.open_sessions_and_report(self.session_count(num_threads))
+        try:
+            results, total_time, cpu = self.run_queries(queries, num_threads)
+        finally:
+            self.close_sessions()
+        
+        print(f"\n\nCompleted in {total_time:.1f}s")
+        print_client_cpu([cpu])
+        
+        return results
+    
+    def run_open_loop(
+        self,
+        qps: float,
+        duration_s: float,
+        num_threads: int,
+        arrival: Literal["poisson", "constant"] = "poisson",
+    ) -> Tuple[List[QueryResult], float, float]:
+        """
+        Send queries at `qps` for `duration_s` on the already open sessions,
+        without waiting for earlier queries to finish. Returns the results,
+        the wall-clock time until the last one completed and the CPU use.
+        """
+        offsets = []
+        offset = 0.0
+        for _ in range(max(1, int(qps * duration_s))):
+            offsets.append(offset)
+            offset += random.expovariate(qps) if arrival == "poisson" else 1.0 / qps
+        
+        if self.engine == "async":
+            queries = [(i + 1, *self.random_query()) for i in range(len(offsets))]
+            start_time = time.time()
+            return self.run_async(queries, num_threads, [start_time + offset for offset in offsets], progress=False)
+        
+        start_time = time.time()
+        cpu_start = time.process_time()
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = []
+            for i, offset in enumerate(offsets):
+                intended_at = start_time + offset
+                delay = intended_at - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                query_type, sql, params = self.random_query()
+                futures.append(executor.submit(self.execute_query, i + 1, query_type, sql, params, intended_at))
+            results = [future.result() for future in futures]
+        elapsed = time.time() - start_time
+        return results, elapsed, cpu_fraction(cpu_start, elapsed)
+    
+    def run_qps_sweep(
+        self,
+        qps_levels: List[float],
+        duration_s: float,
+        num_threads: int,
+        arrival: Literal["poisson", "constant"] = "poisson",
+        window_s: float = 10.0,
+    ) -> List[Dict]:
+        """
+        Open-loop run at each QPS level on one set of sessions; one summary per
+        level, with the level's raw results under "results"
+        """
+        concurrency = "sessions" if self.engine == "threads" else "async in flight"
+        print(f"{self.warehouse_type.upper()} WAREHOUSE - open loop, {arrival} arrivals, "
+              f"{duration_s:.0f}s per level @ up to {num_threads} {concurrency}")
+        print(f"{'-'*80}")
+        
+        self.open_sessions_and_report(self.session_count(num_threads))
+        curve = []
+        try:
+            for qps in qps_levels:
+                point = self.measure_level(qps, duration_s, num_threads, arrival, window_s)
+                curve.append(point)
+                print_curve_point(point)
+        finally:
+            self.close_sessions()
+        return curve
+    
+    def measure_level(
+        self, qps: float, duration_s: float, num_threads: int, arrival: str, window_s: float
+    ) -> Dict:
+        """One open-loop level on the open sessions: its curve point (raw results under "results")"""
+        results, elapsed, cpu = self.run_open_loop(qps, duration_s, num_threads, arrival)
+        successful = [r for r in results if r.success]
+        point = curve_point(
+            qps, elapsed, len(results), len(results) - len(successful), [cpu],
+            record_results(results, window_s),
+            record_results(results, window_s, latency="queue_ms").overall,
+        )
+        point["results"] = results
+        return point
+    
+    def run_slo_search(
+        self,
+        search: SloSearch,
+        duration_s: float,
+        num_threads: int,
+        arrival: Literal["poisson", "constant"] = "poisson",
+        window_s: float = 10.0,
+    ) -> List[Dict]:
+        """
+        Measure the open-loop levels `search` asks for, on one set of sessions,
+        until it has found the highest rate that meets the SLO. Returns the curve.
+        """
+        concurrency = "sessions" if self.engine == "threads" else "async in flight"
+        print(f"{self.warehouse_type.upper()} WAREHOUSE - SLO search ({search.mode}) for {search.describe()}, "
+              f"{arrival} arrivals, {duration_s:.0f}s per level @ up to {num_threads} {concurrency}")
+        print(f"{'-'*80}")
+        
+        self.open_sessions_and_report(self.session_count(num_threads))
+        try:
+            qps = search.next_qps()
+            while qps is not None:
+                point = self.measure_level(qps, duration_s, num_threads, arrival, window_s)
+                violation = search.record(point)
+                print_curve_point(point)
+                print(f"    {'✅ meets SLO' if violation is None else f'❌ breaks SLO: {violation}'}")
+                qps = search.next_qps()
+        finally:
+            self.close_sessions()
+        return search.curve
@@ -0,0 +1,220 @@
+"""
+Multi-Process Load Generation
+=============================
+Purpose: Spread one load test over several client processes
+
+A single Python process tops out well before an interactive warehouse does:
+GIL contention and result fetching add client-side delay to every latency.
+run_multiprocess() splits the threads (and queries or QPS) over N spawned
+workers, each with its own session pool, releases them together from a
+barrier for every QPS level and merges the histograms they send back.
+run_distributed() is the --processes N entry point that prints the merged
+report.
+"""
+
+import multiprocessing
+import time
+from queue import Empty
+from typing import Dict, List
+
+from load_tester import LoadTester
+from workload import Workload
+from latency_histogram import LatencyHistogram, LatencyRecorder
+from report import (
+    QueryResult, curve_point, print_client_cpu, print_curve_point, print_latency_curve, print_report,
+    record_results, save_outputs, server_timings,
+)
+
+
+def split_evenly(total: int, parts: int) -> List[int]:
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def _worker_main(worker_id: int, config: Dict, barrier, queue):
+    """
+    One load-generating process: open its own sessions, wait at the barrier
+    so every worker starts together, run its share, send back histograms.
+    """
+    workload = None
+    if config["workload"]:
+        workload = Workload.from_file(
+            config["workload"]["key_file"], partition=(worker_id, config["processes"]), **config["workload"]["options"])
+    tester = LoadTester(config["warehouse"], config["connection_name"], workload, config["binding"], config["engine"])
+    try:
+        tester.open_sessions(tester.session_count(config["threads"]))
+    except Exception as e:
+        barrier.abort()
+        queue.put({"worker": worker_id, "error": f"could not open sessions: {e}"})
+        return
+    
+    levels = []
+    try:
+        for qps in config["qps_levels"] or [None]:
+            barrier.wait(timeout=config["barrier_timeout"])
+            start_time = time.time()
+            if qps is None:
+                queries = [(i + 1, *tester.random_query()) for i in range(config["queries"])]
+                results, elapsed, cpu = tester.run_queries(queries, config["threads"], progress=False)
+            else:
+                results, elapsed, cpu = tester.run_open_loop(
+                    qps, config["duration"], config["threads"], config["arrival"])
+            failed = [r for r in results if not r.success]
+            levels.append({
+                "recorder": record_results(results, config["window"], started_at=start_time).to_dict(),
+                "queueing": record_results(results, config["window"], "queue_ms", start_time).overall.to_dict(),
+                "queries": len(results),
+                "errors": [f"#{r.query_id}: {r.error}" for r in failed],
+                "elapsed": elapsed,
+                "cpu": cpu,
+                "server_results": [
+                    (r.sfqid, r.query_type, r.duration_ms, r.queue_ms, r.sent_at) for r in results if r.success
+                ] if config["server_timings"] else [],
+            })
+        queue.put({"worker": worker_id, "setup_ms": tester.setup_ms, "levels": levels})
+    except Exception as e:
+        barrier.abort()
+        queue.put({"worker": worker_id, "error": str(e)})
+    finally:
+        tester.close_sessions()
+
+
+def run_multiprocess(
+    warehouse_type: str,
+    connection_name: str,
+    processes: int,
+    num_threads: int,
+    window_s: float,
+    num_queries: int = 0,
+    qps_levels: List[float] = None,
+    duration_s: float = 0,
+    arrival: str = "poisson",
+    workload: Dict = None,
+    binding: str = "literal",
+    server_timings: bool = False,
+    engine: str = "threads",
+) -> List[Dict]:
+    """
+    Split the threads (and queries or QPS) over `processes` worker processes;
+    `workload` ({"key_file", "options"}, see prepare_workload in
+    load_test_interactive.py) is loaded in each. Returns one entry per QPS
+    level (a single one for a closed-loop run) with the merged recorder, merged
+    queueing histogram, counts and per-worker CPU, plus the successful queries'
+    ids and latencies when `server_timings`.
+    """
+    threads = split_evenly(num_threads, processes)
+    queries = split_evenly(num_queries, processes)
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes)
+    queue = ctx.Queue()
+    workers = []
+    for i in range(processes):
+        config = {
+            "warehouse": warehouse_type,
+            "connection_name": connection_name,
+            "threads": threads[i],
+            "queries": queries[i],
+            "qps_levels": [qps / processes for qps in qps_levels] if qps_levels else None,
+            "duration": duration_s,
+            "arrival": arrival,
+            "window": window_s,
+            "workload": workload,
+            "processes": processes,
+            "binding": binding,
+            "server_timings": server_timings,
+            "engine": engine,
+            "barrier_timeout": 600,
+        }
+        worker = ctx.Process(target=_worker_main, args=(i, config, barrier, queue), daemon=True)
+        worker.start()
+        workers.append(worker)
+    
+    messages = []
+    while len(messages) < processes:
+        try:
+            messages.append(queue.get(timeout=1))
+        except Empty:
+            if not any(worker.is_alive() for worker in workers) and queue.empty():
+                break
+    for worker in workers:
+        worker.join()
+    
+    errors = [f"worker {m['worker']}: {m['error']}" for m in messages if "error" in m]
+    if errors or len(messages) < processes:
+        raise RuntimeError("; ".join(errors) or "a worker process exited without reporting")
+    
+    setup = sorted(ms for m in messages for ms in m["setup_ms"])
+    print(f"Session setup: {len(setup)} sessions in {processes} processes | "
+          f"connect + USE WAREHOUSE median {setup[len(setup) // 2]:.0f}ms, max {setup[-1]:.0f}ms (not in query latency)")
+    
+    merged = []
+    for level in range(len(qps_levels or [None])):
+        per_worker = [m["levels"][level] for m in messages]
+        recorder = LatencyRecorder(window_s)
+        queueing = LatencyHistogram()
+        for entry in per_worker:
+            recorder.merge(LatencyRecorder.from_dict(entry["recorder"]))
+            queueing.merge(LatencyHistogram.from_dict(entry["queueing"]))
+        merged.append({
+            "target_qps": qps_levels[level] if qps_levels else None,
+            "recorder": recorder,
+            "queueing": queueing,
+            "queries": sum(entry["queries"] for entry in per_worker),
+            "errors": [error for entry in per_worker for error in entry["errors"]],
+            "elapsed": max(entry["elapsed"] for entry in per_worker),
+            "cpu": [entry["cpu"] for entry in per_worker],
+            "results": [
+                QueryResult(0, query_type, duration_ms, 0, True, queue_ms=queue_ms, sent_at=sent_at, sfqid=sfqid)
+                for entry in per_worker
+                for sfqid, query_type, duration_ms, queue_ms, sent_at in entry["server_results"]
+            ],
+        })
+    return merged
+
+
+def run_distributed(args, connection_name: str, qps_levels: List[float] = None, workload: Dict = None):
+    """--processes N: run the closed-loop test or QPS sweep across worker processes and report the merged result"""
+    if qps_levels:
+        print(f"{args.warehouse.upper()} WAREHOUSE - open loop, {args.arrival} arrivals, {args.duration:.0f}s per level "
+              f"@ up to {args.threads} sessions in {args.processes} processes")
+    else:
+        print(f"{args.warehouse.upper()} WAREHOUSE - {args.queries} queries @ {args.threads} threads "
+              f"in {args.processes} processes")
+    print(f"{'-'*80}")
+    
+    run_started = time.time()
+    try:
+        levels = run_multiprocess(
+            args.warehouse, connection_name, args.processes, args.threads, args.window,
+            num_queries=args.queries, qps_levels=qps_levels, duration_s=args.duration, arrival=args.arrival,
+            workload=workload, binding=args.binding, server_timings=args.server_timings, engine=args.engine,
+        )
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        return
+    
+    if not qps_levels:
+        level = levels[0]
+        print(f"\nCompleted in {level['elapsed']:.1f}s")
+        print_client_cpu(level["cpu"])
+        print_report(level["recorder"], level["queries"], level["errors"])
+        recorders = {"closed": level["recorder"]}
+        if args.server_timings:
+            recorders.update(server_timings({"": level["results"]}, connection_name, run_started, args.window))
+        save_outputs(args, recorders, {"queries": args.queries, "processes": args.processes})
+        return
+    
+    curve = []
+    for level in levels:
+        point = curve_point(
+            level["target_qps"], level["elapsed"], level["queries"], len(level["errors"]), level["cpu"],
+            level["recorder"], level["queueing"],
+        )
+        curve.append(point)
+        print_curve_point(point)
+    print_latency_curve(curve, args.warehouse)
+    recorders = {f"{point['target_qps']:g} qps": point.pop("recorder") for point in curve}
+    if args.server_timings:
+        results = {f"{level['target_qps']:g} qps": level["results"] for level in levels}
+        recorders.update(server_timings(results, connection_name, run_started, args.window))
+    save_outputs(args, recorders, {"arrival": args.arrival, "duration_s": args.duration, "curve": curve,
+                                   "processes": args.processes})
@@ -0,0 +1,157 @@
+"""
+Server-Side Timings from QUERY_HISTORY
+======================================
+Purpose: Split client-measured latency into queueing, compilation, execution
+and network/client overhead
+
+The load tester records each query's id (cursor.sfqid). After a run,
+fetch_query_timings() looks them up in INFORMATION_SCHEMA.QUERY_HISTORY - the
+ids are bound as a single JSON array - and component_times() combines a row
+with the client latency:
+
+    client wait    open loop: time waiting for a free client session
+    queued         QUEUED_PROVISIONING + QUEUED_REPAIR + QUEUED_OVERLOAD time
+    compilation    COMPILATION_TIME
+    execution      EXECUTION_TIME
+    network+client the rest of the client latency after TOTAL_ELAPSED_TIME
+
+The table function returns at most 10,000 rows per call (every query of the
+user in the time range, before the id filter), so the run is read in time
+slices: a slice that comes back full is split in half and read again.
+History can also trail a query by a few seconds, so the lookup is retried
+briefly for ids that have not shown up yet; callers report what is still
+unmatched.
+
+No third-party imports.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+HISTORY_WAREHOUSE = "automated_intelligence_wh"
+RESULT_LIMIT = 10000
+# Slices are not split below this width (ms); a full slice that narrow is reported as truncated
+MIN_SLICE_MS = 1000
+
+COMPONENTS = ["client wait", "queued", "compilation", "execution", "network+client"]
+
+# One row per matching query plus the slice's unfiltered row count (one row
+# with NULL query_id when nothing matched), so a full slice is detectable
+HISTORY_SQL = """
+    WITH history AS (
+        SELECT *
+        FROM TABLE(automated_intelligence.INFORMATION_SCHEMA.QUERY_HISTORY(
+            END_TIME_RANGE_START => TO_TIMESTAMP_LTZ(?, 3),
+            END_TIME_RANGE_END => TO_TIMESTAMP_LTZ(?, 3),
+            RESULT_LIMIT => {limit}
+        ))
+    ),
+    matched AS (
+        SELECT
+            query_id,
+            warehouse_name,
+            queued_provisioning_time + queued_repair_time + queued_overload_time AS queued_ms,
+            compilation_time AS compilation_ms,
+            execution_time AS execution_ms,
+            total_elapsed_time AS total_ms
+        FROM history
+        WHERE query_id IN (SELECT value::STRING FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))))
+    )
+    SELECT m.*, c.slice_rows
+    FROM (SELECT COUNT(*) AS slice_rows FROM history) c
+    LEFT JOIN matched m ON TRUE
+"""
+
+
+class HistoryLookup:
+    """Outcome of fetch_query_timings: the timings found and whether any slice was cut off"""
+
+    def __init__(self):
+        self.timings: Dict[str, Dict] = {}
+        self.truncated = False
+
+
+def _read_slices(cursor, wanted: set, start_ms: int, end_ms: int, lookup: HistoryLookup):
+    slices = [(start_ms, end_ms)]
+    while slices and wanted - lookup.timings.keys():
+        slice_start, slice_end = slices.pop()
+        remaining = sorted(wanted - lookup.timings.keys())
+        cursor.execute(HISTORY_SQL.format(limit=RESULT_LIMIT), (slice_start, slice_end, json.dumps(remaining)))
+        rows = cursor.fetchall()
+        slice_rows = rows[0][-1] if rows else 0
+        if slice_rows >= RESULT_LIMIT and slice_end - slice_start > MIN_SLICE_MS:
+            middle = (slice_start + slice_end) // 2
+            slices += [(slice_start, middle), (middle, slice_end)]
+            continue
+        if slice_rows >= RESULT_LIMIT:
+            lookup.truncated = True
+        for query_id, warehouse, queued, compilation, execution, total, _ in rows:
+            if query_id is None:
+                continue
+            lookup.timings[query_id] = {
+                "warehouse": warehouse,
+                "queued_ms": queued or 0,
+                "compilation_ms": compilation or 0,
+                "execution_ms": execution or 0,
+                "total_ms": total or 0,
+            }
+
+
+def fetch_query_timings(
+    conn,
+    query_ids: Sequence[str],
+    since: float,
+    until: Optional[float] = None,
+    warehouse: Optional[str] = None,
+    timeout: float = 30.0,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.time,
+) -> HistoryLookup:
+    """
+    Timings (query_id -> {"warehouse", "queued_ms", "compilation_ms",
+    "execution_ms", "total_ms"}) for the given ids, from queries that ended
+    between `since` and `until` (epoch seconds; `until` defaults to now).
+    The connection must use paramstyle="qmark". With `warehouse`, the lookup
+    runs there and the session's previous warehouse is restored afterwards.
+    """
+    lookup = HistoryLookup()
+    wanted = set(query_ids)
+    if not wanted:
+        return lookup
+    start_ms = int(since * 1000) - 1000
+    cursor = conn.cursor()
+    previous_warehouse = None
+    try:
+        if warehouse:
+            cursor.execute("SELECT CURRENT_WAREHOUSE()")
+            previous_warehouse = cursor.fetchall()[0][0]
+            cursor.execute(f"USE WAREHOUSE {warehouse}")
+        deadline = clock() + timeout
+        while True:
+            end_ms = int((until or clock()) * 1000) + 1000
+            _read_slices(cursor, wanted, start_ms, end_ms, lookup)
+            if len(lookup.timings) >= len(wanted) or lookup.truncated or clock() >= deadline:
+                return lookup
+            sleep(2)
+    finally:
+        try:
+            if previous_warehouse:
+                cursor.execute(f"USE WAREHOUSE {previous_warehouse}")
+        finally:
+            cursor.close()
+
+
+def component_times(client_ms: float, timing: Dict, client_wait_ms: float = 0.0) -> Dict[str, float]:
+    """Per-component milliseconds for one query (see module docstring)"""
+    return {
+        "client wait": client_wait_ms,
+        "queued": timing["queued_ms"],
+        "compilation": timing["compilation_ms"],
+        "execution": timing["execution_ms"],
+        "network+client": max(0.0, client_ms - client_wait_ms - timing["total_ms"]),
+    }
+
+
+def unmatched(query_ids: List[Optional[str]], timings: Dict[str, Dict]) -> int:
+    return sum(1 for query_id in query_ids if query_id and query_id not in timings)
@@ -17,6 +17,7 @@ Flow:
 
 Usage:
     python realtime_demo.py --monitor-pipeline
+    python realtime_demo.py --wait-dynamic-tables
     
 Note: Order generation now uses Snowpipe Streaming.
 See snowpipe-streaming-java/ or snowpipe-streaming-python/ directories.
@@ -30,6 +31,9 @@ from typing import Optional
 
 import snowflake.connector
 
+from async_engine import AsyncQueryEngine
+from dt_refresh import DynamicTableRefreshWaiter
+
 
 class RealtimePipelineDemo:
     def __init__(self, connection_name: str):
@@ -39,7 +43,8 @@ class RealtimePipelineDemo:
     def connect(self):
         """Establish connection to Snowflake"""
         if not self.conn:
-            self.conn = snowflake.connector.connect(connection_name=self.connection_name)
+            # qmark: ? placeholders are bound server-side instead of interpolated into the text
+            self.conn = snowflake.connector.connect(connection_name=self.connection_name, paramstyle="qmark")
         return self.conn
     
     def close(self):
@@ -48,11 +53,11 @@ class RealtimePipelineDemo:
             self.conn.close()
             self.conn = None
     
-    def execute_query(self, sql: str, fetch: bool = True):
-        """Execute a query and optionally fetch results"""
+    def execute_query(self, sql: str, fetch: bool = True, params: tuple = None):
+        """Execute a query (with ? bind parameters) and optionally fetch results"""
         conn = self.connect()
         cursor = conn.cursor()
-        cursor.execute(sql)
+        cursor.execute(sql, params)
         
         if fetch:
             results = cursor.fetchall()
@@ -62,6 +67,18 @@ class RealtimePipelineDemo:
             cursor.close()
             return None
     
+    def execute_concurrently(self, statements: list) -> list:
+        """
+        Run (sql, warehouse) statements at the same time on this connection with
+        execute_async + status polling; returns each one's rows in order
+        """
+        engine = AsyncQueryEngine([self.connect()], io_threads=len(statements))
+        outcomes = engine.run([(sql, None, None, warehouse) for sql, warehouse in statements])
+        for outcome in outcomes:
+            if outcome.error is not None:
+                raise RuntimeError(outcome.error)
+        return [outcome.rows for outcome in outcomes]
+    
     def get_latest_order_id(self):
         """Get the latest order_id from raw.orders table"""
         print(f"\n{'='*80}")
@@ -81,35 +98,47 @@ class RealtimePipelineDemo:
         
         return latest_order_id
     
-    def monitor_dynamic_tables_refresh(self, latest_order_id: int, timeout: int = 600):
+    def monitor_dynamic_tables_refresh(self, latest_order_id: int, timeout: int = 600, trigger: bool = True):
         """Monitor Dynamic Tables for new data"""
         print(f"\n{'='*80}")
         print(f"STEP 2: Monitor Dynamic Tables Refresh")
         print(f"{'='*80}")
         print(f"\n⏳ Waiting for order_id {latest_order_id} to appear in dynamic_tables.fact_orders...")
-        print(f"   (TARGET_LAG = 12 hours, but may refresh sooner)\n")
+        if trigger:
+            print(f"   (triggering a manual refresh instead of waiting for TARGET_LAG)\n")
+        else:
+            print(f"   (TARGET_LAG = 12 hours, but may refresh sooner)\n")
         
         # Use standard warehouse for querying standard tables
         self.execute_query("USE WAREHOUSE automated_intelligence_wh", fetch=False)
         
-        start_time = time.time()
+        # Returns once FACT_ORDERS' data timestamp passes "now", i.e. it
+        # includes everything ingested so far - no fixed 5s polling
+        waiter = DynamicTableRefreshWaiter(
+            self.connect(), "automated_intelligence", "dynamic_tables", ["ENRICHED_ORDERS", "FACT_ORDERS"]
+        )
+        result = waiter.wait(
+            timeout,
+            trigger=trigger,
+            on_progress=lambda elapsed, refreshed, pending: print(
+                f"   Checking... (elapsed: {int(elapsed)}s, pending: {', '.join(sorted(pending)) or 'none'})",
+                end="\r",
+            ),
+        )
+        for table, error in result["trigger_errors"].items():
+            print(f"\n⚠️  Manual refresh of {table} failed: {error}")
         
-        while (time.time() - start_time) < timeout:
-            result = self.execute_query(f"""
+        if not result["timed_out"]:
+            count = self.execute_query("""
                 SELECT COUNT(*) 
                 FROM automated_intelligence.dynamic_tables.fact_orders
-                WHERE order_id = {latest_order_id}
-            """)
-            
-            count = result[0][0]
-            
+                WHERE order_id = ?
+            """, params=(latest_order_id,))[0][0]
             if count > 0:
-                elapsed = time.time() - start_time
-                print(f"✅ Order {latest_order_id} appeared in Dynamic Tables after {elapsed:.2f} seconds")
+                print(f"\n✅ Order {latest_order_id} appeared in Dynamic Tables after {result['elapsed_seconds']:.2f} seconds")
                 return True
-            
-            print(f"   Checking... (elapsed: {int(time.time() - start_time)}s)", end="\r")
-            time.sleep(5)
+            print(f"\n⚠️  Dynamic Tables refreshed but order {latest_order_id} is not in fact_orders")
+            return False
         
         print(f"\n⚠️  Timeout: Order did not appear in Dynamic Tables within {timeout}s")
         return False
@@ -128,11 +157,11 @@ class RealtimePipelineDemo:
         start_time = time.time()
         
         while (time.time() - start_time) < timeout:
-            result = self.execute_query(f"""
+            result = self.execute_query("""
                 SELECT COUNT(*) 
                 FROM automated_intelligence.interactive.order_lookup
-                WHERE order_id = {latest_order_id}
-            """)
+                WHERE order_id = ?
+            """, params=(latest_order_id,))
             
             count = result[0][0]
             
@@ -161,7 +190,8 @@ class RealtimePipelineDemo:
         for i in range(num_queries):
             start_time = time.time()
             
-            result = self.execute_query(f"""
+            # Same statement text every time, so the plan is reused across iterations
+            result = self.execute_query("""
                 SELECT 
                     order_id,
                     customer_id,
@@ -171,8 +201,8 @@ class RealtimePipelineDemo:
                     discount_percent,
                     shipping_cost
                 FROM automated_intelligence.interactive.order_lookup
-                WHERE order_id = {order_id}
-            """)
+                WHERE order_id = ?
+            """, params=(order_id,))
             
             latency_ms = (time.time() - start_time) * 1000
             latencies.append(latency_ms)
@@ -214,10 +244,9 @@ class RealtimePipelineDemo:
         print(f"Pipeline Statistics")
         print(f"{'='*80}\n")
         
-        # Use standard warehouse for querying standard tables
-        self.execute_query("USE WAREHOUSE automated_intelligence_wh", fetch=False)
-        
-        stats = self.execute_query("""
+        # Standard tables on the standard warehouse and interactive tables on the
+        # interactive one, both in flight at once
+        stats, interactive_stats = self.execute_concurrently([("""
             SELECT 
                 'Raw Orders' as layer,
                 COUNT(*) as row_count,
@@ -231,18 +260,13 @@ class RealtimePipelineDemo:
                 MAX(order_id),
                 MAX(order_date)
             FROM automated_intelligence.dynamic_tables.fact_orders
-        """)
-        
-        # Switch to interactive warehouse for interactive tables
-        self.execute_query("USE WAREHOUSE automated_intelligence_interactive_wh", fetch=False)
-        
-        interactive_stats = self.execute_query("""
+        """, "automated_intelligence_wh"), ("""
             SELECT 
                 COUNT(*) as row_count,
                 MAX(order_id) as max_order_id,
                 MAX(order_date) as latest_date
             FROM automated_intelligence.interactive.order_lookup
-        """)
+        """, "automated_intelligence_interactive_wh")])
         
         print(f"{'Layer':<40} {'Rows':>12} {'Max Order ID':>15} {'Latest Date':>20}")
         print(f"{'-'*90}")
@@ -310,6 +334,11 @@ def main():
         action="store_true",
         help="Show current pipeline statistics"
     )
+    parser.add_argument(
+        "--wait-dynamic-tables",
+        action="store_true",
+        help="Refresh Dynamic Tables and wait until the latest order reaches fact_orders"
+    )
     parser.add_argument(
         "--connection",
         type=str,
@@ -328,6 +357,11 @@ def main():
     
     if args.generate_orders:
         demo.run_full_demo(args.generate_orders)
+    elif args.wait_dynamic_tables:
+        try:
+            demo.monitor_dynamic_tables_refresh(demo.get_latest_order_id(), timeout=180)
+        finally:
+            demo.close()
     elif args.monitor_pipeline:
         demo.show_pipeline_stats()
         demo.close()
@@ -0,0 +1,293 @@
+"""
+Load Test Results and Reports
+=============================
+Purpose: Turn the load tester's per-query results into latency reports
+
+QueryResult is one timed query. record_results() histograms the successful
+ones per query type and time window (latency_histogram.py); the print_*
+functions write the RESULTS line and breakdowns, the open-loop latency curve,
+the SLO capacity point and the side-by-side --compare table, and
+save_outputs() handles --save / --csv.
+
+Client CPU is reported with every run: a load generator that saturates its
+core (GIL contention, result fetching) adds its own delay to every latency.
+
+--server-timings: server_timings() looks the run's query ids up in
+QUERY_HISTORY (query_history.py) and prints the per-component breakdown.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import snowflake.connector
+
+from slo_search import SloSearch
+from query_history import (
+    COMPONENTS, HISTORY_WAREHOUSE, RESULT_LIMIT, component_times, fetch_query_timings, unmatched,
+)
+from latency_histogram import (
+    PERCENTILES, LatencyHistogram, LatencyRecorder, compare_runs, save_run, write_csv,
+)
+
+# Client CPU use (fraction of one core per process) above which latencies are suspect
+CPU_SATURATION = 0.85
+
+
+@dataclass
+class QueryResult:
+    query_id: int
+    query_type: str
+    duration_ms: float
+    row_count: int
+    success: bool
+    error: str = None
+    queue_ms: float = 0.0  # open loop: intended send time -> query start
+    sent_at: float = None  # start of the measured latency (epoch seconds)
+    sfqid: str = None  # Snowflake query id, for QUERY_HISTORY lookups
+
+
+def cpu_fraction(cpu_start: float, elapsed: float) -> float:
+    """CPU time used by this process since `cpu_start`, as a fraction of one core over `elapsed`"""
+    return (time.process_time() - cpu_start) / elapsed if elapsed > 0 else 0.0
+
+
+def print_client_cpu(cpu_by_process: List[float]):
+    """Client CPU use per process, flagging saturation (latencies then include client-side delay)"""
+    busiest = max(cpu_by_process)
+    label = "Client CPU" if len(cpu_by_process) == 1 else f"Client CPU (busiest of {len(cpu_by_process)} processes)"
+    print(f"{label}: {busiest:.0%} of one core")
+    if busiest > CPU_SATURATION:
+        print(f"⚠️  Client CPU saturated: latencies include client-side delay "
+              f"(GIL contention, result fetching) - use more --processes or fewer threads per process")
+    cores = os.cpu_count() or 1
+    if len(cpu_by_process) > 1 and sum(cpu_by_process) > CPU_SATURATION * cores:
+        print(f"⚠️  Client host saturated: {sum(cpu_by_process):.1f} of {cores} cores busy")
+
+
+def curve_point(
+    qps: float, elapsed: float, queries: int, errors: int, cpu: List[float],
+    recorder: LatencyRecorder, queueing: LatencyHistogram,
+) -> Dict:
+    summary = recorder.overall.summary()
+    return {
+        "target_qps": qps,
+        "achieved_qps": (queries - errors) / elapsed if elapsed > 0 else 0.0,
+        "queries": queries,
+        "errors": errors,
+        "median_ms": summary["p50"],
+        "p95_ms": summary["p95"],
+        "p99_ms": summary["p99"],
+        "queue_p95_ms": queueing.percentile(95),
+        "client_cpu": max(cpu),
+        "recorder": recorder,
+    }
+
+
+def print_curve_point(point: Dict):
+    saturated = "  ⚠️ client CPU saturated" if point["client_cpu"] > CPU_SATURATION else ""
+    print(f"  {point['target_qps']:>7.1f} QPS target | {point['achieved_qps']:7.1f} achieved | "
+          f"median {format_ms(point['median_ms'])} | p95 {format_ms(point['p95_ms'])} | "
+          f"p99 {format_ms(point['p99_ms'])} | queue p95 {format_ms(point['queue_p95_ms'])} | "
+          f"{point['errors']} errors | client CPU {point['client_cpu']:.0%}{saturated}")
+
+
+def record_results(
+    results: List[QueryResult], window_s: float = 10.0, latency: str = "duration_ms", started_at: float = None
+) -> LatencyRecorder:
+    """Histogram the successful queries' `latency` field per query type and time window"""
+    recorder = LatencyRecorder(window_s, started_at)
+    for result in sorted((r for r in results if r.success), key=lambda r: r.sent_at or 0):
+        recorder.record(result.query_type, getattr(result, latency), result.sent_at)
+    return recorder
+
+
+def format_ms(value: float) -> str:
+    return f"{value:7.0f}ms" if value is not None else "      -  "
+
+
+def print_latency_curve(curve: List[Dict], warehouse_type: str):
+    """Throughput-vs-latency table for a QPS sweep"""
+    print(f"\nLATENCY CURVE ({warehouse_type}):")
+    print(f"  {'target QPS':>10} {'achieved':>9} {'median':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for point in curve:
+        print(f"  {point['target_qps']:>10.1f} {point['achieved_qps']:>9.1f} {format_ms(point['median_ms'])} "
+              f"{format_ms(point['p95_ms'])} {format_ms(point['p99_ms'])} {point['errors']:>7}")
+    print(f"{'-'*80}\n")
+
+
+def print_capacity(search: SloSearch, warehouse_type: str):
+    """The capacity point found by an SLO search"""
+    best = search.best
+    if best is None:
+        print(f"❌ CAPACITY ({warehouse_type}): {search.describe()} not met even at {search.start_qps:g} QPS "
+              f"({search.first_failure['slo_violation']})")
+    else:
+        limit = f" - still within the SLO at --qps-max {search.max_qps:g}"
+        if search.first_failure is not None:
+            limit = f" - breaks at {search.first_failure['target_qps']:g} QPS ({search.first_failure['slo_violation']})"
+        print(f"CAPACITY ({warehouse_type}): {best['achieved_qps']:.1f} QPS under {search.describe()} "
+              f"(target {best['target_qps']:g} QPS: p95 {format_ms(best['p95_ms']).strip()}, "
+              f"p99 {format_ms(best['p99_ms']).strip()}){limit}")
+    print()
+
+
+def print_breakdown(recorder: LatencyRecorder):
+    """Percentiles per query type and per time window"""
+    names = [name for name, _ in PERCENTILES] + ["max"]
+    print(f"  {'':<22} {'count':>6} " + " ".join(f"{name:>9}" for name in names))
+    scope_titles = {"query_type": "By query type:", "window": f"By {recorder.window_s:g}s window:"}
+    current_scope = None
+    for scope, key, summary in recorder.rows():
+        if scope == "overall":
+            continue
+        if scope != current_scope:
+            print(f"  {scope_titles[scope]}")
+            current_scope = scope
+        print(f"    {key:<20} {summary['count']:>6} " + " ".join(format_ms(summary[name]).rstrip() for name in names))
+
+
+def analyze_results(results: List[QueryResult], warehouse_type: str, window_s: float = 10.0) -> LatencyRecorder:
+    """Analyze and print test results"""
+    recorder = record_results(results, window_s)
+    errors = [f"#{r.query_id}: {r.error}" for r in results if not r.success]
+    print_report(recorder, len(results), errors)
+    return recorder
+
+
+def print_report(recorder: LatencyRecorder, total: int, errors: List[str]):
+    """RESULTS line, per-type/per-window breakdown and a sample of errors"""
+    if not recorder.overall.count:
+        print("❌ All queries failed!")
+        for error in errors[:5]:
+            print(f"  Error: {error}")
+        return
+    
+    summary = recorder.overall.summary()
+    
+    print(f"\nRESULTS: {recorder.overall.count}/{total} success | P95: {summary['p95']:.2f} ms | Median: {summary['p50']:.0f}ms | Avg: {summary['mean']:.0f}ms")
+    print(f"{'-'*80}")
+    print_breakdown(recorder)
+    print()
+    
+    if errors:
+        print(f"⚠️  {len(errors)} queries failed:")
+        for error in errors[:3]:
+            print(f"  {error}")
+        if len(errors) > 3:
+            print(f"  ... and {len(errors) - 3} more")
+
+
+def print_comparison(baseline: Dict, candidate: Dict):
+    """Side-by-side percentiles of two saved runs (candidate / baseline ratio)"""
+    base_name = baseline.get("warehouse", "baseline")
+    cand_name = candidate.get("warehouse", "candidate")
+    report = compare_runs(baseline, candidate)
+    if not report:
+        print("❌ The two runs have no mode or QPS level in common to compare")
+        return
+    print(f"COMPARISON: {base_name} (baseline) vs {cand_name}")
+    print(f"{'-'*80}")
+    current_label = None
+    for entry in report:
+        if entry["label"] != current_label:
+            current_label = entry["label"]
+            print(f"  {current_label}:")
+        cells = []
+        for name in ("p50", "p95", "p99", "max"):
+            base, cand, ratio = entry[name]
+            ratio_text = f" ({ratio:.2f}x)" if ratio is not None else ""
+            cells.append(f"{name} {format_ms(base).strip()} → {format_ms(cand).strip()}{ratio_text}")
+        print(f"    {entry['query_type']:<18} " + " | ".join(cells))
+    print(f"{'-'*80}\n")
+
+
+def save_outputs(args, recorders: Dict[str, LatencyRecorder], extra: Dict = None):
+    """--save (JSON, reloadable for --compare) and --csv exports"""
+    if args.save:
+        run = {
+            "warehouse": args.warehouse,
+            "mode": args.mode,
+            "threads": args.threads,
+            "window_s": args.window,
+            "recorders": recorders,
+            **(extra or {}),
+        }
+        save_run(args.save, run)
+        print(f"Saved run to {args.save}")
+    if args.csv:
+        write_csv(args.csv, list(recorders.items()))
+        print(f"Saved percentiles to {args.csv}")
+
+
+def server_timings(
+    groups: Dict[str, List[QueryResult]], connection_name: str, since: float, window_s: float = 10.0
+) -> Dict[str, LatencyRecorder]:
+    """
+    --server-timings: look every successful query of `groups` (title -> results,
+    e.g. one per QPS level) up in QUERY_HISTORY at once, then print and return
+    a component breakdown per group and warehouse.
+    """
+    query_ids = [r.sfqid for results in groups.values() for r in results if r.success and r.sfqid]
+    try:
+        conn = snowflake.connector.connect(connection_name=connection_name, paramstyle="qmark")
+        try:
+            lookup = fetch_query_timings(conn, query_ids, since, warehouse=HISTORY_WAREHOUSE)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️  Could not read QUERY_HISTORY for server-side timings: {e}")
+        return {}
+    
+    missing = unmatched(query_ids, lookup.timings)
+    print(f"\nSERVER-SIDE BREAKDOWN (QUERY_HISTORY: {len(query_ids) - missing}/{len(query_ids)} queries matched)")
+    print(f"{'-'*80}")
+    if lookup.truncated:
+        print(f"⚠️  More than {RESULT_LIMIT:,} queries ended within one second in QUERY_HISTORY; some were cut off")
+    if missing:
+        print(f"⚠️  {missing} queries not found in QUERY_HISTORY (it can trail by a few seconds) - "
+              f"the breakdown covers the matched ones only")
+    recorders = {}
+    for title, results in groups.items():
+        recorders.update(print_server_breakdown(title, results, lookup.timings, window_s))
+    print(f"{'-'*80}\n")
+    return recorders
+
+
+def print_server_breakdown(
+    title: str, results: List[QueryResult], timings: Dict[str, Dict], window_s: float
+) -> Dict[str, LatencyRecorder]:
+    """
+    Histogram each latency component per warehouse. Recorders are labelled
+    "<title> server <component>", plus " @ <warehouse>" when the group spans
+    several warehouses (one warehouse: standard and interactive runs line up
+    under --compare).
+    """
+    by_warehouse: Dict[str, Dict[str, LatencyRecorder]] = {}
+    for result in results:
+        timing = timings.get(result.sfqid) if result.success else None
+        if timing is None:
+            continue
+        components = by_warehouse.setdefault(
+            timing["warehouse"], {component: LatencyRecorder(window_s) for component in COMPONENTS})
+        for component, ms in component_times(result.duration_ms, timing, result.queue_ms).items():
+            components[component].record(result.query_type, ms, result.sent_at)
+    
+    recorders = {}
+    for warehouse, components in sorted(by_warehouse.items()):
+        means = {component: recorder.overall.mean_ms for component, recorder in components.items()}
+        total_mean = sum(means.values()) or 1.0
+        heading = f"{title} on {warehouse}" if title else warehouse
+        print(f"  {heading:<28} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9} {'share':>7}")
+        for component, recorder in components.items():
+            histogram = recorder.overall
+            if component == "client wait" and not histogram.max_ms:
+                continue  # closed loop: queries never wait for a session
+            print(f"    {component:<26} {format_ms(histogram.percentile(50))} {format_ms(histogram.percentile(95))} "
+                  f"{format_ms(histogram.percentile(99))} {format_ms(histogram.mean_ms)} {means[component] / total_mean:>7.0%}")
+            label = f"{title} server {component}".strip()
+            if len(by_warehouse) > 1:
+                label += f" @ {warehouse}"
+            recorders[label] = recorder
+    return recorders
@@ -0,0 +1,205 @@
+"""
+Load Test Scenarios
+===================
+Purpose: Declare query mixes and load phases instead of hard-coding them
+
+A scenario file (JSON, or YAML when PyYAML is installed) lists weighted query
+templates and the phases to run them in:
+
+    {
+      "name": "lookup-mix",
+      "warehouse": "interactive",          # default; --warehouse overrides
+      "sessions": 50,                      # pooled sessions per warehouse (rate phases)
+      "arrival": "poisson",                # or "constant" (rate phases)
+      "queries": [
+        {
+          "name": "customer_lookup",
+          "weight": 50,
+          "sql": "SELECT * FROM {table} WHERE customer_id = {customer_id} LIMIT 10",
+          "tables": {
+            "standard": "automated_intelligence.raw.orders",
+            "interactive": "automated_intelligence.interactive.customer_order_analytics"
+          },
+          "warehouse": "standard"           # optional: always run this one on that warehouse
+        }
+      ],
+      "phases": [
+        {"name": "warm-up", "duration": 30, "concurrency": 10, "warmup": true},
+        {"name": "ramp",    "duration": 60, "rate": [10, 100]},
+        {"name": "steady",  "duration": 120, "rate": 100},
+        {"name": "spike",   "duration": 20, "concurrency": 200}
+      ]
+    }
+
+Templates may use {table} (the target table for the warehouse the query runs
+on) and the keys {customer_id} / {order_id}, which are filled from the load
+test's workload (literal or bound). A phase has either a closed-loop
+`concurrency` or an open-loop `rate` in queries/second - a number, or
+[start, end] for a linear ramp. Warm-up phases are reported but left out of
+the totals.
+"""
+
+import json
+import random
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+WAREHOUSE_TYPES = ["standard", "interactive"]
+TEMPLATE_FIELDS = {"table", "customer_id", "order_id"}
+
+
+@dataclass
+class QueryTemplate:
+    name: str
+    sql: str
+    weight: float = 1.0
+    tables: Dict[str, str] = field(default_factory=dict)
+    warehouse: Optional[str] = None
+
+    @property
+    def fields(self) -> List[str]:
+        return [name for _, name, _, _ in Formatter().parse(self.sql) if name is not None]
+
+
+@dataclass
+class Phase:
+    name: str
+    duration: float
+    concurrency: Optional[int] = None
+    rate: Optional[Tuple[float, float]] = None
+    warmup: bool = False
+
+    @property
+    def mode(self) -> str:
+        return "closed" if self.concurrency is not None else "open"
+
+    def describe(self) -> str:
+        if self.concurrency is not None:
+            return f"{self.concurrency} concurrent"
+        start, end = self.rate
+        return f"{start:g} QPS" if start == end else f"{start:g}→{end:g} QPS"
+
+
+@dataclass
+class Scenario:
+    name: str
+    queries: List[QueryTemplate]
+    phases: List[Phase]
+    warehouse: Optional[str] = None
+    sessions: int = 50
+    arrival: str = "poisson"
+
+    def pick(self, rng=random) -> QueryTemplate:
+        return rng.choices(self.queries, weights=[q.weight for q in self.queries])[0]
+
+    def warehouses(self, default: str) -> List[str]:
+        """Warehouse types the scenario touches when run against `default`"""
+        return sorted({q.warehouse or default for q in self.queries})
+
+    def session_count(self) -> int:
+        """Sessions to open per warehouse: enough for the largest closed-loop phase"""
+        return max([self.sessions] + [p.concurrency for p in self.phases if p.concurrency is not None])
+
+    def validate_for(self, warehouse_type: str):
+        """Raise ValueError if a template can't run when the scenario targets `warehouse_type`"""
+        for query in self.queries:
+            target = query.warehouse or warehouse_type
+            if "table" in query.fields and target not in query.tables:
+                raise ValueError(f"Query {query.name!r} has no table for the {target} warehouse")
+
+
+def arrival_offsets(phase: Phase, arrival: str = "poisson", rng=random) -> List[float]:
+    """Send times (seconds from phase start) for an open-loop phase, following its (ramped) rate"""
+    start, end = phase.rate
+    offsets = []
+    offset = 0.0
+    while True:
+        rate = start + (end - start) * offset / phase.duration
+        offset += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        if offset >= phase.duration:
+            return offsets
+        offsets.append(offset)
+
+
+def _parse_query(data: Dict) -> QueryTemplate:
+    query = QueryTemplate(
+        name=data["name"],
+        sql=data["sql"],
+        weight=float(data.get("weight", 1.0)),
+        tables=dict(data.get("tables", {})),
+        warehouse=data.get("warehouse"),
+    )
+    unknown = set(query.fields) - TEMPLATE_FIELDS
+    if unknown:
+        raise ValueError(f"Query {query.name!r} uses unknown placeholders: {', '.join(sorted(unknown))}")
+    if query.weight <= 0:
+        raise ValueError(f"Query {query.name!r} needs a positive weight")
+    if query.warehouse is not None and query.warehouse not in WAREHOUSE_TYPES:
+        raise ValueError(f"Query {query.name!r}: warehouse must be one of {WAREHOUSE_TYPES}")
+    return query
+
+
+def _parse_phase(data: Dict) -> Phase:
+    name = data["name"]
+    if ("concurrency" in data) == ("rate" in data):
+        raise ValueError(f"Phase {name!r} needs either 'concurrency' or 'rate'")
+    rate = data.get("rate")
+    if rate is not None:
+        start, end = (rate, rate) if isinstance(rate, (int, float)) else rate
+        rate = (float(start), float(end))
+        if min(rate) <= 0:
+            raise ValueError(f"Phase {name!r}: rates must be positive")
+    concurrency = data.get("concurrency")
+    if concurrency is not None and int(concurrency) < 1:
+        raise ValueError(f"Phase {name!r}: concurrency must be at least 1")
+    phase = Phase(
+        name=name,
+        duration=float(data["duration"]),
+        concurrency=int(concurrency) if concurrency is not None else None,
+        rate=rate,
+        warmup=bool(data.get("warmup", False)),
+    )
+    if phase.duration <= 0:
+        raise ValueError(f"Phase {name!r}: duration must be positive")
+    return phase
+
+
+def parse_scenario(data: Dict) -> Scenario:
+    if not data.get("queries"):
+        raise ValueError("Scenario has no queries")
+    if not data.get("phases"):
+        raise ValueError("Scenario has no phases")
+    scenario = Scenario(
+        name=data.get("name", "scenario"),
+        queries=[_parse_query(q) for q in data["queries"]],
+        phases=[_parse_phase(p) for p in data["phases"]],
+        warehouse=data.get("warehouse"),
+        sessions=int(data.get("sessions", 50)),
+        arrival=data.get("arrival", "poisson"),
+    )
+    if scenario.warehouse is not None and scenario.warehouse not in WAREHOUSE_TYPES:
+        raise ValueError(f"Scenario warehouse must be one of {WAREHOUSE_TYPES}")
+    if scenario.arrival not in ("poisson", "constant"):
+        raise ValueError("Scenario arrival must be 'poisson' or 'constant'")
+    return scenario
+
+
+def load_scenario(path: str) -> Scenario:
+    """Read and validate a scenario file (.json, or .yaml/.yml with PyYAML installed)"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("YAML scenarios need PyYAML (pip install pyyaml); or use JSON")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    try:
+        return parse_scenario(data)
+    except KeyError as e:
+        raise ValueError(f"Scenario is missing required field {e}")
@@ -0,0 +1,132 @@
+"""
+Scenario Runner
+===============
+Purpose: Run a declarative load scenario (scenario.py) phase by phase
+
+Each phase runs on sessions opened once per target warehouse before the
+first phase: closed-loop phases keep `concurrency` threads issuing queries
+back to back until the phase ends, open-loop phases send queries at the
+phase's (possibly ramped) rate. Latency and throughput are reported per
+phase; warm-up phases are left out of the totals.
+"""
+
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from load_tester import LoadTester
+from workload import Workload
+from scenario import Phase, Scenario, arrival_offsets
+from latency_histogram import LatencyRecorder
+from report import (
+    CPU_SATURATION, QueryResult, cpu_fraction, format_ms, print_breakdown, print_report, record_results,
+    save_outputs, server_timings,
+)
+
+
+def run_phase(
+    scenario: Scenario, phase: Phase, testers: Dict[str, LoadTester], target: str, sessions: int
+) -> Tuple[List[QueryResult], float, float]:
+    """
+    One scenario phase: `concurrency` threads issuing queries back to back
+    until the phase ends, or queries sent at the phase's (ramped) rate.
+    Returns the results, wall-clock seconds and client CPU use.
+    """
+    query_ids = itertools.count(1)
+    
+    def next_query(intended_at: float = None) -> QueryResult:
+        template = scenario.pick()
+        tester = testers[template.warehouse or target]
+        sql, params = tester.scenario_query(template)
+        return tester.execute_query(next(query_ids), template.name, sql, params, intended_at)
+    
+    start_time = time.time()
+    cpu_start = time.process_time()
+    if phase.concurrency is not None:
+        end_time = start_time + phase.duration
+        
+        def closed_loop_worker() -> List[QueryResult]:
+            results = []
+            while time.time() < end_time:
+                results.append(next_query())
+            return results
+        
+        with ThreadPoolExecutor(max_workers=phase.concurrency) as executor:
+            futures = [executor.submit(closed_loop_worker) for _ in range(phase.concurrency)]
+            results = [result for future in futures for result in future.result()]
+    else:
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            futures = []
+            for offset in arrival_offsets(phase, scenario.arrival):
+                intended_at = start_time + offset
+                delay = intended_at - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(next_query, intended_at))
+            results = [future.result() for future in futures]
+    elapsed = time.time() - start_time
+    return results, elapsed, cpu_fraction(cpu_start, elapsed)
+
+
+def run_scenario(scenario: Scenario, args, connection_name: str, workload: Dict = None):
+    """--scenario: run each phase in order on pooled sessions and report latency and throughput per phase"""
+    target = args.warehouse
+    sessions = scenario.session_count()
+    print(f"SCENARIO {scenario.name} - {target.upper()} WAREHOUSE, {len(scenario.phases)} phases, "
+          f"{sessions} sessions per warehouse")
+    print(f"{'-'*80}")
+    
+    testers = {
+        warehouse_type: LoadTester(
+            warehouse_type, connection_name,
+            Workload.from_file(workload["key_file"], **workload["options"]) if workload else None,
+            args.binding,
+        )
+        for warehouse_type in scenario.warehouses(target)
+    }
+    recorders = {}
+    summaries = []
+    total = LatencyRecorder(args.window)
+    total_queries = 0
+    total_errors = []
+    measured_results = []
+    run_started = time.time()
+    try:
+        for tester in testers.values():
+            tester.open_sessions_and_report(sessions)
+        print()
+        for phase in scenario.phases:
+            results, elapsed, cpu = run_phase(scenario, phase, testers, target, sessions)
+            recorder = record_results(results, args.window, started_at=time.time() - elapsed)
+            errors = [f"[{phase.name}] #{r.query_id}: {r.error}" for r in results if not r.success]
+            summary = recorder.overall.summary()
+            achieved = recorder.overall.count / elapsed if elapsed > 0 else 0.0
+            summaries.append({
+                "phase": phase.name, "load": phase.describe(), "warmup": phase.warmup,
+                "queries": len(results), "errors": len(errors), "achieved_qps": achieved,
+                "p50_ms": summary["p50"], "p95_ms": summary["p95"], "p99_ms": summary["p99"], "max_ms": summary["max"],
+                "client_cpu": cpu,
+            })
+            recorders[phase.name] = recorder
+            saturated = "  ⚠️ client CPU saturated" if cpu > CPU_SATURATION else ""
+            warmup = "  (warm-up, not in totals)" if phase.warmup else ""
+            print(f"  {phase.name:<12} {phase.describe():<16} | {achieved:7.1f} QPS | p50 {format_ms(summary['p50'])} | "
+                  f"p95 {format_ms(summary['p95'])} | p99 {format_ms(summary['p99'])} | "
+                  f"max {format_ms(summary['max'])} | {len(errors)} errors{saturated}{warmup}")
+            if not phase.warmup:
+                total.merge(recorder)
+                total_queries += len(results)
+                total_errors.extend(errors)
+                measured_results.extend(results)
+    finally:
+        for tester in testers.values():
+            tester.close_sessions()
+    
+    for name, recorder in recorders.items():
+        print(f"\nPhase {name}:")
+        print_breakdown(recorder)
+    print_report(total, total_queries, total_errors)
+    if args.server_timings:
+        recorders.update(server_timings({"": measured_results}, connection_name, run_started, args.window))
+    save_outputs(args, recorders, {"mode": "scenario", "scenario": scenario.name, "phases": summaries})
@@ -0,0 +1,106 @@
+"""
+SLO Capacity Search
+===================
+Purpose: Find the highest arrival rate a warehouse sustains under a latency SLO
+
+SloSearch decides which QPS level to measure next from the levels measured so
+far; the load tester runs each level open loop and hands back its curve point
+(p95/p99 from the level's latency histogram, errors, achieved throughput).
+
+- step:   start, start + step, start + 2*step, ... until a level breaks the SLO
+- binary: start, 2*start, 4*start, ... until a level breaks the SLO, then
+          bisect between the last passing and the first failing rate until
+          they are within `precision` of each other
+
+A level breaks the SLO when its p95 (or p99, if given) is over target or more
+than `max_error_rate` of its queries fail. Open-loop latency runs from each
+query's intended send time, so a rate the warehouse can't keep up with shows
+up as growing latency rather than as a quietly lower throughput. The capacity
+point is the highest passing level.
+
+No third-party imports.
+"""
+
+from typing import Dict, List, Optional
+
+SEARCH_MODES = ["binary", "step"]
+
+
+class SloSearch:
+    def __init__(
+        self,
+        p95_ms: float,
+        p99_ms: Optional[float] = None,
+        start_qps: float = 10.0,
+        max_qps: float = 1000.0,
+        mode: str = "binary",
+        step_qps: Optional[float] = None,
+        precision: float = 0.05,
+        max_error_rate: float = 0.01,
+    ):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r} (expected one of {SEARCH_MODES})")
+        if start_qps <= 0 or max_qps < start_qps:
+            raise ValueError("Need 0 < start QPS <= max QPS")
+        self.p95_ms = p95_ms
+        self.p99_ms = p99_ms
+        self.start_qps = start_qps
+        self.max_qps = max_qps
+        self.mode = mode
+        self.step_qps = step_qps or start_qps
+        self.precision = precision
+        self.max_error_rate = max_error_rate
+        self.points: List[Dict] = []
+        self.best: Optional[Dict] = None  # highest passing point
+        self.first_failure: Optional[Dict] = None  # lowest failing point
+
+    def describe(self) -> str:
+        target = f"p95 <= {self.p95_ms:g}ms"
+        if self.p99_ms is not None:
+            target += f", p99 <= {self.p99_ms:g}ms"
+        return target
+
+    def violation(self, point: Dict) -> Optional[str]:
+        """Why `point` breaks the SLO, or None if it meets it"""
+        if not point["queries"] or point["p95_ms"] is None:
+            return "no successful queries"
+        if point["errors"] / point["queries"] > self.max_error_rate:
+            return f"{point['errors']}/{point['queries']} errors"
+        if point["p95_ms"] > self.p95_ms:
+            return f"p95 {point['p95_ms']:.0f}ms > {self.p95_ms:g}ms"
+        if self.p99_ms is not None and point["p99_ms"] > self.p99_ms:
+            return f"p99 {point['p99_ms']:.0f}ms > {self.p99_ms:g}ms"
+        return None
+
+    def record(self, point: Dict) -> Optional[str]:
+        """Add a measured level; returns its violation (None if it passed)"""
+        violation = self.violation(point)
+        point["slo_violation"] = violation
+        self.points.append(point)
+        if violation is None:
+            if self.best is None or point["target_qps"] > self.best["target_qps"]:
+                self.best = point
+        elif self.first_failure is None or point["target_qps"] < self.first_failure["target_qps"]:
+            self.first_failure = point
+        return violation
+
+    def next_qps(self) -> Optional[float]:
+        """The next rate to measure, or None when the search is done"""
+        if not self.points:
+            return self.start_qps
+        if self.first_failure is None:
+            last = self.points[-1]["target_qps"]
+            if last >= self.max_qps:
+                return None
+            ramped = last + self.step_qps if self.mode == "step" else last * 2
+            return min(ramped, self.max_qps)
+        if self.mode == "step" or self.best is None:
+            return None
+        low, high = self.best["target_qps"], self.first_failure["target_qps"]
+        if high - low <= self.precision * low:
+            return None
+        return (low + high) / 2
+
+    @property
+    def curve(self) -> List[Dict]:
+        return sorted(self.points, key=lambda point: point["target_qps"])
@@ -0,0 +1,112 @@
+"""
+Tests for async_engine.py against a fake connection: outcomes in statement
+order, failed queries returned as errors, and status checks backing off for
+long-running queries.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from async_engine import AsyncQueryEngine
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.sfqid = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+
+    def execute_async(self, sql, params=None):
+        with self.conn.lock:
+            self.sfqid = f"q{len(self.conn.queries)}"
+            self.conn.queries[self.sfqid] = (sql, time.monotonic())
+
+    def get_results_from_sfqid(self, sfqid):
+        self._rows = [(self.conn.queries[sfqid][0],)]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Queries run for the number of seconds in their SQL text ("sleep 0.2"); "fail" fails"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}
+        self.status_checks = {}
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_query_status_throw_if_error(self, sfqid):
+        sql, submitted = self.queries[sfqid]
+        with self.lock:
+            self.status_checks[sfqid] = self.status_checks.get(sfqid, 0) + 1
+        if sql == "fail":
+            raise RuntimeError(f"query {sfqid} failed")
+        seconds = float(sql.split()[1]) if sql.startswith("sleep") else 0.0
+        return "RUNNING" if time.monotonic() - submitted < seconds else "SUCCESS"
+
+    @staticmethod
+    def is_still_running(status):
+        return status == "RUNNING"
+
+
+class TestAsyncQueryEngine(unittest.TestCase):
+
+    def test_outcomes_in_statement_order(self):
+        conn = FakeConnection()
+        engine = AsyncQueryEngine([conn], io_threads=4)
+        statements = [(f"sleep {0.05 * (5 - i)}", None) for i in range(5)]
+
+        outcomes = engine.run(statements)
+
+        self.assertEqual([o.rows for o in outcomes], [[(sql,)] for sql, _ in statements])
+        self.assertTrue(all(o.error is None and o.finished_at >= o.submitted_at for o in outcomes))
+
+    def test_failed_query_returned_as_error(self):
+        conn = FakeConnection()
+        done = []
+        outcomes = AsyncQueryEngine([conn]).run([("fail", None), ("sleep 0", None)], on_done=done.append)
+
+        self.assertIn("failed", outcomes[0].error)
+        self.assertIsNone(outcomes[1].error)
+        self.assertEqual(len(done), 2)
+
+    def test_status_checks_back_off_for_long_queries(self):
+        conn = FakeConnection()
+        engine = AsyncQueryEngine([conn], poll_interval=0.005, max_poll_interval=0.05, fetch=False)
+
+        outcomes = engine.run([("sleep 0.5", None)] + [("sleep 0", None)] * 20)
+
+        self.assertTrue(all(o.error is None for o in outcomes))
+        # A fixed 5 ms loop would check the long query ~100 times
+        self.assertLess(conn.status_checks["q0"], 25)
+        self.assertTrue(all(conn.status_checks[f"q{i}"] == 1 for i in range(1, 21)))
+
+    def test_many_in_flight_with_few_threads(self):
+        conn = FakeConnection()
+        engine = AsyncQueryEngine([conn], max_in_flight=200, io_threads=2, fetch=False)
+
+        started = time.monotonic()
+        outcomes = engine.run([("sleep 0.2", None)] * 200)
+
+        self.assertTrue(all(o.error is None for o in outcomes))
+        self.assertLess(time.monotonic() - started, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
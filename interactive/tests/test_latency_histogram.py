@@ -0,0 +1,152 @@
+"""
+Tests for latency_histogram.py: bucket error bounds, nearest-rank percentiles,
+merging histograms and recorders, and the JSON round trip.
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from latency_histogram import LatencyHistogram, LatencyRecorder, compare_runs
+
+
+def _nearest_rank(values, q):
+    ordered = sorted(values)
+    rank = max(1, math.ceil(Fraction(str(q)) * len(ordered) / 100))
+    return ordered[rank - 1]
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_bucket_error_within_a_tenth_of_a_percent(self):
+        rng = random.Random(7)
+        for value_ms in [0.001, 0.5, 1.999, 2.048, 17.3, 999.9, 12345.678] + [
+            rng.uniform(0, 60000) for _ in range(500)
+        ]:
+            upper = LatencyHistogram._bucket_upper_ms(LatencyHistogram._bucket(value_ms))
+            micros = round(value_ms * 1000) / 1000
+            self.assertGreaterEqual(upper + 1e-9, micros)
+            self.assertLessEqual(upper - micros, max(micros * 0.001, 0.001), value_ms)
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value_ms in (0.1, 0.2, 0.3):
+            histogram.record(value_ms)
+        self.assertEqual(histogram.percentile(50), 0.2)
+
+    def test_nearest_rank_percentiles(self):
+        histogram = LatencyHistogram()
+        for micros in range(100, 1001, 100):  # 0.1..1.0 ms: below 2048us buckets are exact
+            histogram.record(micros / 1000)
+
+        # Nearest rank: p50 of 10 samples is the 5th, p95 the 10th (not int(10 * 0.95) = 9th)
+        self.assertEqual(histogram.percentile(50), 0.5)
+        self.assertEqual(histogram.percentile(90), 0.9)
+        self.assertEqual(histogram.percentile(95), 1.0)
+        self.assertEqual(histogram.percentile(0), 0.1)
+        self.assertEqual(histogram.percentile(100), 1.0)
+
+    def test_rank_not_pushed_up_by_float_rounding(self):
+        histogram = LatencyHistogram()
+        for micros in range(1, 1001):
+            histogram.record(micros / 1000)
+        # 99.9% of 1000 is exactly 999, though 99.9 / 100 * 1000 is not in floating point
+        self.assertEqual(histogram.percentile(99.9), 0.999)
+
+    def test_percentiles_match_exact_within_bucket_error(self):
+        rng = random.Random(11)
+        values = [rng.lognormvariate(3, 1) for _ in range(5000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        for q in (50, 90, 99, 99.9):
+            exact = _nearest_rank(values, q)
+            self.assertGreaterEqual(histogram.percentile(q), exact - 0.0005)
+            self.assertLessEqual(histogram.percentile(q), exact * 1.001 + 0.001)
+
+    def test_percentiles_clamped_to_min_and_max(self):
+        histogram = LatencyHistogram()
+        histogram.record(12345.0)
+        self.assertEqual(histogram.percentile(50), 12345.0)
+        self.assertEqual(histogram.percentile(99.9), 12345.0)
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.mean_ms)
+        self.assertEqual(histogram.summary()["count"], 0)
+
+    def test_merge_equals_recording_everything_in_one(self):
+        rng = random.Random(3)
+        values = [rng.uniform(1, 500) for _ in range(1000)]
+        combined, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, value in enumerate(values):
+            combined.record(value)
+            (first if i % 3 else second).record(value)
+
+        merged = first.merge(second)
+
+        self.assertEqual(merged.counts, combined.counts)
+        merged_summary, combined_summary = merged.summary(), combined.summary()
+        self.assertAlmostEqual(merged_summary.pop("mean"), combined_summary.pop("mean"))
+        self.assertEqual(merged_summary, combined_summary)
+
+    def test_merge_with_empty(self):
+        histogram = LatencyHistogram()
+        histogram.record(5)
+        histogram.merge(LatencyHistogram())
+        self.assertEqual((histogram.min_ms, histogram.max_ms, histogram.count), (5, 5, 1))
+        self.assertEqual(LatencyHistogram().merge(histogram).summary(), histogram.summary())
+
+    def test_dict_round_trip(self):
+        histogram = LatencyHistogram()
+        for value in (1.5, 20, 300):
+            histogram.record(value)
+        restored = LatencyHistogram.from_dict(histogram.to_dict())
+        self.assertEqual(restored.summary(), histogram.summary())
+
+
+class TestLatencyRecorder(unittest.TestCase):
+
+    def test_windows_and_types(self):
+        recorder = LatencyRecorder(window_s=10, started_at=100.0)
+        recorder.record("lookup", 5, at=101)
+        recorder.record("lookup", 7, at=115)
+        recorder.record("summary", 50, at=125)
+
+        self.assertEqual(sorted(recorder.by_window), [0, 1, 2])
+        self.assertEqual(recorder.by_type["lookup"].count, 2)
+        keys = [key for scope, key, _ in recorder.rows() if scope == "window"]
+        self.assertEqual(keys, ["0-10s", "10-20s", "20-30s"])
+
+    def test_merge_and_round_trip(self):
+        first, second = LatencyRecorder(), LatencyRecorder()
+        first.record("lookup", 5, at=0)
+        second.record("lookup", 9, at=0)
+        second.record("summary", 40, at=0)
+
+        merged = LatencyRecorder.from_dict(first.merge(second).to_dict())
+
+        self.assertEqual(merged.overall.count, 3)
+        self.assertEqual(merged.by_type["lookup"].count, 2)
+        self.assertEqual(merged.by_window[0].count, 3)
+
+    def test_compare_runs_ratio(self):
+        baseline, candidate = LatencyRecorder(), LatencyRecorder()
+        baseline.record("lookup", 100)
+        candidate.record("lookup", 25)
+
+        report = compare_runs({"recorders": {"wh": baseline}}, {"recorders": {"wh": candidate}})
+
+        overall = report[0]
+        self.assertEqual(overall["query_type"], "all")
+        self.assertEqual(overall["p50"], (100, 25, 0.25))
+
+
+if __name__ == "__main__":
+    unittest.main()
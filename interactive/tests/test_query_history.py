@@ -0,0 +1,164 @@
+"""
+Tests for query_history.py against a fake QUERY_HISTORY: full slices split in
+half until they fit, truncation at the minimum slice width, retries for ids
+that show up late, and the per-component split of client latency.
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import query_history
+from query_history import HistoryLookup, _read_slices, component_times, fetch_query_timings, unmatched
+
+
+class FakeHistoryCursor:
+    """QUERY_HISTORY over `queries` ((query_id, end_ms) pairs), capped at RESULT_LIMIT rows per call"""
+
+    def __init__(self, queries, warehouse="LOAD_WH"):
+        self.queries = queries
+        self.slices = []
+        self.statements = []
+        self.warehouse = warehouse
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split())[:40])
+        if sql == "SELECT CURRENT_WAREHOUSE()":
+            self._rows = [(self.warehouse,)]
+            return
+        if sql.startswith("USE WAREHOUSE"):
+            self.warehouse = sql.split()[-1]
+            return
+        start_ms, end_ms, ids = params
+        self.slices.append((start_ms, end_ms))
+        history = [q for q in self.queries if start_ms <= q[1] <= end_ms][:query_history.RESULT_LIMIT]
+        wanted = set(json.loads(ids))
+        matched = [(qid, "INTERACTIVE_WH", 1, 2, 3, 10) for qid, _ in history if qid in wanted]
+        slice_rows = len(history)
+        self._rows = [row + (slice_rows,) for row in matched] or [(None,) * 6 + (slice_rows,)]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def _queries(count, start_ms=0, spacing_ms=100, prefix="q"):
+    return [(f"{prefix}{i}", start_ms + i * spacing_ms) for i in range(count)]
+
+
+class TestReadSlices(unittest.TestCase):
+
+    def test_single_slice_when_under_limit(self):
+        cursor = FakeHistoryCursor(_queries(5))
+        lookup = HistoryLookup()
+        _read_slices(cursor, {"q1", "q3"}, 0, 10_000, lookup)
+
+        self.assertEqual(set(lookup.timings), {"q1", "q3"})
+        self.assertEqual(lookup.timings["q1"]["total_ms"], 10)
+        self.assertEqual(cursor.slices, [(0, 10_000)])
+        self.assertFalse(lookup.truncated)
+
+    @patch.object(query_history, "RESULT_LIMIT", 10)
+    def test_full_slice_split_until_every_id_found(self):
+        # 40 queries (mostly other users' traffic) 200ms apart against a limit of 10 rows
+        queries = _queries(40, spacing_ms=200)
+        wanted = {"q0", "q17", "q39"}
+        cursor = FakeHistoryCursor(queries)
+        lookup = HistoryLookup()
+        _read_slices(cursor, wanted, 0, 8000, lookup)
+
+        self.assertEqual(set(lookup.timings), wanted)
+        self.assertFalse(lookup.truncated)
+        self.assertEqual(cursor.slices[:3], [(0, 8000), (4000, 8000), (6000, 8000)])
+        for start_ms, end_ms in cursor.slices[1:]:
+            self.assertLess(end_ms - start_ms, 8000)
+
+    @patch.object(query_history, "RESULT_LIMIT", 10)
+    def test_dense_slice_at_minimum_width_marked_truncated(self):
+        # 30 queries within one second can't be split below MIN_SLICE_MS
+        cursor = FakeHistoryCursor(_queries(30, spacing_ms=10))
+        lookup = HistoryLookup()
+        _read_slices(cursor, {"q25"}, 0, query_history.MIN_SLICE_MS, lookup)
+
+        self.assertTrue(lookup.truncated)
+        self.assertEqual(len(cursor.slices), 1)
+        self.assertNotIn("q25", lookup.timings)
+
+    def test_stops_once_everything_is_found(self):
+        cursor = FakeHistoryCursor(_queries(3))
+        lookup = HistoryLookup()
+        lookup.timings["q1"] = {}
+        _read_slices(cursor, {"q1"}, 0, 1000, lookup)
+        self.assertEqual(cursor.slices, [])
+
+
+class TestFetchQueryTimings(unittest.TestCase):
+
+    def test_late_ids_retried_and_warehouse_restored(self):
+        cursor = FakeHistoryCursor(_queries(2, start_ms=5000))
+        now = [10.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            cursor.queries.append(("late", 9000))  # shows up in history after a retry
+            now[0] += seconds
+
+        lookup = fetch_query_timings(
+            FakeConnection(cursor), ["q0", "q1", "late"], since=5.0, until=9.5,
+            warehouse="automated_intelligence_wh", sleep=sleep, clock=lambda: now[0],
+        )
+
+        self.assertEqual(set(lookup.timings), {"q0", "q1", "late"})
+        self.assertEqual(slept, [2])
+        self.assertEqual(cursor.warehouse, "LOAD_WH")
+        self.assertEqual(cursor.slices[0], (4000, 10500))
+
+    def test_gives_up_at_timeout(self):
+        cursor = FakeHistoryCursor(_queries(1))
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        lookup = fetch_query_timings(
+            FakeConnection(cursor), ["q0", "never"], since=0.0, until=1.0,
+            timeout=5.0, sleep=sleep, clock=lambda: now[0],
+        )
+        self.assertEqual(set(lookup.timings), {"q0"})
+        self.assertEqual(unmatched(["q0", "never", None], lookup.timings), 1)
+
+    def test_no_ids_no_queries(self):
+        cursor = FakeHistoryCursor([])
+        self.assertEqual(fetch_query_timings(FakeConnection(cursor), [], since=0.0).timings, {})
+        self.assertEqual(cursor.statements, [])
+
+
+class TestComponentTimes(unittest.TestCase):
+
+    def test_network_is_what_remains_of_client_latency(self):
+        timing = {"queued_ms": 5, "compilation_ms": 20, "execution_ms": 50, "total_ms": 80}
+        self.assertEqual(
+            component_times(120.0, timing, client_wait_ms=15.0),
+            {"client wait": 15.0, "queued": 5, "compilation": 20, "execution": 50, "network+client": 25.0},
+        )
+        self.assertEqual(component_times(70.0, timing)["network+client"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
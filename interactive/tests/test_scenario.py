@@ -0,0 +1,140 @@
+"""
+Tests for scenario.py: parse_scenario validation, the example scenario file,
+per-warehouse table checks and arrival_offsets for steady and ramped rates.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scenario import Phase, arrival_offsets, load_scenario, parse_scenario
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "scenarios", "lookup_mix.json")
+
+
+def _scenario(**overrides):
+    data = {
+        "name": "test",
+        "queries": [
+            {
+                "name": "lookup",
+                "sql": "SELECT * FROM {table} WHERE customer_id = {customer_id}",
+                "tables": {"interactive": "interactive.customer_order_analytics"},
+            }
+        ],
+        "phases": [{"name": "steady", "duration": 10, "rate": 5}],
+    }
+    data.update(overrides)
+    return data
+
+
+class TestParseScenario(unittest.TestCase):
+
+    def test_example_file_loads(self):
+        scenario = load_scenario(EXAMPLE)
+        self.assertTrue(scenario.queries)
+        self.assertTrue(scenario.phases)
+        for warehouse in scenario.warehouses(scenario.warehouse or "interactive"):
+            scenario.validate_for(warehouse)
+
+    def test_phase_modes_and_rates(self):
+        scenario = parse_scenario(_scenario(phases=[
+            {"name": "warm-up", "duration": 5, "concurrency": 3, "warmup": True},
+            {"name": "ramp", "duration": 10, "rate": [1, 20]},
+            {"name": "steady", "duration": 10, "rate": 20},
+        ]))
+        warmup, ramp, steady = scenario.phases
+        self.assertEqual((warmup.mode, warmup.warmup), ("closed", True))
+        self.assertEqual((ramp.mode, ramp.rate), ("open", (1.0, 20.0)))
+        self.assertEqual(steady.rate, (20.0, 20.0))
+        self.assertEqual(ramp.describe(), "1→20 QPS")
+        self.assertEqual(scenario.session_count(), 50)
+
+    def test_session_count_covers_largest_closed_phase(self):
+        scenario = parse_scenario(_scenario(
+            sessions=10, phases=[{"name": "spike", "duration": 5, "concurrency": 200}]
+        ))
+        self.assertEqual(scenario.session_count(), 200)
+
+    def test_invalid_scenarios(self):
+        lookup = _scenario()["queries"][0]
+        cases = {
+            "no queries": _scenario(queries=[]),
+            "no phases": _scenario(phases=[]),
+            "unknown placeholder": _scenario(queries=[dict(lookup, sql="SELECT {nope}")]),
+            "zero weight": _scenario(queries=[dict(lookup, weight=0)]),
+            "bad query warehouse": _scenario(queries=[dict(lookup, warehouse="xl")]),
+            "both concurrency and rate": _scenario(
+                phases=[{"name": "p", "duration": 5, "rate": 5, "concurrency": 2}]
+            ),
+            "neither concurrency nor rate": _scenario(phases=[{"name": "p", "duration": 5}]),
+            "non-positive rate": _scenario(phases=[{"name": "p", "duration": 5, "rate": [0, 10]}]),
+            "zero concurrency": _scenario(phases=[{"name": "p", "duration": 5, "concurrency": 0}]),
+            "zero duration": _scenario(phases=[{"name": "p", "duration": 0, "rate": 5}]),
+            "bad scenario warehouse": _scenario(warehouse="xl"),
+            "bad arrival": _scenario(arrival="bursty"),
+        }
+        for case, data in cases.items():
+            with self.subTest(case), self.assertRaises(ValueError):
+                parse_scenario(data)
+
+    def test_missing_field_reported_as_value_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scenario.json")
+            with open(path, "w") as f:
+                json.dump(_scenario(phases=[{"name": "p", "rate": 5}]), f)
+            with self.assertRaisesRegex(ValueError, "duration"):
+                load_scenario(path)
+
+    def test_validate_for_needs_a_table_per_target_warehouse(self):
+        scenario = parse_scenario(_scenario())
+        scenario.validate_for("interactive")
+        with self.assertRaisesRegex(ValueError, "standard"):
+            scenario.validate_for("standard")
+
+    def test_pick_follows_weights(self):
+        lookup = _scenario()["queries"][0]
+        scenario = parse_scenario(_scenario(queries=[
+            dict(lookup, name="heavy", weight=9), dict(lookup, name="light", weight=1),
+        ]))
+        rng = random.Random(1)
+        picks = [scenario.pick(rng).name for _ in range(5000)]
+        self.assertAlmostEqual(picks.count("heavy") / len(picks), 0.9, delta=0.02)
+
+
+class TestArrivalOffsets(unittest.TestCase):
+
+    def test_constant_rate(self):
+        offsets = arrival_offsets(Phase("steady", 5, rate=(10.0, 10.0)), "constant")
+        self.assertIn(len(offsets), (49, 50))
+        self.assertAlmostEqual(offsets[0], 0.1)
+        self.assertTrue(all(abs(b - a - 0.1) < 1e-9 for a, b in zip(offsets, offsets[1:])))
+        self.assertLess(offsets[-1], 5)
+
+    def test_constant_ramp_speeds_up(self):
+        offsets = arrival_offsets(Phase("ramp", 10, rate=(1.0, 50.0)), "constant")
+        gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+        self.assertTrue(all(later <= earlier for earlier, later in zip(gaps, gaps[1:])))
+        # A linear ramp sends about duration * (start + end) / 2 queries
+        self.assertAlmostEqual(len(offsets), 10 * (1 + 50) / 2, delta=20)
+
+    def test_poisson_ramp_matches_expected_count(self):
+        rng = random.Random(5)
+        counts = [len(arrival_offsets(Phase("ramp", 20, rate=(10.0, 90.0)), "poisson", rng)) for _ in range(20)]
+        self.assertAlmostEqual(sum(counts) / len(counts), 20 * (10 + 90) / 2, delta=50)
+
+    def test_poisson_ramp_is_denser_at_the_end(self):
+        rng = random.Random(6)
+        offsets = arrival_offsets(Phase("ramp", 20, rate=(5.0, 100.0)), "poisson", rng)
+        first_half = sum(offset < 10 for offset in offsets)
+        self.assertLess(first_half, len(offsets) - first_half)
+        self.assertTrue(all(0 < offset < 20 for offset in offsets))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Tests for slo_search.py: binary search brackets the capacity between the
+highest passing and lowest failing rate, step search stops at the first
+failure, the max QPS cap, and what counts as an SLO violation.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from slo_search import SloSearch
+
+
+def _point(qps, p95_ms=20.0, p99_ms=None, queries=100, errors=0):
+    return {"target_qps": qps, "p95_ms": p95_ms, "p99_ms": p99_ms if p99_ms is not None else p95_ms,
+            "queries": queries, "errors": errors}
+
+
+def _run(search, capacity, limit=50):
+    """Drive the search against a warehouse whose p95 jumps past the SLO above `capacity` QPS"""
+    levels = []
+    qps = search.next_qps()
+    while qps is not None and len(levels) < limit:
+        levels.append(qps)
+        search.record(_point(qps, p95_ms=20.0 if qps <= capacity else 900.0))
+        qps = search.next_qps()
+    return levels
+
+
+class TestSloSearch(unittest.TestCase):
+
+    def test_binary_doubles_then_brackets_capacity(self):
+        search = SloSearch(p95_ms=100, start_qps=10, max_qps=1000, precision=0.05)
+        levels = _run(search, capacity=137)
+
+        self.assertEqual(levels[:5], [10, 20, 40, 80, 160])
+        low, high = search.best["target_qps"], search.first_failure["target_qps"]
+        self.assertLessEqual(low, 137)
+        self.assertGreater(high, 137)
+        self.assertLessEqual(high - low, 0.05 * low)
+        # every bisection level lies inside the previous bracket
+        for qps in levels[5:]:
+            self.assertTrue(80 < qps < 160)
+
+    def test_step_stops_at_first_failure(self):
+        search = SloSearch(p95_ms=100, start_qps=10, max_qps=1000, mode="step", step_qps=25)
+        levels = _run(search, capacity=70)
+
+        self.assertEqual(levels, [10, 35, 60, 85])
+        self.assertEqual(search.best["target_qps"], 60)
+        self.assertEqual(search.first_failure["target_qps"], 85)
+
+    def test_ramp_capped_at_max_qps(self):
+        search = SloSearch(p95_ms=100, start_qps=10, max_qps=50)
+        levels = _run(search, capacity=10_000)
+
+        self.assertEqual(levels, [10, 20, 40, 50])
+        self.assertEqual(search.best["target_qps"], 50)
+        self.assertIsNone(search.first_failure)
+
+    def test_failing_start_ends_search_without_capacity(self):
+        search = SloSearch(p95_ms=100, start_qps=10)
+        self.assertEqual(_run(search, capacity=5), [10])
+        self.assertIsNone(search.best)
+
+    def test_curve_sorted_by_rate(self):
+        search = SloSearch(p95_ms=100, start_qps=10, max_qps=1000)
+        _run(search, capacity=137)
+        rates = [point["target_qps"] for point in search.curve]
+        self.assertEqual(rates, sorted(rates))
+        self.assertEqual(len(rates), len(search.points))
+
+    def test_violations(self):
+        search = SloSearch(p95_ms=100, p99_ms=200, max_error_rate=0.01)
+        self.assertIsNone(search.violation(_point(10, p95_ms=90, p99_ms=190)))
+        self.assertIn("p95", search.violation(_point(10, p95_ms=120)))
+        self.assertIn("p99", search.violation(_point(10, p95_ms=90, p99_ms=250)))
+        self.assertIn("errors", search.violation(_point(10, errors=2)))
+        self.assertEqual(search.violation(_point(10, queries=0)), "no successful queries")
+        self.assertEqual(search.violation(dict(_point(10), p95_ms=None)), "no successful queries")
+
+    def test_invalid_arguments_rejected(self):
+        with self.assertRaises(ValueError):
+            SloSearch(p95_ms=100, mode="random")
+        with self.assertRaises(ValueError):
+            SloSearch(p95_ms=100, start_qps=0)
+        with self.assertRaises(ValueError):
+            SloSearch(p95_ms=100, start_qps=50, max_qps=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests for workload.py: KeyChooser distributions (uniform, zipf, hotset skew),
+the cold-key ratio, shared hot keys across partitions and the key file.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from workload import KeyChooser, Workload, load_keys, save_keys
+
+KEYS = list(range(1000))
+DRAWS = 20000
+
+
+def _draws(chooser, n=DRAWS):
+    return [chooser.choose() for _ in range(n)]
+
+
+def _top_share(draws, top):
+    """Fraction of draws that went to the `top` most frequent keys"""
+    return sum(count for _, count in Counter(draws).most_common(top)) / len(draws)
+
+
+class TestKeyChooser(unittest.TestCase):
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            KeyChooser([])
+        with self.assertRaises(ValueError):
+            KeyChooser(KEYS, distribution="pareto")
+
+    def test_uniform_has_no_hot_keys(self):
+        draws = _draws(KeyChooser(KEYS, rng=random.Random(1)))
+        self.assertLess(_top_share(draws, 10), 0.03)  # 1% of keys, ~1% of draws
+        self.assertGreater(len(set(draws)), 990)
+
+    def test_zipf_skews_towards_low_ranks(self):
+        chooser = KeyChooser(KEYS, distribution="zipf", zipf_s=1.1, rng=random.Random(2))
+        draws = _draws(chooser)
+
+        counts = Counter(draws)
+        # The rank-1 key is the most frequent, about twice rank 2 (2^1.1)
+        self.assertEqual(counts.most_common(1)[0][0], chooser.keys[0])
+        self.assertAlmostEqual(counts[chooser.keys[0]] / counts[chooser.keys[1]], 2 ** 1.1, delta=0.4)
+        self.assertGreater(_top_share(draws, 10), 0.3)
+
+    def test_hotset_share(self):
+        chooser = KeyChooser(
+            KEYS, distribution="hotset", hot_fraction=0.1, hot_share=0.9, rng=random.Random(3)
+        )
+        hot = set(chooser.keys[:chooser.hot_count])
+        draws = _draws(chooser)
+
+        self.assertEqual(chooser.hot_count, 100)
+        self.assertAlmostEqual(sum(key in hot for key in draws) / len(draws), 0.9, delta=0.01)
+
+    def test_cold_ratio_gives_unseen_keys(self):
+        chooser = KeyChooser(
+            list(range(20000)), distribution="zipf", cold_ratio=0.25, rng=random.Random(4)
+        )
+        seen, first_seen = set(), 0
+        for key in _draws(chooser, 2000):
+            first_seen += key not in seen
+            seen.add(key)
+        self.assertGreaterEqual(first_seen / 2000, 0.23)
+
+    def test_cold_keys_come_from_the_cold_end_and_never_repeat(self):
+        keys = list(range(10))
+        chooser = KeyChooser(keys, distribution="uniform", cold_ratio=1.0, rng=random.Random(5))
+        cold = [chooser.choose() for _ in range(10)]
+        self.assertEqual(cold, list(reversed(chooser.keys)))
+
+    def test_partitions_share_hot_keys_but_not_cold_keys(self):
+        first = KeyChooser(KEYS, rank_seed=9, partition=(0, 2), cold_ratio=1.0)
+        second = KeyChooser(KEYS, rank_seed=9, partition=(1, 2), cold_ratio=1.0)
+
+        self.assertEqual(first.keys, second.keys)
+        self.assertFalse(set(_draws(first, 500)) & set(_draws(second, 500)))
+
+
+class TestWorkload(unittest.TestCase):
+
+    def test_key_file_round_trip(self):
+        keys = {"customer_id": [1, 2, 3], "order_id": ["a-1", "b-2"]}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "keys.json")
+            save_keys(path, keys)
+            self.assertEqual(load_keys(path), keys)
+
+            workload = Workload.from_file(path, distribution="hotset", cold_ratio=0.5)
+
+        self.assertIn(workload.customer_id(), keys["customer_id"])
+        self.assertIn(workload.order_id(), keys["order_id"])
+        self.assertEqual(workload.describe(), "hotset over 3 customer_ids, 2 order_ids, 50% cold keys")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Load Test Workloads from Real Keys
+==================================
+Purpose: Query keys that exist, with realistic access skew
+
+ORDER_ID is a UUID string and customer ids depend on what has been generated,
+so random integers mostly look up rows that don't exist. sample_keys() draws
+real customer and order ids from the RAW tables once; they are saved to a
+local key file that every load-test run (and worker process) reuses.
+
+Workload picks keys from that file with a configurable distribution:
+- uniform: every sampled key equally likely
+- zipf:    key of rank r drawn with weight 1 / r^s (a few very hot keys)
+- hotset:  `hot_share` of queries go to the hottest `hot_fraction` of keys
+and an optional cold ratio: at least that fraction of queries use a key not
+queried before in the run (cache misses), the rest repeat the distribution's
+keys (cache hits once warmed).
+
+No third-party imports.
+"""
+
+import bisect
+import json
+import random
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+SAMPLE_WAREHOUSE = "automated_intelligence_wh"
+
+SAMPLE_QUERIES = {
+    # Customers that have orders - the ones the analytics tables can return
+    "customer_id": """
+        SELECT customer_id
+        FROM (SELECT DISTINCT customer_id FROM automated_intelligence.raw.orders)
+        SAMPLE ({n} ROWS)
+    """,
+    "order_id": """
+        SELECT order_id
+        FROM automated_intelligence.raw.orders
+        SAMPLE ({n} ROWS)
+    """,
+}
+
+DISTRIBUTIONS = ["uniform", "zipf", "hotset"]
+
+
+def sample_keys(conn, sample_size: int) -> Dict[str, List]:
+    """Sample up to `sample_size` real keys of each kind (runs on the standard warehouse)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"USE WAREHOUSE {SAMPLE_WAREHOUSE}")
+        keys = {}
+        for kind, sql in SAMPLE_QUERIES.items():
+            cursor.execute(sql.format(n=int(sample_size)))
+            keys[kind] = [row[0] for row in cursor.fetchall()]
+        return keys
+    finally:
+        cursor.close()
+
+
+def save_keys(path: str, keys: Dict[str, List]):
+    data = {"sampled_at": datetime.now(timezone.utc).isoformat(), "keys": keys}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load_keys(path: str) -> Dict[str, List]:
+    with open(path) as f:
+        return json.load(f)["keys"]
+
+
+class KeyChooser:
+    """
+    Draws keys of one kind. Ranks (hotness) are a random order of the keys
+    fixed by `rank_seed`, so separate runs and worker processes share the same
+    hot keys; `partition` (index, count) gives each worker its own cold keys.
+    """
+
+    def __init__(
+        self,
+        keys: List,
+        distribution: str = "uniform",
+        zipf_s: float = 1.1,
+        hot_fraction: float = 0.1,
+        hot_share: float = 0.9,
+        cold_ratio: Optional[float] = None,
+        rank_seed: int = 0,
+        partition: Tuple[int, int] = (0, 1),
+        rng: Optional[random.Random] = None,
+    ):
+        if not keys:
+            raise ValueError("No keys to choose from")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {distribution!r} (expected one of {DISTRIBUTIONS})")
+        self.rng = rng or random.Random()
+        self.keys = list(keys)
+        random.Random(rank_seed).shuffle(self.keys)
+        self.distribution = distribution
+        self.hot_count = max(1, int(len(self.keys) * hot_fraction))
+        self.hot_share = hot_share
+        self.cold_ratio = cold_ratio
+        self.cumulative_weights = None
+        if distribution == "zipf":
+            total = 0.0
+            self.cumulative_weights = []
+            for rank in range(1, len(self.keys) + 1):
+                total += 1.0 / rank ** zipf_s
+                self.cumulative_weights.append(total)
+        # Keys not handed out yet, coldest (lowest-ranked) first
+        index, count = partition
+        self.unused = deque(reversed(self.keys[index::count]))
+        self.used = set()
+        self.lock = threading.Lock()
+
+    def _draw(self):
+        if self.distribution == "zipf":
+            point = self.rng.random() * self.cumulative_weights[-1]
+            index = bisect.bisect_left(self.cumulative_weights, point)
+            return self.keys[min(index, len(self.keys) - 1)]
+        if self.distribution == "hotset" and self.hot_count < len(self.keys):
+            if self.rng.random() < self.hot_share:
+                return self.keys[self.rng.randrange(self.hot_count)]
+            return self.keys[self.rng.randrange(self.hot_count, len(self.keys))]
+        return self.keys[self.rng.randrange(len(self.keys))]
+
+    def choose(self):
+        with self.lock:
+            key = None
+            if self.cold_ratio and self.rng.random() < self.cold_ratio:
+                while self.unused and key is None:
+                    candidate = self.unused.popleft()
+                    key = candidate if candidate not in self.used else None
+            if key is None:
+                key = self._draw()
+            self.used.add(key)
+            return key
+
+
+class Workload:
+    """Customer and order keys for the load test's query generators"""
+
+    def __init__(self, keys: Dict[str, List], **options):
+        self.choosers = {kind: KeyChooser(values, **options) for kind, values in keys.items()}
+
+    @classmethod
+    def from_file(cls, path: str, **options) -> "Workload":
+        return cls(load_keys(path), **options)
+
+    def customer_id(self):
+        return self.choosers["customer_id"].choose()
+
+    def order_id(self):
+        return self.choosers["order_id"].choose()
+
+    def describe(self) -> str:
+        sizes = ", ".join(f"{len(c.keys):,} {kind}s" for kind, c in self.choosers.items())
+        chooser = next(iter(self.choosers.values()))
+        text = f"{chooser.distribution} over {sizes}"
+        if chooser.cold_ratio:
+            text += f", {chooser.cold_ratio:.0%} cold keys"
+        return text
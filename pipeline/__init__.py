@@ -0,0 +1,4 @@
+"""
+Building blocks for run_pipeline.py: step dependency graph and executor,
+pooled Snowflake connections, and shared helpers used by the pipeline steps.
+"""
@@ -0,0 +1,91 @@
+"""
+Checkpoint file for resuming a pipeline run.
+
+After every step the executor records which steps have passed plus the
+pipeline state later steps depend on (the preflight row-count baseline, the
+DT refresh watermark, streaming metrics, ...). `--resume` reloads it, skips
+the completed steps and restores that state, so a run that failed at step 6
+doesn't re-stream orders or move its DT watermark.
+
+The file is rewritten atomically (temp file + rename) so a crash mid-write
+never leaves a truncated checkpoint behind.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+# state key -> (encode to JSON-able, decode back) for values that aren't plain JSON
+Codecs = Dict[str, Tuple[Callable[[Any], Any], Callable[[Any], Any]]]
+
+
+class Checkpoint:
+    def __init__(self, path: str, run_id: str, parameters: Dict[str, Any], codecs: Optional[Codecs] = None):
+        self.path = path
+        self.run_id = run_id
+        self.parameters = parameters
+        self.codecs = codecs or {}
+        self.completed: Dict[int, Dict[str, Any]] = {}
+        self.state: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, path: str, codecs: Optional[Codecs] = None) -> Optional["Checkpoint"]:
+        """Read a checkpoint, or None if there isn't one."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        checkpoint = cls(path, data["run_id"], data.get("parameters", {}), codecs)
+        checkpoint.completed = {int(num): entry for num, entry in data.get("completed", {}).items()}
+        for key, value in data.get("state", {}).items():
+            decode = checkpoint.codecs.get(key, (None, None))[1]
+            checkpoint.state[key] = decode(value) if decode is not None and value is not None else value
+        return checkpoint
+
+    @property
+    def completed_steps(self) -> Set[int]:
+        return set(self.completed)
+
+    def mismatched_parameters(self, parameters: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+        """Parameters that differ from the checkpointed run: name -> (checkpointed, now)."""
+        return {
+            key: (self.parameters.get(key), value)
+            for key, value in parameters.items()
+            if self.parameters.get(key) != value
+        }
+
+    def record(self, step_num: int, label: str, passed: bool, duration: float, state: Dict[str, Any]) -> None:
+        """Save the outcome of one step together with the current pipeline state."""
+        if passed:
+            self.completed[step_num] = {"label": label, "finished_at": time.time(), "duration": duration}
+        self.state = dict(state)
+        self.save()
+
+    def encoded_state(self) -> Dict[str, Any]:
+        """The state as saved: codec-encoded, with non-JSON values dropped."""
+        encoded = {}
+        for key, value in self.state.items():
+            encode = self.codecs.get(key, (None, None))[0]
+            if encode is not None and value is not None:
+                encoded[key] = encode(value)
+                continue
+            try:
+                json.dumps(value)
+            except TypeError:
+                continue  # live objects (sessions, connections) aren't checkpointed
+            encoded[key] = value
+        return encoded
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {
+            "run_id": self.run_id,
+            "parameters": self.parameters,
+            "completed": {str(num): entry for num, entry in sorted(self.completed.items())},
+            "state": self.encoded_state(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
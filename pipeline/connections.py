@@ -0,0 +1,124 @@
+"""
+Bounded pool of Snowflake connections for steps that run concurrently.
+
+Each pipeline step checks out its own connection so parallel steps never share
+a cursor or session state (USE WAREHOUSE in one step can't leak into another).
+Connections are opened lazily, initialised with `init_sql`, and reset with
+`reset_sql` when returned.
+
+Also used by the interactive load tester, which imports it as
+interactive/connection_pool.py (a symlink). No third-party imports.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int,
+        init_sql: Sequence[str] = (),
+        reset_sql: Sequence[str] = (),
+    ):
+        if max_size <= 0:
+            raise ValueError("Connection pool size must be positive")
+        self._connect = connect
+        self.max_size = max_size
+        self.init_sql = list(init_sql)
+        self.reset_sql = list(reset_sql)
+        self._idle: List[Any] = []
+        self._all: List[Any] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _execute(self, conn, statements: Sequence[str]) -> None:
+        if not statements:
+            return
+        cur = conn.cursor()
+        try:
+            for sql in statements:
+                cur.execute(sql)
+        finally:
+            cur.close()
+
+    def _open(self):
+        conn = self._connect()
+        self._execute(conn, self.init_sql)
+        return conn
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a connection, opening one if the pool is below max_size."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._all) < self.max_size:
+                    # Reserve the slot, then connect outside the lock
+                    self._all.append(None)
+                    break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError(f"No connection available within {timeout}s")
+        try:
+            conn = self._open()
+        except BaseException:
+            with self._cond:
+                self._all.remove(None)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._all[self._all.index(None)] = conn
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection. Broken (or discarded) connections are closed instead of reused."""
+        if not discard:
+            try:
+                self._execute(conn, self.reset_sql)
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                if conn in self._all:
+                    self._all.remove(conn)
+                self._close_quietly(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            # The session may be mid-statement or in an unknown state; don't reuse it
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    @property
+    def size(self) -> int:
+        with self._cond:
+            return len([c for c in self._all if c is not None])
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                self._all.remove(conn)
+                self._close_quietly(conn)
+            self._cond.notify_all()
@@ -0,0 +1,297 @@
+"""
+Dependency-graph executor for pipeline steps.
+
+Steps declare which steps they depend on; the executor starts every step whose
+dependencies have finished, up to `max_workers` at a time, each on its own
+pooled connection. Independent work (e.g. the Cortex Agent and Cortex Search
+checks, or the RAW and STAGING streams) overlaps instead of queueing.
+
+A failed step does not block its dependents (the pipeline has always continued
+past failures); skipped steps count as finished.
+
+Step code prints through step_print(), which prefixes each line with the step
+while several steps run at once.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Set, Tuple
+
+from pipeline.tracing import STATUS_ERROR, Span, Tracer
+
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class PipelineContext:
+    """Run-wide inputs (parsed CLI args) plus state steps hand to later steps."""
+    args: Any
+    state: Dict[str, Any] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            self.state[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            return self.state.get(key, default)
+
+
+@dataclass
+class Step:
+    num: int
+    label: str
+    func: Callable[[Any, PipelineContext], bool]
+    depends_on: Tuple[int, ...] = ()
+    is_streaming: bool = False
+
+
+@dataclass
+class StepResult:
+    num: int
+    label: str
+    status: str
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    error: Optional[str] = None
+    reason: str = ""
+
+    @property
+    def duration(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+    @property
+    def ok(self) -> bool:
+        return self.status != FAILED
+
+
+def validate_steps(steps: List[Step]) -> Dict[int, Step]:
+    """Index steps by number; raise ValueError on unknown dependencies or cycles."""
+    by_num = {s.num: s for s in steps}
+    if len(by_num) != len(steps):
+        raise ValueError("Duplicate step numbers")
+    for step in steps:
+        unknown = set(step.depends_on) - set(by_num)
+        if unknown:
+            raise ValueError(f"Step {step.num} depends on unknown steps {sorted(unknown)}")
+    execution_waves(steps)  # raises on cycles
+    return by_num
+
+
+def execution_waves(steps: List[Step]) -> List[List[int]]:
+    """Group steps into waves: every step's dependencies sit in earlier waves."""
+    remaining = {s.num: set(s.depends_on) for s in steps}
+    done: Set[int] = set()
+    waves = []
+    while remaining:
+        wave = sorted(n for n, deps in remaining.items() if deps <= done)
+        if not wave:
+            raise ValueError(f"Dependency cycle among steps {sorted(remaining)}")
+        waves.append(wave)
+        done.update(wave)
+        for n in wave:
+            del remaining[n]
+    return waves
+
+
+def critical_path(steps: List[Step], results: Dict[int, StepResult]) -> Tuple[List[int], float]:
+    """
+    Longest chain of executed steps by measured duration - the part of the run
+    that parallelism can't shorten. Returns (step numbers in order, seconds).
+    """
+    by_num = {s.num: s for s in steps}
+    finish: Dict[int, float] = {}
+    previous: Dict[int, Optional[int]] = {}
+    for wave in execution_waves(steps):
+        for num in wave:
+            best_dep, best = None, 0.0
+            for dep in by_num[num].depends_on:
+                if finish[dep] > best:
+                    best_dep, best = dep, finish[dep]
+            result = results.get(num)
+            duration = result.duration if result is not None and result.status != SKIPPED else 0.0
+            finish[num] = best + duration
+            previous[num] = best_dep
+    if not finish:
+        return [], 0.0
+    end = max(finish, key=lambda n: finish[n])
+    path = []
+    node: Optional[int] = end
+    while node is not None:
+        if results.get(node) is not None and results[node].status != SKIPPED:
+            path.append(node)
+        node = previous[node]
+    return list(reversed(path)), finish[end]
+
+
+class _StepWriter:
+    """
+    Output of one running step: each line is written as soon as it is complete,
+    prefixed with the step, so concurrent steps' reports stay readable without
+    being held back until the step finishes.
+    """
+
+    _lock = threading.Lock()  # shared, so lines from concurrent steps never interleave
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._partial: Dict[Any, str] = {}
+
+    def _emit(self, stream, text: str) -> None:
+        with self._lock:
+            stream.write(text)
+            stream.flush()
+
+    def write(self, stream, text: str) -> None:
+        *lines, self._partial[stream] = (self._partial.get(stream, "") + text).split("\n")
+        if lines:
+            self._emit(stream, "".join(f"{self.prefix}{line}\n" for line in lines))
+
+    def close(self) -> None:
+        """Write any unterminated last line."""
+        for stream, partial in self._partial.items():
+            if partial:
+                self._emit(stream, self.prefix + partial + "\n")
+        self._partial.clear()
+
+
+# The writer of the step running in this context (None outside parallel steps)
+_step_writer: ContextVar[Optional[_StepWriter]] = ContextVar("pipeline_step_writer", default=None)
+
+
+def step_print(*values: Any, sep: str = " ", end: str = "\n", file=None) -> None:
+    """
+    print() for step code. Inside a step run in parallel, lines are prefixed
+    with the step; otherwise this is print(). sys.stdout / sys.stderr are looked
+    up on every call and never replaced, so wrappers installed around the run
+    (e.g. by run_pipeline_agent.py) see all output.
+    """
+    stream = file if file is not None else sys.stdout
+    writer = _step_writer.get()
+    if writer is None:
+        print(*values, sep=sep, end=end, file=stream)
+    else:
+        writer.write(stream, sep.join(str(value) for value in values) + end)
+
+
+class DagExecutor:
+    def __init__(
+        self,
+        steps: List[Step],
+        connection: Callable[[], ContextManager[Any]],
+        max_workers: int = 4,
+        before_step: Optional[Callable[[Step], bool]] = None,
+        tracer: Optional[Tracer] = None,
+        after_step: Optional[Callable[[Step, StepResult], None]] = None,
+    ):
+        """
+        `connection()` returns a context manager yielding a connection for one
+        step. `before_step(step)` runs on the calling thread before a step is
+        started; returning False stops scheduling (used for interactive pauses).
+        With a `tracer`, each step runs inside a span parented to the span open
+        on the thread that calls run(). `after_step(step, result)` runs on the
+        calling thread as each step finishes (not for skipped steps).
+        """
+        self.steps = steps
+        self.by_num = validate_steps(steps)
+        self.connection = connection
+        self.max_workers = max(1, max_workers)
+        self.before_step = before_step
+        self.tracer = tracer
+        self.after_step = after_step
+        self.results: Dict[int, StepResult] = {}
+
+    def _run_step(self, step: Step, ctx: PipelineContext, parent: Optional[Span] = None) -> StepResult:
+        # Pool threads don't share a context, so the writer is set on the step's own thread
+        writer = _StepWriter(f"[{step.num}: {step.label}] ") if self.max_workers > 1 else None
+        token = _step_writer.set(writer)
+        result = StepResult(step.num, step.label, FAILED, started_at=time.time())
+        span_context = (
+            self.tracer.span(f"step {step.num}: {step.label}", kind="step", parent=parent, **{"pipeline.step": step.num})
+            if self.tracer is not None else nullcontext()
+        )
+        with span_context as span:
+            try:
+                with self.connection() as conn:
+                    ok = step.func(conn, ctx)
+                result.status = PASSED if ok else FAILED
+            except Exception as e:
+                result.error = str(e)
+                step_print(f"  [FAIL] Step {step.num} raised: {e}", file=sys.stderr)
+            finally:
+                result.finished_at = time.time()
+                if span is not None:
+                    span.set(**{"pipeline.status": result.status})
+                    if result.status == FAILED:
+                        span.status = STATUS_ERROR
+                        span.status_message = result.error or "step reported failure"
+                if writer is not None:
+                    writer.close()
+                _step_writer.reset(token)
+        return result
+
+    def run(
+        self,
+        ctx: PipelineContext,
+        skip: Optional[Callable[[Step], Optional[str]]] = None,
+    ) -> Dict[int, StepResult]:
+        """
+        Run all steps respecting dependencies. `skip(step)` returns a reason
+        string to skip a step (it then counts as finished) or None to run it.
+        """
+        pending = {s.num for s in self.steps}
+        finished: Set[int] = set()
+        running: Dict[Future, Step] = {}
+        stopped = False
+        parent = self.tracer.current_span() if self.tracer is not None else None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                while pending or running:
+                    ready = sorted(
+                        n for n in pending if set(self.by_num[n].depends_on) <= finished
+                    )
+                    for num in ready:
+                        if len(running) >= self.max_workers or stopped:
+                            break
+                        step = self.by_num[num]
+                        pending.discard(num)
+                        reason = skip(step) if skip is not None else None
+                        if reason:
+                            self.results[num] = StepResult(num, step.label, SKIPPED, reason=reason)
+                            finished.add(num)
+                            continue
+                        if self.before_step is not None and not self.before_step(step):
+                            stopped = True
+                            break
+                        running[pool.submit(self._run_step, step, ctx, parent)] = step
+
+                    if stopped and not running:
+                        break
+                    if not running:
+                        if pending and not any(
+                            set(self.by_num[n].depends_on) <= finished for n in pending
+                        ):
+                            break  # nothing runnable (only possible after a stop)
+                        continue
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        step = running.pop(future)
+                        self.results[step.num] = future.result()
+                        finished.add(step.num)
+                        if self.after_step is not None:
+                            self.after_step(step, self.results[step.num])
+            except KeyboardInterrupt:
+                for future in running:
+                    future.cancel()
+                raise
+        return self.results
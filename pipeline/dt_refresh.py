@@ -0,0 +1,194 @@
+"""
+Wait for Dynamic Tables to catch up with freshly ingested data.
+
+Instead of polling refresh history on a fixed 10s interval, the waiter can
+trigger `ALTER DYNAMIC TABLE ... REFRESH` on each target (submitted
+asynchronously, upstream tables first, so a slow refresh can't hold the caller
+past its timeout) and then polls with adaptive backoff - short intervals while refreshes
+are expected, stretching out to `max_interval`. It returns as soon as every
+target's data timestamp has passed the ingest watermark, i.e. every target
+reflects all data that had landed by then.
+
+The connection must be a snowflake.connector connection with paramstyle="qmark".
+
+Shared by run_pipeline.py (step 5) and interactive/realtime_demo.py, which
+imports it as dt_refresh.py (a symlink). No third-party imports.
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Called after each poll with (elapsed seconds, refreshed name -> data timestamp, pending names)
+ProgressCallback = Callable[[float, Dict[str, Any], Set[str]], None]
+
+
+class DynamicTableRefreshWaiter:
+    def __init__(
+        self,
+        conn,
+        database: str,
+        schema: str,
+        tables: Sequence[str],
+        initial_interval: float = 1.0,
+        max_interval: float = 15.0,
+        backoff: float = 1.5,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+    ):
+        if initial_interval <= 0 or backoff < 1:
+            raise ValueError("initial_interval must be positive and backoff at least 1")
+        self.conn = conn
+        self.database = database.upper()
+        self.schema = schema.upper()
+        self.tables = [t.upper() for t in tables]
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._sleep = sleep
+        self._clock = clock
+
+    def _query(self, sql: str, params: Optional[tuple] = None) -> List[tuple]:
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def _submit(self, sql: str) -> str:
+        cur = self.conn.cursor()
+        try:
+            cur.execute_async(sql)
+            return cur.sfqid
+        finally:
+            cur.close()
+
+    def _qualified(self, table: str) -> str:
+        return f"{self.database}.{self.schema}.{table}"
+
+    def current_watermark(self):
+        """Server-side timestamp, so the comparison is timezone-safe."""
+        rows = self._query("SELECT CURRENT_TIMESTAMP()")
+        return rows[0][0]
+
+    def dependency_order(self) -> List[str]:
+        """
+        Targets ordered upstream-first, from the current DT graph. Falls back to
+        the order the tables were given in if the graph can't be read.
+        """
+        try:
+            rows = self._query(
+                "SELECT qualified_name, inputs "
+                "FROM TABLE(INFORMATION_SCHEMA.DYNAMIC_TABLE_GRAPH_HISTORY()) "
+                "WHERE valid_to IS NULL"
+            )
+        except Exception:
+            return list(self.tables)
+
+        inputs: Dict[str, List[str]] = {}
+        for qualified_name, raw_inputs in rows:
+            parsed = json.loads(raw_inputs) if isinstance(raw_inputs, str) else (raw_inputs or [])
+            inputs[qualified_name.upper()] = [i.get("name", "").upper() for i in parsed]
+
+        ordered: List[str] = []
+        visited: Set[str] = set()
+        targets = {self._qualified(t): t for t in self.tables}
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            visited.add(name)
+            for upstream in inputs.get(name, []):
+                visit(upstream)
+            if name in targets:
+                ordered.append(targets[name])
+
+        for table in self.tables:
+            visit(self._qualified(table))
+        return ordered
+
+    def trigger_refreshes(self, order: Optional[List[str]] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Submit a manual refresh of each target, upstream first, without waiting
+        for them. Returns (table -> query id of the running refresh, table ->
+        error for submissions that failed); failed tables are still waited on.
+        """
+        running, errors = {}, {}
+        for table in order if order is not None else self.dependency_order():
+            try:
+                running[table] = self._submit(f"ALTER DYNAMIC TABLE {self._qualified(table)} REFRESH")
+            except Exception as e:
+                errors[table] = str(e)
+        return running, errors
+
+    def check_refreshes(self, running: Dict[str, str], errors: Dict[str, str]) -> None:
+        """Drop finished refreshes from `running`, moving failed ones (e.g. suspended DTs) to `errors`."""
+        for table, query_id in list(running.items()):
+            try:
+                status = self.conn.get_query_status_throw_if_error(query_id)
+            except Exception as e:
+                errors[table] = str(e)
+                del running[table]
+                continue
+            if not self.conn.is_still_running(status):
+                del running[table]
+
+    def refreshed_since(self, watermark) -> Dict[str, Any]:
+        """Targets whose latest successful refresh covers data up to `watermark`."""
+        # str() keeps the UTC offset of a CURRENT_TIMESTAMP() value (or a checkpointed copy of one)
+        rows = self._query("""
+            SELECT name, MAX(data_timestamp) AS data_timestamp
+            FROM TABLE(INFORMATION_SCHEMA.DYNAMIC_TABLE_REFRESH_HISTORY(NAME_PREFIX => ?))
+            WHERE state = 'SUCCEEDED'
+              AND data_timestamp >= TO_TIMESTAMP_TZ(?)
+            GROUP BY name
+        """, (f"{self.database}.{self.schema}", str(watermark)))
+        return {name.upper(): data_ts for name, data_ts in rows if name.upper() in self.tables}
+
+    def wait(
+        self,
+        timeout: float = 180,
+        watermark=None,
+        trigger: bool = True,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        Block until every target's data timestamp passes `watermark` (default:
+        now) or `timeout` expires. Triggered refreshes that are still running
+        at the timeout are left to finish on their own. Returns a dict with refreshed, pending,
+        elapsed_seconds, polls, watermark, trigger_errors and timed_out.
+        """
+        start = self._clock()
+        if watermark is None:
+            watermark = self.current_watermark()
+
+        running, trigger_errors = self.trigger_refreshes() if trigger else ({}, {})
+
+        interval = self.initial_interval
+        polls = 0
+        refreshed: Dict[str, Any] = {}
+        pending = set(self.tables)
+        while True:
+            if running:
+                self.check_refreshes(running, trigger_errors)
+            refreshed = self.refreshed_since(watermark)
+            polls += 1
+            pending = set(self.tables) - set(refreshed)
+            elapsed = self._clock() - start
+            if on_progress is not None:
+                on_progress(elapsed, refreshed, pending)
+            if not pending or elapsed >= timeout:
+                break
+            self._sleep(min(interval, max(timeout - elapsed, 0)))
+            interval = min(interval * self.backoff, self.max_interval)
+
+        return {
+            "refreshed": refreshed,
+            "pending": pending,
+            "elapsed_seconds": self._clock() - start,
+            "polls": polls,
+            "watermark": watermark,
+            "trigger_errors": trigger_errors,
+            "timed_out": bool(pending),
+        }
@@ -0,0 +1,149 @@
+"""
+Local history of pipeline runs with regression detection.
+
+Every run_pipeline.py run is stored in SQLite (the same history.db the tracer
+writes spans to): its parameters, per-step durations and statuses, per-layer
+row deltas and the MERGE_STAGING_TO_RAW result. compare() checks one run's
+step durations against the previous N runs of the same step with the same
+workload parameters (orders, staging orders, streaming mode, parallelism) and
+flags steps that slowed down by more than `z_threshold` standard deviations.
+Everything here works offline.
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+from typing import Any, Dict, List, Optional
+
+# Floors on the baseline spread, so a handful of near-identical runs doesn't
+# turn ordinary jitter into a "regression"
+MIN_STDEV_SECONDS = 0.5
+MIN_STDEV_FRACTION = 0.05
+MIN_BASELINE_RUNS = 3
+
+# Run parameters that change step durations; only runs matching on all of them are comparable
+BASELINE_PARAMETERS = ("orders", "staging_orders", "streaming_mode", "max_parallel")
+
+
+class RunHistory:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                wall_seconds REAL NOT NULL,
+                orders INTEGER,
+                staging_orders INTEGER,
+                max_parallel INTEGER,
+                streaming_mode TEXT,
+                status TEXT NOT NULL,
+                failed_steps TEXT,
+                row_deltas TEXT,
+                merge_result TEXT,
+                parameters TEXT
+            );
+            CREATE TABLE IF NOT EXISTS step_runs (
+                run_id TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                label TEXT NOT NULL,
+                status TEXT NOT NULL,
+                duration_seconds REAL NOT NULL,
+                PRIMARY KEY (run_id, step)
+            );
+        """)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def record_run(
+        self,
+        run_id: str,
+        started_at: float,
+        wall_seconds: float,
+        args,
+        results: Dict[int, Any],
+        row_deltas: Optional[Dict[str, Optional[int]]] = None,
+        merge_result: Any = None,
+    ) -> None:
+        """Store one run. `results` is DagExecutor.results (step num -> StepResult)."""
+        failed = sorted(r.num for r in results.values() if not r.ok)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, started_at, wall_seconds,
+                    args.orders, args.staging_orders, args.max_parallel, args.streaming_mode,
+                    "failed" if failed else "passed",
+                    json.dumps(failed),
+                    json.dumps(row_deltas) if row_deltas is not None else None,
+                    json.dumps(merge_result, default=str) if merge_result is not None else None,
+                    json.dumps(vars(args), default=str),
+                ),
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO step_runs VALUES (?, ?, ?, ?, ?)",
+                [(run_id, r.num, r.label, r.status, r.duration) for r in results.values()],
+            )
+
+    def latest_run_id(self) -> Optional[str]:
+        row = self.db.execute("SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+        return row["run_id"] if row else None
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def compare(self, run_id: str, last_n: int = 10, z_threshold: float = 2.0) -> List[Dict[str, Any]]:
+        """
+        Compare each passed step of `run_id` with the same step in the previous
+        `last_n` runs where it passed and BASELINE_PARAMETERS were the same.
+        Returns one dict per step with baseline mean/stdev, z-score and a
+        `regressed` flag (None when fewer than MIN_BASELINE_RUNS runs match).
+        """
+        run = self.get_run(run_id)
+        if run is None:
+            raise ValueError(f"No run {run_id} in {self.path}")
+
+        report = []
+        steps = self.db.execute(
+            "SELECT step, label, duration_seconds FROM step_runs "
+            "WHERE run_id = ? AND status = 'passed' ORDER BY step",
+            (run_id,),
+        ).fetchall()
+        # IS rather than = so runs recorded without a parameter (NULL) match each other
+        same_parameters = " AND ".join(f"r.{name} IS ?" for name in BASELINE_PARAMETERS)
+        for step in steps:
+            baseline = [
+                r["duration_seconds"]
+                for r in self.db.execute(
+                    "SELECT s.duration_seconds FROM step_runs s JOIN runs r ON r.run_id = s.run_id "
+                    f"WHERE s.step = ? AND s.status = 'passed' AND r.started_at < ? AND {same_parameters} "
+                    "ORDER BY r.started_at DESC LIMIT ?",
+                    (step["step"], run["started_at"], *(run[name] for name in BASELINE_PARAMETERS), last_n),
+                )
+            ]
+            entry: Dict[str, Any] = {
+                "step": step["step"],
+                "label": step["label"],
+                "duration": step["duration_seconds"],
+                "baseline_runs": len(baseline),
+                "mean": None,
+                "stdev": None,
+                "z": None,
+                "regressed": None,
+            }
+            if len(baseline) >= MIN_BASELINE_RUNS:
+                mean = statistics.mean(baseline)
+                stdev = max(statistics.stdev(baseline), MIN_STDEV_SECONDS, mean * MIN_STDEV_FRACTION)
+                z = (step["duration_seconds"] - mean) / stdev
+                entry.update(mean=mean, stdev=stdev, z=z, regressed=z > z_threshold)
+            report.append(entry)
+        return report
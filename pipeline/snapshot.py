@@ -0,0 +1,85 @@
+"""
+Row counts for every pipeline layer in one metadata query.
+
+Reads ROW_COUNT from <database>.INFORMATION_SCHEMA.TABLES instead of running
+COUNT(*) over each table, so a snapshot costs one cheap metadata lookup no
+matter how large the Dynamic Tables get. Counts come from table metadata and
+can trail an in-flight streaming commit by a few seconds.
+
+Takes a `query(sql) -> rows` callable so it works with both a connector
+connection (run_pipeline.py) and a Snowpark session (the Streamlit dashboard,
+which ships this file as row_count_snapshot.py, a symlink). No third-party
+imports.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# (label, schema, table)
+PIPELINE_LAYERS: List[Tuple[str, str, str]] = [
+    ("RAW.CUSTOMERS", "RAW", "CUSTOMERS"),
+    ("RAW.ORDERS", "RAW", "ORDERS"),
+    ("RAW.ORDER_ITEMS", "RAW", "ORDER_ITEMS"),
+    ("STAGING.ORDERS", "STAGING", "ORDERS_STAGING"),
+    ("STAGING.ORDER_ITEMS", "STAGING", "ORDER_ITEMS_STAGING"),
+    ("DT.ENRICHED_ORDERS", "DYNAMIC_TABLES", "ENRICHED_ORDERS"),
+    ("DT.FACT_ORDERS", "DYNAMIC_TABLES", "FACT_ORDERS"),
+    ("DT.DAILY_METRICS", "DYNAMIC_TABLES", "DAILY_BUSINESS_METRICS"),
+    ("INTERACTIVE.ANALYTICS", "INTERACTIVE", "CUSTOMER_ORDER_ANALYTICS"),
+    ("DBT.CLV", "DBT_ANALYTICS", "CUSTOMER_LIFETIME_VALUE"),
+]
+
+QueryFn = Callable[[str], Sequence[Sequence]]
+
+
+def snapshot_query(database: str, tables: Sequence[Tuple[str, str]]) -> str:
+    """One INFORMATION_SCHEMA.TABLES query covering every (schema, table) pair."""
+    names = ", ".join(f"'{schema.upper()}.{table.upper()}'" for schema, table in tables)
+    return (
+        f"SELECT table_schema, table_name, row_count "
+        f"FROM {database}.INFORMATION_SCHEMA.TABLES "
+        f"WHERE table_schema || '.' || table_name IN ({names})"
+    )
+
+
+class RowCountSnapshot:
+    def __init__(self, counts: Dict[str, Optional[int]], layers: Sequence[Tuple[str, str, str]], taken_at: float):
+        self.counts = counts
+        self.layers = list(layers)
+        self.taken_at = taken_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "layers": [list(layer) for layer in self.layers], "taken_at": self.taken_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RowCountSnapshot":
+        return cls(data["counts"], [tuple(layer) for layer in data["layers"]], data["taken_at"])
+
+    def get(self, label: str) -> Optional[int]:
+        return self.counts.get(label)
+
+    def rows(self) -> List[Tuple[str, Optional[int]]]:
+        return [(label, self.counts.get(label)) for label, _, _ in self.layers]
+
+    def deltas(self, earlier: "RowCountSnapshot") -> Dict[str, Optional[int]]:
+        """Per-layer change since `earlier` (None where either side is unknown)."""
+        result = {}
+        for label, _, _ in self.layers:
+            before, after = earlier.counts.get(label), self.counts.get(label)
+            result[label] = after - before if before is not None and after is not None else None
+        return result
+
+
+def take_snapshot(
+    query: QueryFn,
+    database: str,
+    layers: Sequence[Tuple[str, str, str]] = PIPELINE_LAYERS,
+) -> RowCountSnapshot:
+    """Row count per layer label; None for tables that don't exist (or aren't visible)."""
+    rows = query(snapshot_query(database, [(schema, table) for _, schema, table in layers]))
+    by_table = {f"{r[0]}.{r[1]}".upper(): r[2] for r in rows}
+    counts = {
+        label: by_table.get(f"{schema}.{table}".upper())
+        for label, schema, table in layers
+    }
+    return RowCountSnapshot(counts, layers, time.time())
@@ -0,0 +1,110 @@
+"""
+In-process Snowpipe Streaming for the pipeline's streaming steps.
+
+Launching automated_intelligence_streaming.py as a subprocess pays interpreter
+startup and SDK imports on every step. StreamingSession imports the streaming
+package once, opens a SnowpipeStreamingManager per config file (i.e. per target
+schema) on first use, and returns structured metrics instead of an exit code.
+Each run streams every schema once, so channels are not reused across steps.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STREAMING_SRC_DIR = Path(__file__).resolve().parent.parent / "snowpipe-streaming-python" / "src"
+DEFAULT_PROFILE = "profile.json"
+
+
+def _import_streaming(src_dir: Path):
+    """Import the streaming package from snowpipe-streaming-python/src."""
+    if str(src_dir) not in sys.path:
+        sys.path.insert(0, str(src_dir))
+    import automated_intelligence_streaming
+    return automated_intelligence_streaming
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * pct), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class StreamingSession:
+    def __init__(self, src_dir: Path = STREAMING_SRC_DIR, profile_file: str = DEFAULT_PROFILE):
+        self.src_dir = Path(src_dir)
+        self.profile_file = profile_file
+        self._apps: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _lock_for(self, config_file: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(config_file, threading.Lock())
+
+    def _get_app(self, config_file: str):
+        """Streaming app for a config file, created (clients + channels opened) on first use."""
+        app = self._apps.get(config_file)
+        if app is None:
+            module = _import_streaming(self.src_dir)
+            config = module.ConfigManager(
+                str(self.src_dir / config_file), str(self.src_dir / self.profile_file)
+            )
+            manager = module.SnowpipeStreamingManager(config)
+            app = module.AutomatedIntelligenceStreaming(config, manager)
+            self._apps[config_file] = app
+        return app
+
+    def stream_orders(
+        self, num_orders: int, config_file: str = "config_default.properties", durable_timeout: float = 120
+    ) -> Dict[str, Any]:
+        """
+        Stream `num_orders` orders through the channels for `config_file`,
+        wait for both channels to commit, and reconcile if anything is unresolved.
+        """
+        # One stream at a time per schema: the app's committer and channels aren't shared safely
+        with self._lock_for(config_file):
+            setup_start = time.time()
+            app = self._get_app(config_file)
+            setup_seconds = time.time() - setup_start
+
+            stats = app.committer.stats
+            before = {key: stats[key] for key in ("batches", "durable_batches", "orders", "items")}
+            latencies_before = len(stats["commit_latencies_ms"])
+
+            start = time.time()
+            app.generate_and_stream_orders(num_orders)
+            durable = app.wait_for_durable(durable_timeout)
+            duration = time.time() - start
+
+            reconciliation = _import_streaming(self.src_dir).reconcile_if_needed(app.config, app)
+
+            latencies = sorted(stats["commit_latencies_ms"][latencies_before:])
+            return {
+                "config_file": config_file,
+                "schema": app.config.get_schema(),
+                "setup_seconds": setup_seconds,
+                "orders": stats["orders"] - before["orders"],
+                "order_items": stats["items"] - before["items"],
+                "batches": stats["batches"] - before["batches"],
+                "durable_batches": stats["durable_batches"] - before["durable_batches"],
+                "durable": durable,
+                "duration_seconds": duration,
+                "orders_per_second": (stats["orders"] - before["orders"]) / duration if duration > 0 else 0.0,
+                "commit_latency_p50_ms": _percentile(latencies, 0.50),
+                "commit_latency_p95_ms": _percentile(latencies, 0.95),
+                "commit_latency_max_ms": latencies[-1] if latencies else None,
+                "reconciliation": reconciliation,
+            }
+
+    def close(self) -> None:
+        """Close every app's channels and drop its config subscriptions."""
+        for app in self._apps.values():
+            try:
+                app.close()
+            except Exception:
+                pass
+        self._apps.clear()
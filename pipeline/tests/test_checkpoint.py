@@ -0,0 +1,95 @@
+"""
+Tests for checkpoint.py: save/load round trip with codecs, live objects left
+out of the file, parameter mismatches and atomic rewrites.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from pipeline.checkpoint import Checkpoint
+from pipeline.snapshot import PIPELINE_LAYERS, RowCountSnapshot
+
+CODECS = {
+    "row_counts.preflight": (RowCountSnapshot.to_dict, RowCountSnapshot.from_dict),
+    "dt_watermark": (str, str),
+}
+PARAMETERS = {"connection": "demo", "orders": 1000, "staging_orders": 5000}
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "runs", "checkpoint.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_missing_file_loads_as_none(self):
+        self.assertIsNone(Checkpoint.load(self.path, CODECS))
+
+    def test_round_trip_decodes_state_with_codecs(self):
+        snapshot = RowCountSnapshot({"RAW.ORDERS": 10, "DT.FACT_ORDERS": None}, PIPELINE_LAYERS, 1700000000.0)
+        state = {
+            "row_counts.preflight": snapshot,
+            "dt_watermark": "2026-10-19 00:00:00.000 +0000",
+            "merge_result": {"updated": 3},
+        }
+        checkpoint = Checkpoint(self.path, "run-1", PARAMETERS, CODECS)
+        checkpoint.record(1, "Preflight checks", True, 2.5, state)
+        checkpoint.record(2, "Stream orders", False, 1.0, state)
+
+        loaded = Checkpoint.load(self.path, CODECS)
+
+        self.assertEqual(loaded.run_id, "run-1")
+        self.assertEqual(loaded.completed_steps, {1})
+        self.assertEqual(loaded.completed[1]["duration"], 2.5)
+        restored = loaded.state["row_counts.preflight"]
+        self.assertIsInstance(restored, RowCountSnapshot)
+        self.assertEqual(restored.rows(), snapshot.rows())
+        self.assertEqual(restored.layers, snapshot.layers)
+        self.assertEqual(restored.taken_at, snapshot.taken_at)
+        self.assertEqual(loaded.state["dt_watermark"], state["dt_watermark"])
+        self.assertEqual(loaded.state["merge_result"], {"updated": 3})
+
+    def test_live_objects_not_checkpointed(self):
+        checkpoint = Checkpoint(self.path, "run-1", PARAMETERS, CODECS)
+        checkpoint.record(1, "Preflight checks", True, 1.0, {"streaming_session": threading.Lock(), "n": 1})
+
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["state"], {"n": 1})
+        self.assertEqual(Checkpoint.load(self.path, CODECS).state, {"n": 1})
+
+    def test_none_values_skip_codecs(self):
+        checkpoint = Checkpoint(self.path, "run-1", PARAMETERS, CODECS)
+        checkpoint.record(1, "Preflight checks", True, 1.0, {"row_counts.preflight": None})
+        self.assertIsNone(Checkpoint.load(self.path, CODECS).state["row_counts.preflight"])
+
+    def test_mismatched_parameters(self):
+        checkpoint = Checkpoint(self.path, "run-1", PARAMETERS, CODECS)
+        checkpoint.save()
+        loaded = Checkpoint.load(self.path, CODECS)
+
+        self.assertEqual(loaded.mismatched_parameters(dict(PARAMETERS)), {})
+        self.assertEqual(
+            loaded.mismatched_parameters(dict(PARAMETERS, orders=2000)),
+            {"orders": (1000, 2000)},
+        )
+
+    def test_save_replaces_file_without_leaving_temp(self):
+        checkpoint = Checkpoint(self.path, "run-1", PARAMETERS, CODECS)
+        checkpoint.record(1, "a", True, 1.0, {})
+        checkpoint.record(2, "b", True, 1.0, {})
+
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["checkpoint.json"])
+        self.assertEqual(Checkpoint.load(self.path).completed_steps, {1, 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Tests for dag.py: execution waves, cycle detection, dependency ordering,
+failures not blocking dependents, stop via before_step, and step-prefixed
+output that never replaces sys.stdout.
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from pipeline.dag import (
+    FAILED, PASSED, SKIPPED, DagExecutor, PipelineContext, Step, critical_path, execution_waves,
+    step_print, validate_steps,
+)
+
+
+def _connection():
+    return nullcontext(None)
+
+
+class Recorder:
+    """Step functions that record start/finish order."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def step(self, name, ok=True, delay=0.0, error=None):
+        def run(conn, ctx):
+            with self.lock:
+                self.events.append(("start", name))
+            time.sleep(delay)
+            with self.lock:
+                self.events.append(("end", name))
+            if error is not None:
+                raise error
+            return ok
+        return run
+
+    def index(self, kind, name):
+        return self.events.index((kind, name))
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_waves_follow_dependencies(self):
+        steps = [
+            Step(1, "a", None), Step(2, "b", None, depends_on=(1,)),
+            Step(3, "c", None, depends_on=(1,)), Step(4, "d", None, depends_on=(2, 3)),
+        ]
+        self.assertEqual(execution_waves(steps), [[1], [2, 3], [4]])
+
+    def test_cycle_and_unknown_dependency_rejected(self):
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            validate_steps([Step(1, "a", None, depends_on=(2,)), Step(2, "b", None, depends_on=(1,))])
+        with self.assertRaisesRegex(ValueError, "unknown"):
+            validate_steps([Step(1, "a", None, depends_on=(9,))])
+
+
+class TestDagExecutor(unittest.TestCase):
+
+    def test_dependents_start_after_dependencies_finish(self):
+        rec = Recorder()
+        steps = [
+            Step(1, "a", rec.step("a")),
+            Step(2, "b", rec.step("b", delay=0.05), depends_on=(1,)),
+            Step(3, "c", rec.step("c"), depends_on=(1,)),
+            Step(4, "d", rec.step("d"), depends_on=(2, 3)),
+        ]
+        with redirect_stdout(io.StringIO()):
+            results = DagExecutor(steps, _connection, max_workers=4).run(PipelineContext(args=None))
+
+        self.assertTrue(all(r.status == PASSED for r in results.values()))
+        self.assertLess(rec.index("end", "a"), rec.index("start", "b"))
+        self.assertLess(rec.index("end", "a"), rec.index("start", "c"))
+        self.assertLess(rec.index("end", "b"), rec.index("start", "d"))
+        self.assertLess(rec.index("end", "c"), rec.index("start", "d"))
+
+    def test_independent_steps_overlap(self):
+        rec = Recorder()
+        steps = [Step(1, "a", rec.step("a", delay=0.1)), Step(2, "b", rec.step("b", delay=0.1))]
+        with redirect_stdout(io.StringIO()):
+            DagExecutor(steps, _connection, max_workers=2).run(PipelineContext(args=None))
+        self.assertLess(rec.index("start", "b"), rec.index("end", "a"))
+
+    def test_failure_recorded_and_dependents_still_run(self):
+        rec = Recorder()
+        steps = [
+            Step(1, "a", rec.step("a", error=RuntimeError("boom"))),
+            Step(2, "b", rec.step("b", ok=False), depends_on=(1,)),
+            Step(3, "c", rec.step("c"), depends_on=(2,)),
+        ]
+        stderr = io.StringIO()
+        with redirect_stdout(io.StringIO()), redirect_stderr(stderr):
+            results = DagExecutor(steps, _connection, max_workers=1).run(PipelineContext(args=None))
+
+        self.assertEqual(results[1].status, FAILED)
+        self.assertEqual(results[1].error, "boom")
+        self.assertEqual(results[2].status, FAILED)
+        self.assertIsNone(results[2].error)
+        self.assertEqual(results[3].status, PASSED)
+        self.assertIn("Step 1 raised: boom", stderr.getvalue())
+
+    def test_skipped_steps_count_as_finished(self):
+        rec = Recorder()
+        steps = [Step(1, "a", rec.step("a")), Step(2, "b", rec.step("b"), depends_on=(1,))]
+        results = DagExecutor(steps, _connection).run(
+            PipelineContext(args=None), skip=lambda step: "not needed" if step.num == 1 else None)
+
+        self.assertEqual(results[1].status, SKIPPED)
+        self.assertEqual(results[1].reason, "not needed")
+        self.assertEqual(results[2].status, PASSED)
+
+    def test_before_step_false_stops_scheduling(self):
+        rec = Recorder()
+        steps = [Step(1, "a", rec.step("a")), Step(2, "b", rec.step("b"), depends_on=(1,))]
+        results = DagExecutor(
+            steps, _connection, before_step=lambda step: step.num != 2,
+        ).run(PipelineContext(args=None))
+
+        self.assertEqual(sorted(results), [1])
+        self.assertNotIn(("start", "b"), rec.events)
+
+    def test_critical_path_follows_longest_chain(self):
+        rec = Recorder()
+        steps = [
+            Step(1, "a", rec.step("a")),
+            Step(2, "slow", rec.step("slow", delay=0.1), depends_on=(1,)),
+            Step(3, "fast", rec.step("fast"), depends_on=(1,)),
+            Step(4, "d", rec.step("d"), depends_on=(2, 3)),
+        ]
+        with redirect_stdout(io.StringIO()):
+            results = DagExecutor(steps, _connection, max_workers=4).run(PipelineContext(args=None))
+        path, seconds = critical_path(steps, results)
+        self.assertEqual(path, [1, 2, 4])
+        self.assertGreaterEqual(seconds, 0.1)
+
+
+class TestStepOutput(unittest.TestCase):
+
+    def test_parallel_output_prefixed_per_line_without_replacing_stdout(self):
+        seen_streams = []
+
+        def chatty(name):
+            def run(conn, ctx):
+                seen_streams.append(sys.stdout)
+                for i in range(3):
+                    step_print(f"{name} line", end="")
+                    step_print(f" {i}")
+                    time.sleep(0.01)
+                step_print(f"{name} unterminated", end="")
+                return True
+            return run
+
+        out = io.StringIO()
+        steps = [Step(1, "a", chatty("a")), Step(2, "b", chatty("b"))]
+        with redirect_stdout(out):
+            DagExecutor(steps, _connection, max_workers=2).run(PipelineContext(args=None))
+
+        self.assertEqual(seen_streams, [out, out])
+        lines = out.getvalue().splitlines()
+        for num, name in ((1, "a"), (2, "b")):
+            prefix = f"[{num}: {name}] "
+            self.assertEqual(
+                [line for line in lines if line.startswith(prefix)],
+                [f"{prefix}{name} line {i}" for i in range(3)] + [f"{prefix}{name} unterminated"],
+            )
+        self.assertEqual(len(lines), 8)
+
+    def test_serial_output_unprefixed(self):
+        out = io.StringIO()
+        steps = [Step(1, "a", lambda conn, ctx: step_print("hello") or True)]
+        with redirect_stdout(out):
+            DagExecutor(steps, _connection, max_workers=1).run(PipelineContext(args=None))
+        self.assertEqual(out.getvalue(), "hello\n")
+        step_print("outside", file=out)
+        self.assertTrue(out.getvalue().endswith("outside\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
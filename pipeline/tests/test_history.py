@@ -0,0 +1,121 @@
+"""
+Tests for history.py: RunHistory.compare z-scores against the previous runs,
+matching on BASELINE_PARAMETERS, the stdev floors and the minimum baseline.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from pipeline.dag import FAILED, PASSED, StepResult
+from pipeline.history import MIN_BASELINE_RUNS, MIN_STDEV_SECONDS, RunHistory
+
+
+def _args(**overrides):
+    values = dict(orders=1000, staging_orders=5000, max_parallel=4, streaming_mode="in-process")
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _results(durations, status=PASSED):
+    """step num -> StepResult lasting durations[num] seconds"""
+    return {
+        num: StepResult(num, f"step {num}", status, started_at=100.0, finished_at=100.0 + seconds)
+        for num, seconds in durations.items()
+    }
+
+
+class TestRunHistoryCompare(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.history = RunHistory(os.path.join(self.tmpdir.name, "history.db"))
+        self.started = 1000.0
+
+    def tearDown(self):
+        self.history.close()
+        self.tmpdir.cleanup()
+
+    def _record(self, run_id, durations, status=PASSED, **args):
+        self.started += 60
+        self.history.record_run(run_id, self.started, sum(durations.values()), _args(**args),
+                                _results(durations, status))
+
+    def _entry(self, run_id, step=1, **kwargs):
+        return next(e for e in self.history.compare(run_id, **kwargs) if e["step"] == step)
+
+    def test_z_score_against_previous_runs(self):
+        for i, seconds in enumerate([10.0, 12.0, 14.0]):
+            self._record(f"base{i}", {1: seconds})
+        self._record("slow", {1: 20.0})
+
+        entry = self._entry("slow")
+        self.assertEqual(entry["baseline_runs"], 3)
+        self.assertAlmostEqual(entry["mean"], 12.0)
+        self.assertAlmostEqual(entry["stdev"], 2.0)
+        self.assertAlmostEqual(entry["z"], 4.0)
+        self.assertTrue(entry["regressed"])
+        self.assertFalse(self._entry("slow", z_threshold=5.0)["regressed"])
+
+    def test_only_runs_with_same_parameters_are_baseline(self):
+        for i in range(MIN_BASELINE_RUNS):
+            self._record(f"small{i}", {1: 10.0})
+            self._record(f"big{i}", {1: 100.0}, orders=50000)
+            self._record(f"serial{i}", {1: 50.0}, max_parallel=1)
+        self._record("now", {1: 10.5})
+
+        entry = self._entry("now")
+        self.assertEqual(entry["baseline_runs"], MIN_BASELINE_RUNS)
+        self.assertAlmostEqual(entry["mean"], 10.0)
+        self.assertFalse(entry["regressed"])
+
+    def test_later_and_failed_runs_excluded(self):
+        for i in range(MIN_BASELINE_RUNS):
+            self._record(f"base{i}", {1: 10.0})
+        self._record("failed", {1: 1.0}, status=FAILED)
+        self._record("now", {1: 10.0})
+        self._record("later", {1: 99.0})
+
+        self.assertEqual(self._entry("now")["baseline_runs"], MIN_BASELINE_RUNS)
+        self.assertEqual([e["step"] for e in self.history.compare("failed")], [])
+
+    def test_last_n_limits_baseline_to_most_recent(self):
+        for i, seconds in enumerate([100.0, 10.0, 10.0, 10.0]):
+            self._record(f"base{i}", {1: seconds})
+        self._record("now", {1: 10.0})
+
+        entry = self._entry("now", last_n=3)
+        self.assertEqual(entry["baseline_runs"], 3)
+        self.assertAlmostEqual(entry["mean"], 10.0)
+
+    def test_identical_baseline_uses_stdev_floor(self):
+        for i in range(MIN_BASELINE_RUNS):
+            self._record(f"base{i}", {1: 4.0})
+        self._record("now", {1: 4.4})
+
+        entry = self._entry("now")
+        self.assertEqual(entry["stdev"], MIN_STDEV_SECONDS)
+        self.assertAlmostEqual(entry["z"], 0.8)
+        self.assertFalse(entry["regressed"])
+
+    def test_too_few_baseline_runs_not_judged(self):
+        for i in range(MIN_BASELINE_RUNS - 1):
+            self._record(f"base{i}", {1: 10.0})
+        self._record("now", {1: 50.0})
+
+        entry = self._entry("now")
+        self.assertEqual(entry["baseline_runs"], MIN_BASELINE_RUNS - 1)
+        self.assertIsNone(entry["z"])
+        self.assertIsNone(entry["regressed"])
+
+    def test_unknown_run_rejected(self):
+        with self.assertRaises(ValueError):
+            self.history.compare("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+Structured tracing for pipeline runs.
+
+Every step and every SQL statement becomes a span with start/end time and
+attributes (query_id, warehouse, rows, ...). SQL spans nest under the step
+span that issued them, also when steps run on different threads. A finished
+trace exports to OTLP/JSON (loadable by any OpenTelemetry collector or viewer)
+and to a local SQLite database so runs can be compared over time.
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+SERVICE_NAME = "run_pipeline"
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_UNSET
+    status_message: str = ""
+
+    @property
+    def duration_ms(self) -> float:
+        return max(self.end_ns - self.start_ns, 0) / 1e6
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    def __init__(self, run_id: Optional[str] = None):
+        self.trace_id = secrets.token_hex(16)
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Warehouse each connection is currently using (USE WAREHOUSE isn't reported back by the cursor)
+        self._warehouses: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_span(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", parent: Optional[Span] = None, **attributes: Any) -> Iterator[Span]:
+        """Record a span around the block; exceptions mark it as an error and propagate."""
+        if parent is None:
+            parent = self.current_span()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            start_ns=time.time_ns(),
+        )
+        if parent is not None and "pipeline.step" in parent.attributes:
+            # SQL spans carry their step number, so history queries don't need the tree
+            span.set(**{"pipeline.step": parent.attributes["pipeline.step"]})
+        span.set(**attributes)
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+            if span.status == STATUS_UNSET:
+                span.status = STATUS_OK
+        except BaseException as e:
+            span.status = STATUS_ERROR
+            span.status_message = str(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def annotate(self, **attributes: Any) -> None:
+        """Add attributes to the innermost open span on this thread (no-op if none)."""
+        span = self.current_span()
+        if span is not None:
+            span.set(**attributes)
+
+    def note_warehouse(self, conn, warehouse: str) -> None:
+        self._warehouses[conn] = warehouse.upper()
+
+    def warehouse_for(self, conn) -> Optional[str]:
+        try:
+            return self._warehouses.get(conn)
+        except TypeError:
+            return None
+
+    # ── Export ───────────────────────────────────────────────────────────────
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ExportTraceServiceRequest."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": _otlp_value(SERVICE_NAME)},
+                    {"key": "pipeline.run_id", "value": _otlp_value(self.run_id)},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "pipeline.tracing"},
+                    "spans": [
+                        {
+                            "traceId": s.trace_id,
+                            "spanId": s.span_id,
+                            **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                            "name": s.name,
+                            "kind": 3 if s.kind == "sql" else 1,  # CLIENT for SQL, INTERNAL otherwise
+                            "startTimeUnixNano": str(s.start_ns),
+                            "endTimeUnixNano": str(s.end_ns),
+                            "attributes": [
+                                {"key": k, "value": _otlp_value(v)}
+                                for k, v in {"pipeline.span_kind": s.kind, **s.attributes}.items()
+                            ],
+                            "status": {"code": s.status, **({"message": s.status_message} if s.status_message else {})},
+                        }
+                        for s in spans
+                    ],
+                }],
+            }]
+        }
+
+    def export_json(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f, indent=2)
+
+    def export_sqlite(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            spans = list(self.spans)
+        db = sqlite3.connect(path)
+        try:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS spans (
+                    run_id TEXT NOT NULL,
+                    trace_id TEXT NOT NULL,
+                    span_id TEXT PRIMARY KEY,
+                    parent_span_id TEXT,
+                    name TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    start_ts REAL NOT NULL,
+                    end_ts REAL NOT NULL,
+                    duration_ms REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    status_message TEXT,
+                    step INTEGER,
+                    query_id TEXT,
+                    warehouse TEXT,
+                    rows INTEGER,
+                    attributes TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS spans_by_run ON spans (run_id)")
+            db.executemany(
+                "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        self.run_id, s.trace_id, s.span_id, s.parent_id, s.name, s.kind,
+                        s.start_ns / 1e9, s.end_ns / 1e9, s.duration_ms,
+                        {STATUS_OK: "ok", STATUS_ERROR: "error"}.get(s.status, "unset"), s.status_message or None,
+                        s.attributes.get("pipeline.step"), s.attributes.get("db.query_id"),
+                        s.attributes.get("db.warehouse"), s.attributes.get("db.rows"),
+                        json.dumps(s.attributes, default=str),
+                    )
+                    for s in spans
+                ],
+            )
+            db.commit()
+        finally:
+            db.close()
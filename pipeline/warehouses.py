@@ -0,0 +1,164 @@
+"""
+Concurrent warehouse resume and warm-up.
+
+Resuming warehouses one `ALTER WAREHOUSE ... RESUME` at a time stacks their
+cold starts. warm_up_warehouses() submits every resume asynchronously, then
+one small compute probe per warehouse (also async, each bound to its warehouse
+at submission), and polls until all have finished. Each warehouse's readiness
+latency - resume plus first query - is returned so cold-start cost shows up
+explicitly in benchmark results instead of inflating the first timed query.
+
+Works with a snowflake.connector connection (execute_async) or a Snowpark
+session (collect_nowait); the Streamlit dashboard ships this file as
+warehouse_control.py (a symlink). No third-party imports.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Needs a running warehouse (unlike SELECT 1), but touches no tables
+WARM_SQL = "SELECT SUM(SEQ4()) FROM TABLE(GENERATOR(ROWCOUNT => 1000))"
+
+
+class _ConnectorRunner:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql: str) -> List[tuple]:
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def submit(self, sql: str) -> str:
+        cur = self.conn.cursor()
+        try:
+            cur.execute_async(sql)
+            return cur.sfqid
+        finally:
+            cur.close()
+
+    def done(self, query_id: str) -> bool:
+        """True once the query finished; raises if it failed."""
+        status = self.conn.get_query_status_throw_if_error(query_id)
+        return not self.conn.is_still_running(status)
+
+    def current_warehouse(self) -> Optional[str]:
+        return self.execute("SELECT CURRENT_WAREHOUSE()")[0][0]
+
+
+class _SnowparkRunner:
+    def __init__(self, session):
+        self.session = session
+
+    def execute(self, sql: str) -> List[Any]:
+        return self.session.sql(sql).collect()
+
+    def submit(self, sql: str):
+        return self.session.sql(sql).collect_nowait()
+
+    def done(self, job) -> bool:
+        if not job.is_done():
+            return False
+        job.result()  # raises if the query failed
+        return True
+
+    def current_warehouse(self) -> Optional[str]:
+        return self.session.get_current_warehouse()
+
+
+def _runner(target):
+    return _ConnectorRunner(target) if hasattr(target, "cursor") else _SnowparkRunner(target)
+
+
+def _wait_all(
+    runner,
+    handles: Dict[str, Any],
+    started: float,
+    timeout: float,
+    clock: Callable[[], float],
+    sleep: Callable[[float], None],
+) -> Dict[str, Dict[str, Any]]:
+    """Poll submitted queries until all finish; per key: elapsed ms on completion or error."""
+    outcome: Dict[str, Dict[str, Any]] = {}
+    pending = dict(handles)
+    interval = 0.05
+    while pending:
+        for key, handle in list(pending.items()):
+            try:
+                finished = runner.done(handle)
+            except Exception as e:
+                outcome[key] = {"ms": (clock() - started) * 1000, "error": str(e)}
+                del pending[key]
+                continue
+            if finished:
+                outcome[key] = {"ms": (clock() - started) * 1000, "error": None}
+                del pending[key]
+        if pending:
+            if clock() - started >= timeout:
+                for key in pending:
+                    outcome[key] = {"ms": None, "error": f"not ready after {timeout:.0f}s"}
+                break
+            sleep(interval)
+            interval = min(interval * 2, 0.5)
+    return outcome
+
+
+def warm_up_warehouses(
+    target,
+    warehouses: Sequence[str],
+    warm_sql: Optional[str] = WARM_SQL,
+    timeout: float = 300.0,
+    clock: Callable[[], float] = time.time,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Resume (if suspended) and warm every warehouse concurrently. Returns
+    warehouse -> {"ready": bool, "resume_ms", "ready_ms", "error"}, where
+    ready_ms is the time until the warehouse answered its first query.
+    The session's current warehouse is restored afterwards.
+    """
+    runner = _runner(target)
+    started = clock()
+    results: Dict[str, Dict[str, Any]] = {
+        wh: {"ready": False, "resume_ms": None, "ready_ms": None, "error": None} for wh in warehouses
+    }
+
+    resumes = {}
+    for wh in warehouses:
+        try:
+            resumes[wh] = runner.submit(f"ALTER WAREHOUSE {wh} RESUME IF SUSPENDED")
+        except Exception as e:
+            results[wh]["error"] = str(e)
+    for wh, outcome in _wait_all(runner, resumes, started, timeout, clock, sleep).items():
+        results[wh]["resume_ms"] = outcome["ms"]
+        results[wh]["error"] = outcome["error"]
+
+    resumed = [wh for wh in warehouses if results[wh]["error"] is None]
+    if not warm_sql:
+        for wh in resumed:
+            results[wh].update(ready=True, ready_ms=results[wh]["resume_ms"])
+        return results
+
+    # Async queries run on the warehouse that was current when they were
+    # submitted, so switch between submissions and restore afterwards
+    original = runner.current_warehouse()
+    probes = {}
+    try:
+        for wh in resumed:
+            try:
+                runner.execute(f"USE WAREHOUSE {wh}")
+                probes[wh] = runner.submit(warm_sql)
+            except Exception as e:
+                results[wh]["error"] = str(e)
+    finally:
+        if original:
+            runner.execute(f"USE WAREHOUSE {original}")
+
+    for wh, outcome in _wait_all(runner, probes, started, timeout, clock, sleep).items():
+        if outcome["error"] is None:
+            results[wh].update(ready=True, ready_ms=outcome["ms"])
+        results[wh]["error"] = outcome["error"]
+    return results
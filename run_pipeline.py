@@ -2,43 +2,67 @@
 """
 End-to-end pipeline runner for the Automated Intelligence demo.
 
-Runs all 9 steps of the pipeline sequentially:
+Runs the 9 steps of the pipeline as a dependency graph — independent steps
+(e.g. the two streaming steps, or the Cortex Agent and Cortex Search checks)
+run concurrently, each on its own pooled connection:
   1. Preflight checks (warehouses, schemas, row counts)
-  2. Stream 1K orders to RAW
-  3. Stream 5K orders to STAGING
-  4. Gen2 MERGE staging → RAW
-  5. Wait for Dynamic Table refresh
-  6. Interactive Table point lookup
-  7. Cortex Agent verification
-  8. Cortex Search query
-  9. Summary report
+  2. Stream 1K orders to RAW                      (after 1)
+  3. Stream 5K orders to STAGING                  (after 1)
+  4. Gen2 MERGE staging → RAW                     (after 3)
+  5. Wait for Dynamic Table refresh               (after 2, 4)
+  6. Interactive Table point lookup               (after 5)
+  7. Cortex Agent verification                    (after 1)
+  8. Cortex Search query                          (after 1)
+  9. Summary report                               (after 2-8)
 
 Usage:
   python run_pipeline.py                         # non-interactive, all steps
-  python run_pipeline.py --interactive           # pause between steps
+  python run_pipeline.py --interactive           # pause between steps (runs sequentially)
   python run_pipeline.py --step 3               # start from step 3
   python run_pipeline.py --skip-streaming        # skip steps 2-3
   python run_pipeline.py --dry-run               # print steps, don't execute
   python run_pipeline.py --connection NAME       # override Snowflake connection
   python run_pipeline.py --orders 500            # override order count for RAW streaming
   python run_pipeline.py --staging-orders 2000   # override order count for staging
+  python run_pipeline.py --max-parallel 1        # run steps one at a time
+  python run_pipeline.py --streaming-mode subprocess  # launch the streaming script per step
+  python run_pipeline.py --no-dt-refresh         # don't trigger DT refreshes in step 5
+  python run_pipeline.py --no-trace              # don't write .pipeline_runs/ traces
+  python run_pipeline.py --compare               # offline: latest run vs. the 10 before it
+  python run_pipeline.py --resume                # continue the last run after a failure
+  python run_pipeline.py --result-file out.json  # machine-readable outcome (default: .pipeline_runs/result.json)
 """
 
 import argparse
+import json
+import secrets
 import subprocess
 import sys
 import time
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
 from textwrap import dedent
+from typing import Optional
 
 import snowflake.connector
 
+from pipeline.checkpoint import Checkpoint
+from pipeline.connections import ConnectionPool
+from pipeline.dag import SKIPPED, DagExecutor, PipelineContext, Step, critical_path, execution_waves, step_print
+from pipeline.dt_refresh import DynamicTableRefreshWaiter
+from pipeline.history import RunHistory
+from pipeline.snapshot import RowCountSnapshot, take_snapshot
+from pipeline.streaming import StreamingSession
+from pipeline.tracing import Tracer
+from pipeline.warehouses import warm_up_warehouses
+
 # ── Defaults ─────────────────────────────────────────────────────────────────
 
 DEFAULT_CONNECTION = "dash-builder-si"
 DEFAULT_RAW_ORDERS = 1000
 DEFAULT_STAGING_ORDERS = 5000
+DEFAULT_MAX_PARALLEL = 4
 STREAMING_DIR = Path(__file__).parent / "snowpipe-streaming-python"
 DATABASE = "AUTOMATED_INTELLIGENCE"
 
@@ -47,6 +71,10 @@ WH_DEFAULT = "automated_intelligence_wh"
 WH_GEN2 = "automated_intelligence_gen2_wh"
 WH_INTERACTIVE = "automated_intelligence_interactive_wh"
 
+# Trace export (OTLP/JSON per run + SQLite history across runs)
+DEFAULT_TRACE_DIR = Path(__file__).parent / ".pipeline_runs"
+TRACER: Optional[Tracer] = None  # set in main() unless --no-trace
+
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
 
@@ -55,40 +83,48 @@ def timestamp():
 
 
 def header(step_num: int, title: str):
-    print(f"\n{'='*60}")
-    print(f"  Step {step_num}: {title}")
-    print(f"  [{timestamp()}]")
-    print(f"{'='*60}\n")
+    step_print(f"\n{'='*60}")
+    step_print(f"  Step {step_num}: {title}")
+    step_print(f"  [{timestamp()}]")
+    step_print(f"{'='*60}\n")
 
 
 def info(msg: str):
-    print(f"  {msg}")
+    step_print(f"  {msg}")
 
 
 def success(msg: str):
-    print(f"  [OK] {msg}")
+    step_print(f"  [OK] {msg}")
 
 
 def warn(msg: str):
-    print(f"  [WARN] {msg}", file=sys.stderr)
+    step_print(f"  [WARN] {msg}", file=sys.stderr)
 
 
 def fail(msg: str):
-    print(f"  [FAIL] {msg}", file=sys.stderr)
+    step_print(f"  [FAIL] {msg}", file=sys.stderr)
 
 
 def run_sql(conn, sql: str, fetch: bool = True):
-    """Execute SQL and optionally return results."""
+    """Execute SQL and optionally return results (traced as a span when tracing is on)."""
     cur = conn.cursor()
-    try:
-        cur.execute(sql)
-        if fetch:
-            cols = [desc[0] for desc in cur.description] if cur.description else []
-            rows = cur.fetchall()
-            return cols, rows
-        return None, None
-    finally:
-        cur.close()
+    span_context = TRACER.span(
+        " ".join(sql.split())[:80],
+        kind="sql",
+        **{"db.statement": dedent(sql).strip(), "db.warehouse": TRACER.warehouse_for(conn)},
+    ) if TRACER is not None else nullcontext()
+    with span_context as span:
+        try:
+            cur.execute(sql)
+            if span is not None:
+                span.set(**{"db.query_id": cur.sfqid, "db.rows": cur.rowcount})
+            if fetch:
+                cols = [desc[0] for desc in cur.description] if cur.description else []
+                rows = cur.fetchall()
+                return cols, rows
+            return None, None
+        finally:
+            cur.close()
 
 
 def print_table(cols: list, rows: list, max_col_width: int = 40):
@@ -108,31 +144,38 @@ def print_table(cols: list, rows: list, max_col_width: int = 40):
     def fmt(values):
         return "  " + " | ".join(v.ljust(widths[i])[:widths[i]] for i, v in enumerate(values))
 
-    print(fmt(cols))
-    print("  " + "-+-".join("-" * w for w in widths))
+    step_print(fmt(cols))
+    step_print("  " + "-+-".join("-" * w for w in widths))
     for row in str_rows:
-        print(fmt(row))
-    print()
+        step_print(fmt(row))
+    step_print()
 
 
 def use_warehouse(conn, wh: str):
     run_sql(conn, f"USE WAREHOUSE {wh}", fetch=False)
+    if TRACER is not None:
+        TRACER.note_warehouse(conn, wh)
 
 
 # ── Pipeline Steps ───────────────────────────────────────────────────────────
 
 
-def step_1_preflight(conn) -> bool:
+def step_1_preflight(conn, ctx: PipelineContext) -> bool:
     """Preflight: resume warehouses, verify schemas, show baseline counts."""
     header(1, "Preflight Checks")
 
-    # Resume warehouses
-    for wh in [WH_DEFAULT, WH_GEN2, WH_INTERACTIVE]:
-        try:
-            run_sql(conn, f"ALTER WAREHOUSE {wh} RESUME IF SUSPENDED", fetch=False)
-            success(f"Warehouse {wh} resumed")
-        except Exception as e:
-            warn(f"Could not resume {wh}: {e}")
+    # Resume and warm all warehouses concurrently; readiness latency is the cold-start cost
+    readiness = warm_up_warehouses(conn, [WH_DEFAULT, WH_GEN2, WH_INTERACTIVE])
+    ctx.set("warehouse_readiness", readiness)
+    for wh, status in readiness.items():
+        if status["ready"]:
+            success(f"Warehouse {wh} ready in {status['ready_ms']:,.0f}ms (resume {status['resume_ms']:,.0f}ms)")
+        else:
+            warn(f"Could not resume {wh}: {status['error']}")
+    if TRACER is not None:
+        TRACER.annotate(**{
+            f"warehouse.{wh.lower()}.ready_ms": status["ready_ms"] for wh, status in readiness.items()
+        })
 
     use_warehouse(conn, WH_DEFAULT)
 
@@ -157,25 +200,41 @@ def step_1_preflight(conn) -> bool:
     else:
         info("(no dynamic tables found)")
 
-    # Baseline row counts
+    # Baseline row counts (one metadata query, kept for the summary's deltas)
     info("Baseline row counts:")
-    cols, rows = run_sql(conn, dedent(f"""\
-        SELECT 'RAW.CUSTOMERS' as layer, COUNT(*) as row_count FROM {DATABASE}.RAW.CUSTOMERS
-        UNION ALL SELECT 'RAW.ORDERS', COUNT(*) FROM {DATABASE}.RAW.ORDERS
-        UNION ALL SELECT 'RAW.ORDER_ITEMS', COUNT(*) FROM {DATABASE}.RAW.ORDER_ITEMS
-        UNION ALL SELECT 'DT.ENRICHED_ORDERS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.ENRICHED_ORDERS
-        UNION ALL SELECT 'DT.FACT_ORDERS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.FACT_ORDERS
-        UNION ALL SELECT 'DT.DAILY_METRICS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.DAILY_BUSINESS_METRICS
-        UNION ALL SELECT 'INTERACTIVE.ANALYTICS', COUNT(*) FROM {DATABASE}.INTERACTIVE.CUSTOMER_ORDER_ANALYTICS
-        UNION ALL SELECT 'DBT.CLV', COUNT(*) FROM {DATABASE}.DBT_ANALYTICS.CUSTOMER_LIFETIME_VALUE
-    """))
-    print_table(cols, rows)
+    snapshot = take_snapshot(lambda sql: run_sql(conn, sql)[1], DATABASE)
+    ctx.set("row_counts.preflight", snapshot)
+    print_table(["LAYER", "ROW_COUNT"], snapshot.rows())
     return True
 
 
-def step_2_stream_raw(conn, num_orders: int) -> bool:
-    """Stream orders to RAW via Snowpipe Streaming SDK."""
-    header(2, f"Stream {num_orders:,} Orders → RAW")
+def stream_orders(ctx: PipelineContext, num_orders: int, config_file: str, target: str) -> bool:
+    """Stream orders with the in-process session, or by launching the streaming script."""
+    if ctx.args.streaming_mode == "in-process":
+        session = ctx.get("streaming_session")
+        info(f"Streaming in-process ({config_file})")
+        try:
+            metrics = session.stream_orders(num_orders, config_file)
+        except Exception as e:
+            fail(f"Streaming to {target} failed: {e}")
+            return False
+        ctx.set(f"streaming.{target.lower()}", metrics)
+        if TRACER is not None:
+            TRACER.annotate(**{
+                f"streaming.{key}": value for key, value in metrics.items()
+                if isinstance(value, (int, float, str, bool))
+            })
+
+        info(f"  Channels opened in {metrics['setup_seconds']:.1f}s")
+        info(f"  Rows: {metrics['orders']:,} orders, {metrics['order_items']:,} order items "
+             f"in {metrics['batches']} batches ({metrics['orders_per_second']:,.0f} orders/sec)")
+        if metrics["commit_latency_p50_ms"] is not None:
+            info(f"  Commit latency: p50 {metrics['commit_latency_p50_ms']:.0f}ms, "
+                 f"p95 {metrics['commit_latency_p95_ms']:.0f}ms, max {metrics['commit_latency_max_ms']:.0f}ms")
+        if not metrics["durable"]:
+            warn(f"{metrics['batches'] - metrics['durable_batches']} batches not yet committed on both channels")
+        success(f"Streamed {metrics['orders']:,} orders to {target} in {metrics['duration_seconds']:.1f}s")
+        return True
 
     src_dir = STREAMING_DIR / "src"
     script = src_dir / "automated_intelligence_streaming.py"
@@ -183,25 +242,33 @@ def step_2_stream_raw(conn, num_orders: int) -> bool:
         fail(f"Streaming script not found: {script}")
         return False
 
-    info(f"Running: python {script.name} {num_orders}")
+    info(f"Running: python {script.name} {num_orders} {config_file}")
     t0 = time.time()
     result = subprocess.run(
-        [sys.executable, str(script), str(num_orders)],
+        [sys.executable, str(script), str(num_orders), config_file],
         cwd=str(src_dir),
         capture_output=False,
     )
     elapsed = time.time() - t0
 
     if result.returncode != 0:
-        fail(f"Streaming to RAW failed (exit code {result.returncode})")
+        fail(f"Streaming to {target} failed (exit code {result.returncode})")
         return False
 
-    success(f"Streamed {num_orders:,} orders to RAW in {elapsed:.1f}s")
+    success(f"Streamed {num_orders:,} orders to {target} in {elapsed:.1f}s")
     return True
 
 
-def step_3_stream_staging(conn, num_orders: int) -> bool:
+def step_2_stream_raw(conn, ctx: PipelineContext) -> bool:
+    """Stream orders to RAW via Snowpipe Streaming SDK."""
+    num_orders = ctx.args.orders
+    header(2, f"Stream {num_orders:,} Orders → RAW")
+    return stream_orders(ctx, num_orders, "config_default.properties", "RAW")
+
+
+def step_3_stream_staging(conn, ctx: PipelineContext) -> bool:
     """Stream orders to STAGING for Gen2 MERGE demo."""
+    num_orders = ctx.args.staging_orders
     header(3, f"Stream {num_orders:,} Orders → STAGING")
 
     # Truncate staging first
@@ -209,25 +276,9 @@ def step_3_stream_staging(conn, num_orders: int) -> bool:
     run_sql(conn, f"CALL {DATABASE}.STAGING.TRUNCATE_STAGING_TABLES()", fetch=False)
     success("Staging tables truncated")
 
-    src_dir = STREAMING_DIR / "src"
-    script = src_dir / "automated_intelligence_streaming.py"
-    config = "config_staging.properties"
-
-    info(f"Running: python {script.name} {num_orders} {config}")
-    t0 = time.time()
-    result = subprocess.run(
-        [sys.executable, str(script), str(num_orders), config],
-        cwd=str(src_dir),
-        capture_output=False,
-    )
-    elapsed = time.time() - t0
-
-    if result.returncode != 0:
-        fail(f"Streaming to STAGING failed (exit code {result.returncode})")
+    if not stream_orders(ctx, num_orders, "config_staging.properties", "STAGING"):
         return False
 
-    success(f"Streamed {num_orders:,} orders to STAGING in {elapsed:.1f}s")
-
     # Show staging counts
     info("\nStaging counts:")
     cols, rows = run_sql(conn, f"CALL {DATABASE}.STAGING.GET_STAGING_COUNTS()")
@@ -236,7 +287,7 @@ def step_3_stream_staging(conn, num_orders: int) -> bool:
     return True
 
 
-def step_4_gen2_merge(conn) -> bool:
+def step_4_gen2_merge(conn, ctx: PipelineContext) -> bool:
     """Run Gen2 MERGE: staging → RAW using Gen2 warehouse."""
     header(4, "Gen2 MERGE: STAGING → RAW")
 
@@ -254,6 +305,10 @@ def step_4_gen2_merge(conn) -> bool:
 
     if rows:
         info(f"  Result: {rows[0][0]}")
+        try:
+            ctx.set("merge_result", json.loads(rows[0][0]))
+        except (json.JSONDecodeError, TypeError):
+            ctx.set("merge_result", rows[0][0])
     success(f"Gen2 MERGE completed in {elapsed:.1f}s")
 
     # Restore discount snapshot
@@ -265,7 +320,7 @@ def step_4_gen2_merge(conn) -> bool:
     return True
 
 
-def step_5_wait_dt(conn) -> bool:
+def step_5_wait_dt(conn, ctx: PipelineContext) -> bool:
     """Wait for Dynamic Tables to refresh after new data."""
     header(5, "Wait for Dynamic Table Refresh")
 
@@ -278,48 +333,35 @@ def step_5_wait_dt(conn) -> bool:
         "PRODUCT_PERFORMANCE_METRICS",
     ]
     max_wait = 180  # 3 minutes
-    poll_interval = 10
-    start = time.time()
-
-    # Grab the server-side timestamp for timezone-safe comparison
-    _, ts_rows = run_sql(conn, "SELECT CURRENT_TIMESTAMP()")
-    check_time = ts_rows[0][0] if ts_rows else None
-
-    info(f"Waiting up to {max_wait}s for DT refreshes (checking since {check_time})...")
-
-    rows = []
-    cols = []
-    while time.time() - start < max_wait:
-        cols, rows = run_sql(conn, dedent(f"""\
-            SELECT name, state, refresh_action,
-                   DATEDIFF('second', refresh_start_time, refresh_end_time) as secs
-            FROM TABLE(INFORMATION_SCHEMA.DYNAMIC_TABLE_REFRESH_HISTORY(
-                NAME_PREFIX => '{DATABASE}.DYNAMIC_TABLES'))
-            WHERE state = 'SUCCEEDED'
-              AND refresh_action != 'NO_DATA'
-              AND refresh_end_time >= '{check_time}'
-            QUALIFY ROW_NUMBER() OVER (PARTITION BY name ORDER BY data_timestamp DESC) = 1
-            ORDER BY name
-        """))
-
-        refreshed = {r[0] for r in rows} if rows else set()
-        pending = set(target_tables) - refreshed
-        info(f"  [{int(time.time()-start)}s] Refreshed: {len(refreshed)}/{len(target_tables)} — pending: {pending or 'none'}")
-
-        if not pending:
-            success("All Dynamic Tables refreshed")
-            print_table(cols, rows)
-            return True
+    trigger = not ctx.args.no_dt_refresh
+
+    waiter = DynamicTableRefreshWaiter(conn, DATABASE, "DYNAMIC_TABLES", target_tables)
+    # Keep the watermark from an earlier (resumed) attempt: it marks the data this run ingested
+    watermark = ctx.get("dt_watermark") or waiter.current_watermark()
+    ctx.set("dt_watermark", watermark)
+    info(f"Waiting up to {max_wait}s for DT data timestamps to pass {watermark}"
+         f"{' (triggering refreshes upstream-first)' if trigger else ''}...")
+
+    def progress(elapsed, refreshed, pending):
+        info(f"  [{int(elapsed)}s] Refreshed: {len(refreshed)}/{len(target_tables)} — pending: {pending or 'none'}")
 
-        time.sleep(poll_interval)
+    result = waiter.wait(max_wait, watermark=watermark, trigger=trigger, on_progress=progress)
+    for table, error in result["trigger_errors"].items():
+        warn(f"Manual refresh of {table} failed: {error}")
+
+    rows = sorted(result["refreshed"].items())
+    if not result["timed_out"]:
+        success(f"All Dynamic Tables refreshed in {result['elapsed_seconds']:.1f}s ({result['polls']} polls)")
+        print_table(["NAME", "DATA_TIMESTAMP"], rows)
+        return True
 
     warn(f"Timed out after {max_wait}s. Some DTs may not have refreshed yet.")
     if rows:
-        print_table(cols, rows)
+        print_table(["NAME", "DATA_TIMESTAMP"], rows)
     return True  # non-fatal — DTs will eventually catch up
 
 
-def step_6_interactive(conn) -> bool:
+def step_6_interactive(conn, ctx: PipelineContext) -> bool:
     """Interactive Table sub-100ms point lookup."""
     header(6, "Interactive Table Lookup")
 
@@ -351,7 +393,7 @@ def step_6_interactive(conn) -> bool:
     return True
 
 
-def step_7_cortex_agent(conn) -> bool:
+def step_7_cortex_agent(conn, ctx: PipelineContext) -> bool:
     """Cortex Agent: verify agent is configured and accessible."""
     header(7, "Cortex Agent Verification")
 
@@ -385,7 +427,7 @@ def step_7_cortex_agent(conn) -> bool:
     return True
 
 
-def step_8_cortex_search(conn) -> bool:
+def step_8_cortex_search(conn, ctx: PipelineContext) -> bool:
     """Cortex Search: semantic search over product reviews."""
     header(8, "Cortex Search Query")
 
@@ -422,24 +464,25 @@ def step_8_cortex_search(conn) -> bool:
     return True
 
 
-def step_9_summary(conn) -> bool:
+def step_9_summary(conn, ctx: PipelineContext) -> bool:
     """Final summary: row counts across all layers."""
     header(9, "Summary Report")
 
     info("Final row counts across all layers:\n")
-    cols, rows = run_sql(conn, dedent(f"""\
-        SELECT 'RAW.CUSTOMERS' as layer, COUNT(*) as row_count FROM {DATABASE}.RAW.CUSTOMERS
-        UNION ALL SELECT 'RAW.ORDERS', COUNT(*) FROM {DATABASE}.RAW.ORDERS
-        UNION ALL SELECT 'RAW.ORDER_ITEMS', COUNT(*) FROM {DATABASE}.RAW.ORDER_ITEMS
-        UNION ALL SELECT 'STAGING.ORDERS', COUNT(*) FROM {DATABASE}.STAGING.ORDERS_STAGING
-        UNION ALL SELECT 'STAGING.ORDER_ITEMS', COUNT(*) FROM {DATABASE}.STAGING.ORDER_ITEMS_STAGING
-        UNION ALL SELECT 'DT.ENRICHED_ORDERS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.ENRICHED_ORDERS
-        UNION ALL SELECT 'DT.FACT_ORDERS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.FACT_ORDERS
-        UNION ALL SELECT 'DT.DAILY_METRICS', COUNT(*) FROM {DATABASE}.DYNAMIC_TABLES.DAILY_BUSINESS_METRICS
-        UNION ALL SELECT 'INTERACTIVE.ANALYTICS', COUNT(*) FROM {DATABASE}.INTERACTIVE.CUSTOMER_ORDER_ANALYTICS
-        UNION ALL SELECT 'DBT.CLV', COUNT(*) FROM {DATABASE}.DBT_ANALYTICS.CUSTOMER_LIFETIME_VALUE
-    """))
-    print_table(cols, rows)
+    snapshot = take_snapshot(lambda sql: run_sql(conn, sql)[1], DATABASE)
+    baseline = ctx.get("row_counts.preflight")
+    if baseline is not None:
+        deltas = snapshot.deltas(baseline)
+        ctx.set("row_counts.deltas", deltas)
+        print_table(
+            ["LAYER", "BEFORE", "AFTER", "DELTA"],
+            [
+                (label, baseline.get(label), count, f"{deltas[label]:+,}" if deltas[label] is not None else None)
+                for label, count in snapshot.rows()
+            ],
+        )
+    else:
+        print_table(["LAYER", "ROW_COUNT"], snapshot.rows())
 
     # Recent DT refresh history
     info("Recent Dynamic Table refreshes:\n")
@@ -460,23 +503,59 @@ def step_9_summary(conn) -> bool:
 # ── Step Registry ────────────────────────────────────────────────────────────
 
 STEPS = [
-    (1, "Preflight checks", step_1_preflight, False),
-    (2, "Stream orders → RAW", step_2_stream_raw, True),
-    (3, "Stream orders → STAGING", step_3_stream_staging, True),
-    (4, "Gen2 MERGE staging → RAW", step_4_gen2_merge, False),
-    (5, "Wait for DT refresh", step_5_wait_dt, False),
-    (6, "Interactive Table lookup", step_6_interactive, False),
-    (7, "Cortex Agent verification", step_7_cortex_agent, False),
-    (8, "Cortex Search query", step_8_cortex_search, False),
-    (9, "Summary report", step_9_summary, False),
+    Step(1, "Preflight checks", step_1_preflight),
+    Step(2, "Stream orders → RAW", step_2_stream_raw, depends_on=(1,), is_streaming=True),
+    Step(3, "Stream orders → STAGING", step_3_stream_staging, depends_on=(1,), is_streaming=True),
+    # MERGE writes into RAW, so it waits for the RAW stream to be committed too
+    Step(4, "Gen2 MERGE staging → RAW", step_4_gen2_merge, depends_on=(2, 3)),
+    Step(5, "Wait for DT refresh", step_5_wait_dt, depends_on=(2, 4)),
+    Step(6, "Interactive Table lookup", step_6_interactive, depends_on=(5,)),
+    Step(7, "Cortex Agent verification", step_7_cortex_agent, depends_on=(1,)),
+    Step(8, "Cortex Search query", step_8_cortex_search, depends_on=(1,)),
+    Step(9, "Summary report", step_9_summary, depends_on=(2, 3, 4, 5, 6, 7, 8)),
 ]
-# (num, label, func, is_streaming)
+
+
+# Pipeline state that must survive a --resume, and how to (de)serialize it
+CHECKPOINT_CODECS = {
+    "row_counts.preflight": (RowCountSnapshot.to_dict, RowCountSnapshot.from_dict),
+    "dt_watermark": (str, str),
+}
+# Changing these between attempts would make the checkpointed work meaningless
+CHECKPOINT_PARAMETERS = ("connection", "orders", "staging_orders")
+
+
+def skip_reason(step: Step, args, completed=frozenset()) -> str:
+    """Why a step won't run this time ('' if it will)."""
+    if step.num in completed:
+        return "completed in resumed run"
+    if step.num < args.step:
+        return "before start step"
+    if args.skip_streaming and step.is_streaming:
+        return "--skip-streaming"
+    return ""
+
+
+def resumable_steps(checkpointed: set, args) -> frozenset:
+    """
+    Checkpointed steps that can be skipped on --resume: only those whose
+    dependencies are also skipped, so anything downstream of a step that
+    reruns (e.g. the summary after a failed lookup) reruns too.
+    """
+    by_num = {s.num: s for s in STEPS}
+    done = set()
+    for wave in execution_waves(STEPS):
+        for num in wave:
+            deps_done = all(dep in done or skip_reason(by_num[dep], args) for dep in by_num[num].depends_on)
+            if num in checkpointed and deps_done:
+                done.add(num)
+    return frozenset(done)
 
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="Run the Automated Intelligence e2e pipeline",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -487,105 +566,326 @@ def parse_args():
               python run_pipeline.py --step 5             # start from step 5
               python run_pipeline.py --skip-streaming     # skip ingestion (steps 2-3)
               python run_pipeline.py --dry-run            # show plan, don't execute
+              python run_pipeline.py --max-parallel 1     # strictly sequential
         """),
     )
-    parser.add_argument("--interactive", action="store_true", help="Pause between steps")
+    parser.add_argument("--interactive", action="store_true", help="Pause between steps (implies --max-parallel 1)")
     parser.add_argument("--step", type=int, default=1, help="Start from step N (1-9)")
     parser.add_argument("--skip-streaming", action="store_true", help="Skip streaming steps 2-3")
     parser.add_argument("--dry-run", action="store_true", help="Print steps without executing")
     parser.add_argument("--connection", default=DEFAULT_CONNECTION, help=f"Snowflake connection name (default: {DEFAULT_CONNECTION})")
     parser.add_argument("--orders", type=int, default=DEFAULT_RAW_ORDERS, help=f"Orders to stream to RAW (default: {DEFAULT_RAW_ORDERS})")
     parser.add_argument("--staging-orders", type=int, default=DEFAULT_STAGING_ORDERS, help=f"Orders to stream to STAGING (default: {DEFAULT_STAGING_ORDERS})")
-    return parser.parse_args()
-
-
-def main():
-    args = parse_args()
+    parser.add_argument("--streaming-mode", choices=["in-process", "subprocess"], default="in-process",
+                        help="Stream from this process (no per-step interpreter and SDK startup), or launch the streaming script per step (default: in-process)")
+    parser.add_argument("--no-dt-refresh", action="store_true",
+                        help="Step 5: wait for scheduled DT refreshes instead of triggering them")
+    parser.add_argument("--trace-dir", default=str(DEFAULT_TRACE_DIR),
+                        help=f"Where to write OTLP/JSON traces and the SQLite run history (default: {DEFAULT_TRACE_DIR.name}/)")
+    parser.add_argument("--compare", nargs="?", const="latest", metavar="RUN_ID",
+                        help="Offline: compare a stored run (default: latest) with earlier runs and exit")
+    parser.add_argument("--compare-last", type=int, default=10, metavar="N",
+                        help="Baseline size for regression checks (default: 10 runs)")
+    parser.add_argument("--regression-z", type=float, default=2.0,
+                        help="Flag steps slower than baseline mean + Z standard deviations (default: 2.0)")
+    parser.add_argument("--no-trace", action="store_true", help="Don't record step/SQL traces")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip steps the last run completed and restore its state (from the checkpoint in --trace-dir)")
+    parser.add_argument("--result-file", default=None, metavar="PATH",
+                        help="Write the run's outcome as JSON: failed steps, saved state, resume arguments (default: <trace-dir>/result.json)")
+    parser.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL, help=f"Max steps (and connections) running at once (default: {DEFAULT_MAX_PARALLEL})")
+    args = parser.parse_args(argv)
+    if args.result_file is None:
+        args.result_file = str(Path(args.trace_dir) / "result.json")
+    if args.max_parallel < 1:
+        parser.error("--max-parallel must be at least 1")
+    if args.interactive:
+        args.max_parallel = 1
+    return args
+
+
+def print_timing_report(results: dict, elapsed: float):
+    """Wall-clock vs. summed step time, per-step durations and the critical path."""
+    ran = [r for r in results.values() if r.status != SKIPPED]
+    if not ran:
+        return
+    serial = sum(r.duration for r in ran)
+    path, path_secs = critical_path(STEPS, results)
+
+    print(f"\n  Step timings:")
+    for r in sorted(ran, key=lambda r: r.num):
+        marker = "*" if r.num in path else " "
+        print(f"   {marker} Step {r.num}: {r.label:<28} {r.duration:7.1f}s  {r.status}")
+    print(f"\n  Wall clock:     {elapsed:.1f}s")
+    print(f"  Sum of steps:   {serial:.1f}s" + (f"  ({serial / elapsed:.1f}x overlap)" if elapsed > 0 else ""))
+    print(f"  Critical path:  {' → '.join(str(n) for n in path)}  ({path_secs:.1f}s, marked *)")
+
+
+def print_comparison(history: RunHistory, run_id: str, args) -> int:
+    """Step durations of one run against its baseline. Returns the number of regressed steps."""
+    report = history.compare(run_id, last_n=args.compare_last, z_threshold=args.regression_z)
+    run = history.get_run(run_id)
+    print(f"\n  Run {run_id} vs. previous {args.compare_last} runs with --orders {run['orders']} "
+          f"--staging-orders {run['staging_orders']} --streaming-mode {run['streaming_mode']} "
+          f"--max-parallel {run['max_parallel']} (flag: z > {args.regression_z}):")
+    regressed = 0
+    for entry in report:
+        if entry["regressed"] is None:
+            verdict = f"no comparable baseline ({entry['baseline_runs']} runs with these parameters)"
+        else:
+            verdict = f"mean {entry['mean']:.1f}s  z {entry['z']:+.1f}"
+            if entry["regressed"]:
+                verdict += "  ← SLOWER"
+                regressed += 1
+        print(f"    Step {entry['step']}: {entry['label']:<28} {entry['duration']:7.1f}s  {verdict}")
+    return regressed
+
+
+def compare_runs(args) -> int:
+    """--compare: report on stored history without connecting to Snowflake."""
+    history = RunHistory(str(Path(args.trace_dir) / "history.db"))
+    try:
+        run_id = history.latest_run_id() if args.compare == "latest" else args.compare
+        if run_id is None:
+            fail(f"No runs recorded in {history.path}")
+            return 1
+        try:
+            regressed = print_comparison(history, run_id, args)
+        except ValueError as e:
+            fail(str(e))
+            return 1
+        run = history.get_run(run_id)
+        if run["merge_result"]:
+            print(f"\n  MERGE result: {run['merge_result']}")
+        print()
+        return 1 if regressed else 0
+    finally:
+        history.close()
+
+
+def resume_arguments(args) -> list:
+    """run_pipeline.py arguments that continue this run (non-interactively) from its checkpoint."""
+    argv = [
+        "--resume",
+        "--connection", args.connection,
+        "--orders", str(args.orders),
+        "--staging-orders", str(args.staging_orders),
+        "--streaming-mode", args.streaming_mode,
+        "--max-parallel", str(args.max_parallel),
+        "--trace-dir", str(Path(args.trace_dir).resolve()),
+        "--result-file", str(Path(args.result_file).resolve()),
+    ]
+    for flag in ("skip_streaming", "no_dt_refresh", "no_trace"):
+        if getattr(args, flag):
+            argv.append(f"--{flag.replace('_', '-')}")
+    return argv
+
+
+def write_result(args, run_id: str, checkpoint: Checkpoint, results: dict, elapsed: float, exit_code: int):
+    """
+    --result-file: the run's outcome for tools like run_pipeline_agent.py -
+    which steps failed (and why), the checkpointed state later steps need, and
+    the arguments that rerun just the unfinished steps via --resume.
+    """
+    data = {
+        "run_id": run_id,
+        "checkpoint_run_id": checkpoint.run_id,
+        "exit_code": exit_code,
+        "wall_seconds": elapsed,
+        "failed_steps": sorted(r.num for r in results.values() if not r.ok),
+        "completed_steps": sorted(checkpoint.completed_steps),
+        "steps": [
+            {"step": r.num, "label": r.label, "status": r.status, "duration_seconds": r.duration,
+             "error": r.error, "reason": r.reason}
+            for r in sorted(results.values(), key=lambda r: r.num)
+        ],
+        "checkpoint": str(Path(checkpoint.path).resolve()),
+        "parameters": checkpoint.parameters,
+        "state": checkpoint.encoded_state(),
+        "resume_args": resume_arguments(args),
+    }
+    path = Path(args.result_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2, default=str))
+    tmp_path.replace(path)
+
+
+def main(argv=None):
+    global TRACER
+    args = parse_args(argv)
+
+    if args.compare:
+        return compare_runs(args)
+
+    checkpoint_path = str(Path(args.trace_dir) / "checkpoint.json")
+    parameters = {key: getattr(args, key) for key in CHECKPOINT_PARAMETERS}
+    resumed = None
+    if args.resume:
+        resumed = Checkpoint.load(checkpoint_path, CHECKPOINT_CODECS)
+        if resumed is None:
+            fail(f"No checkpoint to resume from ({checkpoint_path})")
+            return 1
+        mismatched = resumed.mismatched_parameters(parameters)
+        if mismatched:
+            for key, (before, now) in mismatched.items():
+                fail(f"--{key.replace('_', '-')} was {before} in run {resumed.run_id}, now {now}")
+            fail("Resume with the same parameters, or start a fresh run without --resume")
+            return 1
+        if resumed.completed_steps >= {s.num for s in STEPS}:
+            success(f"Run {resumed.run_id} already completed every step; nothing to resume")
+            return 0
+    completed = resumable_steps(resumed.completed_steps, args) if resumed else frozenset()
 
     # ── Dry run ──────────────────────────────────────────────────────────
     if args.dry_run:
         print(f"\n  Automated Intelligence E2E Pipeline — DRY RUN")
         print(f"  Connection: {args.connection}")
         print(f"  Starting from step: {args.step}")
-        print(f"  Skip streaming: {args.skip_streaming}\n")
-        for num, label, _, is_streaming in STEPS:
-            skip = ""
-            if num < args.step:
-                skip = " (skipped — before start step)"
-            elif args.skip_streaming and is_streaming:
-                skip = " (skipped — --skip-streaming)"
-            print(f"  {'[SKIP]' if skip else '[ OK ]'} Step {num}: {label}{skip}")
+        print(f"  Skip streaming: {args.skip_streaming}")
+        print(f"  Max parallel steps: {args.max_parallel}\n")
+        by_num = {s.num: s for s in STEPS}
+        for wave_num, wave in enumerate(execution_waves(STEPS), 1):
+            print(f"  Wave {wave_num}:")
+            for num in wave:
+                step = by_num[num]
+                reason = skip_reason(step, args, completed)
+                skip = f" (skipped — {reason})" if reason else ""
+                after = f"  [after {', '.join(map(str, step.depends_on))}]" if step.depends_on else ""
+                print(f"    {'[SKIP]' if skip else '[ OK ]'} Step {num}: {step.label}{skip}{after}")
         print()
         return 0
 
     # ── Connect ──────────────────────────────────────────────────────────
     print(f"\n  Automated Intelligence E2E Pipeline")
     print(f"  Connection: {args.connection}")
-    print(f"  Mode: {'interactive' if args.interactive else 'non-interactive'}")
-    print(f"  RAW orders: {args.orders:,}  |  Staging orders: {args.staging_orders:,}")
+    print(f"  Mode: {'interactive' if args.interactive else 'non-interactive'}  |  Max parallel steps: {args.max_parallel}")
+    print(f"  RAW orders: {args.orders:,}  |  Staging orders: {args.staging_orders:,}  |  Streaming: {args.streaming_mode}")
     print()
 
+    # Every connection starts (and is handed back) on the database + default
+    # warehouse, so a step's USE WAREHOUSE never leaks into the next step
+    pool = ConnectionPool(
+        lambda: snowflake.connector.connect(connection_name=args.connection, paramstyle="qmark"),
+        max_size=args.max_parallel,
+        init_sql=[f"USE DATABASE {DATABASE}", f"USE WAREHOUSE {WH_DEFAULT}"],
+        reset_sql=[f"USE WAREHOUSE {WH_DEFAULT}"],
+    )
     try:
-        conn = snowflake.connector.connect(connection_name=args.connection)
+        # Open the first connection up front so a bad connection name fails fast
+        pool.release(pool.acquire())
     except Exception as e:
         fail(f"Could not connect via '{args.connection}': {e}")
+        pool.close()
         return 1
 
-    # Set database context
-    run_sql(conn, f"USE DATABASE {DATABASE}", fetch=False)
+    def before_step(step: Step) -> bool:
+        if not args.interactive or step.num <= args.step:
+            return True
+        try:
+            input(f"\n  Press Enter to run Step {step.num}: {step.label} (Ctrl+C to stop)... ")
+            return True
+        except KeyboardInterrupt:
+            print("\n\n  Stopped by user.")
+            return False
+
+    def skip(step: Step):
+        reason = skip_reason(step, args, completed)
+        if reason in ("--skip-streaming", "completed in resumed run"):
+            info(f"\n  [SKIP] Step {step.num}: {step.label} ({reason})")
+        return reason or None
+
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(2)}"
+    # main() can run more than once per process (run_pipeline_agent.py retries)
+    TRACER = None if args.no_trace else Tracer(run_id)
+
+    @contextmanager
+    def step_connection():
+        with pool.connection() as conn:
+            # Pooled connections always start on the default warehouse
+            if TRACER is not None:
+                TRACER.note_warehouse(conn, WH_DEFAULT)
+            yield conn
+
+    ctx = PipelineContext(args=args)
+    if resumed is not None:
+        print(f"  Resuming run {resumed.run_id}: steps {sorted(completed)} already completed\n")
+        ctx.state.update(resumed.state)
+        checkpoint = resumed
+    else:
+        checkpoint = Checkpoint(checkpoint_path, run_id, parameters, CHECKPOINT_CODECS)
+        checkpoint.save()
+
+    def after_step(step: Step, result):
+        try:
+            with ctx.lock:
+                state = dict(ctx.state)
+            checkpoint.record(step.num, step.label, result.ok, result.duration, state)
+        except Exception as e:
+            warn(f"Could not write checkpoint: {e}")
+    streaming_session = StreamingSession()
+    ctx.set("streaming_session", streaming_session)
+    executor = DagExecutor(
+        STEPS, step_connection, max_workers=args.max_parallel, before_step=before_step, tracer=TRACER,
+        after_step=after_step,
+    )
 
     pipeline_start = time.time()
-    failed_steps = []
-
+    run_span = TRACER.span(
+        "pipeline run",
+        **{"pipeline.orders": args.orders, "pipeline.staging_orders": args.staging_orders,
+           "pipeline.max_parallel": args.max_parallel, "pipeline.streaming_mode": args.streaming_mode},
+    ) if TRACER is not None else nullcontext()
     try:
-        for num, label, func, is_streaming in STEPS:
-            # Skip logic
-            if num < args.step:
-                continue
-            if args.skip_streaming and is_streaming:
-                info(f"\n  [SKIP] Step {num}: {label} (--skip-streaming)")
-                continue
-
-            # Interactive pause
-            if args.interactive and num > args.step:
-                try:
-                    input(f"\n  Press Enter to run Step {num}: {label} (Ctrl+C to stop)... ")
-                except KeyboardInterrupt:
-                    print("\n\n  Stopped by user.")
-                    break
-
-            # Execute step — streaming steps need order counts
-            try:
-                if num == 2:
-                    ok = func(conn, args.orders)
-                elif num == 3:
-                    ok = func(conn, args.staging_orders)
-                else:
-                    ok = func(conn)
-            except Exception as e:
-                fail(f"Step {num} raised: {e}")
-                ok = False
-
-            if not ok:
-                failed_steps.append(num)
-                warn(f"Step {num} failed. Continuing...")
-
+        with run_span:
+            executor.run(ctx, skip=skip)
     except KeyboardInterrupt:
         print("\n\n  Pipeline interrupted by user.")
     finally:
-        conn.close()
+        streaming_session.close()
+        pool.close()
 
     elapsed = time.time() - pipeline_start
+    failed_steps = sorted(r.num for r in executor.results.values() if not r.ok)
+    for num in failed_steps:
+        warn(f"Step {num} failed.")
+
     print(f"\n{'='*60}")
     print(f"  Pipeline finished in {elapsed:.1f}s")
+    print_timing_report(executor.results, elapsed)
+    if TRACER is not None:
+        trace_path = Path(args.trace_dir) / f"trace_{TRACER.run_id}.json"
+        try:
+            TRACER.export_json(str(trace_path))
+            TRACER.export_sqlite(str(Path(args.trace_dir) / "history.db"))
+            print(f"  Trace: {trace_path} (run {TRACER.run_id})")
+        except Exception as e:
+            warn(f"Could not write trace: {e}")
+    if executor.results:
+        try:
+            history = RunHistory(str(Path(args.trace_dir) / "history.db"))
+            try:
+                history.record_run(
+                    run_id, pipeline_start, elapsed, args, executor.results,
+                    row_deltas=ctx.get("row_counts.deltas"), merge_result=ctx.get("merge_result"),
+                )
+                print_comparison(history, run_id, args)
+            finally:
+                history.close()
+        except Exception as e:
+            warn(f"Could not record run history: {e}")
+    exit_code = 1 if failed_steps else 0
+    try:
+        write_result(args, run_id, checkpoint, executor.results, elapsed, exit_code)
+    except Exception as e:
+        warn(f"Could not write result file: {e}")
     if failed_steps:
         print(f"  Failed steps: {failed_steps}")
-        print(f"{'='*60}\n")
-        return 1
+        print(f"  Rerun only the unfinished steps with --resume (details: {args.result_file})")
     else:
         print(f"  All steps passed.")
-        print(f"{'='*60}\n")
-        return 0
+    print(f"{'='*60}\n")
+    return exit_code
 
 
 if __name__ == "__main__":
@@ -2,8 +2,10 @@
 """
 E2E pipeline runner: deterministic execution + AI-powered error recovery.
 
-Runs run_pipeline.py first. If it succeeds, done. If it fails, hands off to
-a Cortex Code Agent that diagnoses the failure and attempts to fix it.
+Runs run_pipeline.py first. If it succeeds, done. If it fails, the failed
+steps are retried in process from the run's checkpoint (completed steps -
+streaming ingestion included - are not repeated). If they still fail, hands off
+to a Cortex Code Agent that diagnoses the failure and attempts to fix it.
 
 Requires: pip install cortex-code-agent-sdk
 
@@ -12,27 +14,56 @@ Usage:
   python run_pipeline_agent.py --agent-only       # skip deterministic run, go straight to agent
   python run_pipeline_agent.py --skip-streaming   # pass flags through to run_pipeline.py
   python run_pipeline_agent.py --dry-run          # dry-run the pipeline only
+  python run_pipeline_agent.py --retries 0        # no in-process retry, straight to the agent
 """
 
 import argparse
 import asyncio
+import os
+import json
+import re
+import shlex
 import subprocess
 import sys
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Deque, Dict, List, Optional
 
 from cortex_code_agent_sdk import query, AssistantMessage, CortexCodeAgentOptions
 
 REPO_DIR = Path(__file__).parent
 PIPELINE_SCRIPT = REPO_DIR / "run_pipeline.py"
+# run_pipeline.py --result-file: failed steps, checkpointed state, resume arguments
+RESULT_FILE = REPO_DIR / ".pipeline_runs" / "agent_result.json"
+
+# Output kept for the recovery prompt: the last TAIL_LINES lines overall and,
+# per step, the last STEP_CONTEXT_LINES lines of that step's section
+TAIL_LINES = 60
+STEP_CONTEXT_LINES = 40
+
+# run_pipeline.header() prints "  Step N: title"; report lines are indented further
+STEP_HEADER = re.compile(r"^  Step (\d+): (.+)$")
+FAIL_MARKER = re.compile(r"\[FAIL\](?: Step (\d+) raised:)?")
+# With --max-parallel > 1, each line a step prints is prefixed "[N: label] "
+STEP_PREFIX = re.compile(r"^\[(\d+): [^\]]*\] ")
 
 RECOVERY_PROMPT = """\
 The Automated Intelligence e2e pipeline (run_pipeline.py) just failed with exit code {exit_code}.
+{retry_note}
+Failed steps and their output:
+{failures}
 
-Here is the output:
-{output}
+Last lines of the run:
+{tail}
 
 Diagnose the failure. Check Snowflake state if needed (connection: dash-builder-si, database: AUTOMATED_INTELLIGENCE).
-Attempt to fix the issue, then re-run the failed step. Give a summary of what went wrong and what you did.
+Attempt to fix the issue, then re-run only the unfinished steps. Completed steps (including streaming
+ingestion) are checkpointed; this command skips them and restores their saved state:
+
+  {rerun_command}
+
+Do not re-run the whole pipeline. Give a summary of what went wrong and what you did.
 """
 
 FULL_RUN_PROMPT = """\
@@ -58,11 +89,150 @@ async def run_agent(prompt: str, cwd: str):
     print()
 
 
-def run_pipeline(extra_args: list[str]) -> subprocess.CompletedProcess:
-    """Run run_pipeline.py and return the result."""
+@dataclass
+class StepFailure:
+    step: int
+    title: str
+    messages: List[str] = field(default_factory=list)
+    context: List[str] = field(default_factory=list)
+
+
+class OutputCapture:
+    """
+    Bounded view of a pipeline run's output, fed line by line: a ring buffer of
+    the last lines overall plus one per step section, so a `[FAIL]` can be
+    reported with the lines of the step that produced it however long the run.
+    """
+
+    def __init__(self, tail_lines: int = TAIL_LINES, step_context_lines: int = STEP_CONTEXT_LINES):
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.step_context_lines = step_context_lines
+        self.step_lines: Dict[int, Deque[str]] = {}
+        self.step_titles: Dict[int, str] = {}
+        self.failures: Dict[int, StepFailure] = {}
+        self.unattributed_failures: Deque[str] = deque(maxlen=step_context_lines)
+        self.current_step: Optional[int] = None
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\n")
+        self.tail.append(line)
+
+        # Prefixed lines name their step; unprefixed ones belong to the last header's section
+        prefix = STEP_PREFIX.match(line)
+        body = line[prefix.end():] if prefix else line
+        header = STEP_HEADER.match(body)
+        if header:
+            self.current_step = int(header.group(1))
+            self.step_titles[self.current_step] = header.group(2).strip()
+            self.step_lines[self.current_step] = deque(maxlen=self.step_context_lines)
+        line_step = int(prefix.group(1)) if prefix else self.current_step
+        if line_step is not None:
+            self.step_lines.setdefault(line_step, deque(maxlen=self.step_context_lines)).append(line)
+
+        marker = FAIL_MARKER.search(body)
+        if marker:
+            step = int(marker.group(1)) if marker.group(1) else line_step
+            if step is None:
+                self.unattributed_failures.append(line.strip())
+                return
+            failure = self.failures.setdefault(step, StepFailure(step, self.step_titles.get(step, "?")))
+            failure.messages.append(line.strip())
+            failure.context = list(self.step_lines.get(step, []))
+
+    def failure_report(self) -> str:
+        if not self.failures and not self.unattributed_failures:
+            return "(no [FAIL] markers found - see the last lines below)"
+        parts = []
+        for failure in sorted(self.failures.values(), key=lambda f: f.step):
+            parts.append(f"Step {failure.step}: {failure.title}")
+            parts.extend(f"  {m}" for m in failure.messages)
+            parts.append("  Step output (last lines):")
+            parts.extend(f"    {l}" for l in failure.context)
+        if self.unattributed_failures:
+            parts.append("Other failures:")
+            parts.extend(f"  {m}" for m in self.unattributed_failures)
+        return "\n".join(parts)
+
+
+def run_pipeline(extra_args: list[str]) -> tuple[int, OutputCapture]:
+    """Run run_pipeline.py, echoing its output live. Returns (exit code, captured output)."""
     cmd = [sys.executable, str(PIPELINE_SCRIPT)] + extra_args
     print(f"  Running: {' '.join(cmd)}\n")
-    return subprocess.run(cmd, cwd=str(REPO_DIR), capture_output=True, text=True)
+    capture = OutputCapture()
+    # stderr merged into stdout keeps [FAIL] lines next to the step that printed them
+    proc = subprocess.Popen(
+        cmd, cwd=str(REPO_DIR), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, bufsize=1, env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    try:
+        for line in proc.stdout:
+            print(line, end="", flush=True)
+            capture.feed(line)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    return returncode, capture
+
+
+class _CaptureStream:
+    """Writes through to `stream` and feeds each complete line to an OutputCapture."""
+
+    def __init__(self, stream, capture: OutputCapture):
+        self._stream = stream
+        self._capture = capture
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        self._stream.write(text)
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._capture.feed(line)
+        return len(text)
+
+    def close_capture(self) -> None:
+        if self._partial:
+            self._capture.feed(self._partial)
+            self._partial = ""
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def load_result() -> Optional[dict]:
+    """The last run's --result-file, or None if it didn't get far enough to write one."""
+    try:
+        return json.loads(RESULT_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def retry_failed_steps(result: dict) -> tuple[int, OutputCapture]:
+    """
+    Rerun the failed steps (and the steps that depend on them) in this
+    process: run_pipeline.main() with the run's --resume arguments, which
+    restores the checkpointed state instead of re-streaming orders.
+    """
+    import run_pipeline  # imported here: needs snowflake-connector-python
+
+    capture = OutputCapture()
+    streams = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = (_CaptureStream(s, capture) for s in streams)
+    try:
+        returncode = run_pipeline.main(result["resume_args"])
+    except SystemExit as e:  # argparse errors
+        returncode = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        print(f"  [FAIL] Retry raised: {e}", file=sys.stderr)
+        returncode = 1
+    finally:
+        for wrapper in (sys.stdout, sys.stderr):
+            wrapper.close_capture()
+        sys.stdout, sys.stderr = streams
+    return returncode, capture
 
 
 def main():
@@ -80,6 +250,8 @@ def main():
     parser.add_argument("--connection", default=None)
     parser.add_argument("--orders", type=int, default=None)
     parser.add_argument("--staging-orders", type=int, default=None)
+    parser.add_argument("--retries", type=int, default=1,
+                        help="In-process retries of the failed steps before launching the agent (default: 1)")
     args = parser.parse_args()
 
     # Build pass-through flags
@@ -115,28 +287,46 @@ def main():
 
     # ── Phase 1: Deterministic run ───────────────────────────────────────
     print("  Phase 1: Deterministic pipeline run\n")
-    result = run_pipeline(flags)
-
-    # Print stdout live (it was captured)
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print(result.stderr, file=sys.stderr)
+    RESULT_FILE.unlink(missing_ok=True)
+    returncode, capture = run_pipeline(flags + ["--result-file", str(RESULT_FILE)])
 
-    if result.returncode == 0:
+    if returncode == 0:
         print("  Phase 1 succeeded. No agent recovery needed.")
         return 0
+    print(f"\n  Phase 1 failed (exit code {returncode}).")
+
+    # ── Targeted retry: only the failed steps, from the checkpoint ───────
+    result = load_result()
+    retried = []
+    for attempt in range(1, args.retries + 1):
+        if result is None or not result["failed_steps"]:
+            break  # failed before any step ran (e.g. connection) - nothing to resume
+        retried = result["failed_steps"]
+        print(f"  Retrying steps {retried} in process (attempt {attempt}/{args.retries}, "
+              f"resuming run {result['checkpoint_run_id']})...\n")
+        RESULT_FILE.unlink(missing_ok=True)
+        returncode, capture = retry_failed_steps(result)
+        if returncode == 0:
+            print(f"  Retry succeeded. No agent recovery needed.")
+            return 0
+        print(f"\n  Retry failed (exit code {returncode}).")
+        result = load_result()
 
     # ── Phase 2: Agent recovery ──────────────────────────────────────────
-    print(f"\n  Phase 1 failed (exit code {result.returncode}).")
     print("  Phase 2: Launching Cortex Code Agent for diagnosis and recovery...\n")
 
-    # Combine stdout+stderr, truncate to last 3000 chars for prompt context
-    output = (result.stdout or "") + "\n" + (result.stderr or "")
-    if len(output) > 3000:
-        output = "...(truncated)...\n" + output[-3000:]
-
-    prompt = RECOVERY_PROMPT.format(exit_code=result.returncode, output=output)
+    if result is not None:
+        rerun_command = shlex.join(["python", "run_pipeline.py"] + result["resume_args"])
+    else:
+        rerun_command = shlex.join(["python", "run_pipeline.py"] + flags)
+    retry_note = f"Steps {retried} were already retried in place and failed again.\n" if retried else ""
+    prompt = RECOVERY_PROMPT.format(
+        exit_code=returncode,
+        retry_note=retry_note,
+        failures=capture.failure_report(),
+        tail="\n".join(capture.tail),
+        rerun_command=rerun_command,
+    )
 
     try:
         asyncio.run(run_agent(prompt, str(REPO_DIR)))
@@ -1,134 +1,256 @@
+import argparse
 import logging
 import random
 import sys
+import threading
 import time
-from typing import List
-from config_manager import ConfigManager
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from config_manager import RETRY_CONFIG_KEYS, ConfigManager
+from customer_streamer import CustomerStreamer
 from snowpipe_streaming_manager import SnowpipeStreamingManager
 from snowflake.ingest.streaming.streaming_ingest_error import StreamingIngestError
 from reconciliation_manager import ReconciliationManager
 from data_generator import DataGenerator
 from models import Order, OrderItem
+from micro_batcher import BATCHER_CONFIG_KEYS, OrderMicroBatcher
+from paired_batch_committer import PairedBatchCommitter
+from rate_limiter import RUNNER_CONFIG_KEYS, LoadShape, SteadyStateRunner, install_stop_handlers
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging() -> None:
+    """Log to stdout for command-line runs; importing this module leaves logging alone."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+
+
 class AutomatedIntelligenceStreaming:
     def __init__(
         self, config: ConfigManager, streaming_manager: SnowpipeStreamingManager
     ):
         self.config = config
         self.streaming_manager = streaming_manager
+        # Prefix for soak-mode log lines and batcher metrics (set per orchestrator instance)
+        self.name: Optional[str] = None
+        self._max_customer_id: Optional[int] = None
+        self._committer: Optional[PairedBatchCommitter] = None
+        self._apply_retry_config()
+        config.subscribe(self._apply_retry_config, keys=RETRY_CONFIG_KEYS)
 
-    def generate_and_stream_orders(self, num_orders: int) -> None:
-        logger.info(f"Starting to generate and stream {num_orders} orders")
+    def _apply_retry_config(self, changed: Optional[Set[str]] = None) -> None:
+        self.max_retries = self.config.get_int_property("max.retries", 3)
+        self.retry_delay = self.config.get_int_property("retry.delay.ms", 1000) / 1000.0
+        if changed:
+            logger.info(
+                f"Retry settings updated: max.retries={self.max_retries}, "
+                f"retry.delay.ms={self.retry_delay * 1000:.0f}"
+            )
+
+    def _get_max_customer_id(self) -> int:
+        if self._max_customer_id is None:
+            max_customer_id = self.streaming_manager.get_max_customer_id()
+            if max_customer_id == 0:
+                logger.error(
+                    "No customers found in database. Stream customers first with "
+                    "--customers, or run the generate_customers() stored procedure."
+                )
+                raise ValueError("No customers available for order generation")
+            logger.info(f"Will generate orders for customer IDs in range 1-{max_customer_id}")
+            self._max_customer_id = max_customer_id
+        return self._max_customer_id
+
+    def _random_customer_id(self) -> int:
+        return DataGenerator.random_customer_id(self._get_max_customer_id())
+
+    def _generate_batch(self, batch_size: int) -> Tuple[List[Order], List[OrderItem]]:
+        order_batch: List[Order] = []
+        all_order_items: List[OrderItem] = []
         
-        max_customer_id = self.streaming_manager.get_max_customer_id()
-        if max_customer_id == 0:
-            logger.error(
-                "No customers found in database. Please run generate_customers() "
-                "stored procedure first to create customers."
+        for i in range(batch_size):
+            customer_id = self._random_customer_id()
+            customer_segment = self.streaming_manager.get_customer_segment(customer_id)
+            order = DataGenerator.generate_order(customer_id, customer_segment)
+            order_batch.append(order)
+            
+            item_count = DataGenerator.random_item_count(customer_segment)
+            order_items = DataGenerator.generate_order_items(
+                order.order_id, customer_segment, item_count
             )
-            raise ValueError("No customers available for order generation")
+            all_order_items.extend(order_items)
         
-        logger.info(f"Will generate orders for customer IDs in range 1-{max_customer_id}")
+        return order_batch, all_order_items
+
+    @property
+    def committer(self) -> PairedBatchCommitter:
+        if self._committer is None:
+            self._committer = PairedBatchCommitter(
+                self.streaming_manager,
+                lambda orders, seq: self._append_with_retry(
+                    self.streaming_manager.insert_orders, orders, seq, "orders"
+                ),
+                lambda items, seq: self._append_with_retry(
+                    self.streaming_manager.insert_order_items, items, seq, "order_items"
+                ),
+                max_pending_batches=self.config.get_int_property("paired.max.pending.batches", 20),
+            )
+        return self._committer
+
+    def _append_with_retry(self, insert_fn, rows, batch_seq: int, data_type: str) -> None:
+        max_retries = self.max_retries
+        
+        # Exponential backoff + jitter on top of the SDK-level backpressure retry
+        for retry_count in range(max_retries + 1):
+            try:
+                insert_fn(rows, batch_seq)
+                return
+            except StreamingIngestError as e:
+                if retry_count >= max_retries:
+                    logger.error(
+                        f"Failed to insert {data_type} after {max_retries + 1} attempts: {e}",
+                        exc_info=True
+                    )
+                    raise
+                delay = min(self.retry_delay * 2 ** retry_count, 16)
+                jitter = random.uniform(0, delay * 0.25)
+                logger.warning(
+                    f"{data_type.capitalize()} insert failed (attempt {retry_count + 1}/{max_retries + 1}), "
+                    f"retrying in {delay + jitter:.1f}s: {e}"
+                )
+                time.sleep(delay + jitter)
+
+    def _insert_batch(self, order_batch: List[Order], all_order_items: List[OrderItem]) -> None:
+        # Orders and items share a batch sequence number; the committer keeps the
+        # batch buffered until both channels have committed it, and retries a
+        # failed items half from that buffer
+        self.committer.commit(order_batch, all_order_items)
+
+    def wait_for_durable(self, timeout_seconds: float = 120) -> bool:
+        durable = self.committer.wait_for_durable(timeout_seconds)
+        self.committer.log_stats()
+        return durable
+
+    @contextmanager
+    def _order_batcher(self) -> Iterator[OrderMicroBatcher]:
+        """
+        OrderMicroBatcher in front of the paired committer, following batch.*
+        reloads. The remainder is flushed on exit, unless the body raised.
+        """
+        # The committer only raises while nothing of a batch has been appended
+        # (an orders-half failure), so every failed flush is safe to resend
+        batcher = OrderMicroBatcher.from_config(
+            self.config,
+            self._insert_batch,
+            name=f"{self.name} orders" if self.name else "orders",
+            requeue_on=(Exception,),
+        )
+        on_batcher_change = lambda changed: batcher.reconfigure(self.config, changed)
+        self.config.subscribe(on_batcher_change, keys=BATCHER_CONFIG_KEYS)
+        try:
+            yield batcher
+        except BaseException:
+            batcher.close(flush=False)
+            raise
+        else:
+            batcher.close()
+        finally:
+            self.config.unsubscribe(on_batcher_change)
+            batcher.log_metrics()
+
+    def _stream_order_batch(self, batcher: OrderMicroBatcher, batch_size: int) -> int:
+        """Generate one batch of orders into the batcher. Returns the number of order items."""
+        order_batch, all_order_items = self._generate_batch(batch_size)
+        batcher.add_orders(order_batch, all_order_items)
+        return len(all_order_items)
+
+    def generate_and_stream_orders(self, num_orders: int) -> int:
+        logger.info(f"Starting to generate and stream {num_orders} orders")
+        
+        self._get_max_customer_id()
         
         batch_size = self.config.get_int_property("orders.batch.size", 10000)
         logger.info(f"Using batch size: {batch_size} orders per insertRows call")
         
         processed_orders = 0
-        max_retries = 3
         
-        while processed_orders < num_orders:
-            remaining_orders = num_orders - processed_orders
-            current_batch_size = min(batch_size, remaining_orders)
-            
-            # Generate data once for this batch
-            order_batch: List[Order] = []
-            all_order_items: List[OrderItem] = []
-            
-            for i in range(current_batch_size):
-                customer_id = DataGenerator.random_customer_id(max_customer_id)
-                customer_segment = self.streaming_manager.get_customer_segment(customer_id)
-                order = DataGenerator.generate_order(customer_id, customer_segment)
-                order_batch.append(order)
+        # Same flush path as soak mode: a full batch flushes inline, the
+        # remainder on exit, and a failed flush is retried from the buffer
+        with self._order_batcher() as batcher:
+            while processed_orders < num_orders:
+                # Cached lookup; picks up orders.batch.size changes from a config reload
+                batch_size = self.config.get_int_property("orders.batch.size", 10000)
+                remaining_orders = num_orders - processed_orders
+                current_batch_size = min(batch_size, remaining_orders)
+                
+                items_streamed = self._stream_order_batch(batcher, current_batch_size)
                 
-                item_count = DataGenerator.random_item_count(customer_segment)
-                order_items = DataGenerator.generate_order_items(
-                    order.order_id, customer_segment, item_count
-                )
-                all_order_items.extend(order_items)
-            
-            # Insert orders and items separately with individual retry logic
-            # This prevents duplicate orders when items fail but orders succeed
-            orders_inserted = False
-            items_inserted = False
-            
-            # Step 1: Insert orders with retry (exponential backoff + jitter)
-            for retry_count in range(max_retries + 1):
-                try:
-                    self.streaming_manager.insert_orders(order_batch)
-                    orders_inserted = True
-                    break
-                except StreamingIngestError as e:
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"Failed to insert orders after {max_retries + 1} attempts: {e}",
-                            exc_info=True
-                        )
-                        raise
-                    delay = min(2 ** retry_count, 16)
-                    jitter = random.uniform(0, delay * 0.25)
-                    logger.warning(
-                        f"Orders insert failed (attempt {retry_count + 1}/{max_retries + 1}), "
-                        f"retrying in {delay + jitter:.1f}s: {e}"
-                    )
-                    time.sleep(delay + jitter)
-            
-            # Step 2: Brief pause before inserting items
-            time.sleep(0.1)
-            
-            # Step 3: Insert order_items with retry (exponential backoff + jitter)
-            for retry_count in range(max_retries + 1):
-                try:
-                    self.streaming_manager.insert_order_items(all_order_items)
-                    items_inserted = True
-                    break
-                except StreamingIngestError as e:
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"Failed to insert order_items after {max_retries + 1} attempts: {e}",
-                            exc_info=True
-                        )
-                        # Items failed but orders succeeded - reconciliation will clean this up
-                        logger.warning(
-                            f"ATOMICITY VIOLATION: {len(order_batch)} orders inserted but "
-                            f"{len(all_order_items)} order_items failed. Reconciliation will clean up."
-                        )
-                        raise
-                    delay = min(2 ** retry_count, 16)
-                    jitter = random.uniform(0, delay * 0.25)
-                    logger.warning(
-                        f"Order_items insert failed (attempt {retry_count + 1}/{max_retries + 1}), "
-                        f"retrying in {delay + jitter:.1f}s: {e}"
-                    )
-                    time.sleep(delay + jitter)
-            
-            # Both succeeded
-            if orders_inserted and items_inserted:
                 processed_orders += current_batch_size
                 logger.info(
                     f"Progress: {processed_orders}/{num_orders} orders streamed "
-                    f"({len(all_order_items)} order items)"
+                    f"({items_streamed} order items)"
                 )
         
         logger.info(f"Successfully streamed {num_orders} orders")
         self._print_offset_status()
+        return processed_orders
+
+    def stream_at_rate(
+        self,
+        duration_seconds: Optional[float],
+        orders_per_second: Optional[float] = None,
+        max_orders: Optional[int] = None,
+        stop_event: Optional[threading.Event] = None,
+        rate_share: float = 1.0,
+    ) -> Dict[str, Any]:
+        """
+        Long-running soak mode: sustain a target orders/sec (shaped by the rate.*
+        properties) until duration_seconds elapse, max_orders are sent or
+        stop_event is set. `rate_share` is the fraction of the target (and of a
+        reloaded rate.orders.per.second) this app sustains; parallel instances
+        split the total rate this way.
+        """
+        self._get_max_customer_id()
+        
+        shape = LoadShape.from_config(self.config, orders_per_second).scaled(rate_share)
+        with self._order_batcher() as batcher:
+            runner = SteadyStateRunner(
+                shape,
+                lambda batch_size: self._stream_order_batch(batcher, batch_size),
+                max_batch_size=self.config.get_int_property("orders.batch.size", 10000),
+                tick_seconds=self.config.get_int_property("generation.interval.ms", 10000) / 1000.0,
+                name=self.name or "soak",
+            )
+            # Rate, batch and timeout changes from a config reload apply mid-run
+            on_runner_change = lambda changed: runner.reconfigure(self.config, changed, rate_share)
+            self.config.subscribe(on_runner_change, keys=RUNNER_CONFIG_KEYS)
+            try:
+                stats = runner.run(duration_seconds, max_orders=max_orders, stop_event=stop_event)
+            finally:
+                self.config.unsubscribe(on_runner_change)
+        stats["flush_metrics"] = batcher.get_metrics()
+        self._print_offset_status()
+        return stats
+
+    def generate_and_stream_customers(self, num_customers: int) -> int:
+        """Seed the CUSTOMERS table with new customers above the current max CUSTOMER_ID."""
+        streamer = CustomerStreamer(
+            self.config,
+            self.streaming_manager,
+            CustomerStreamer.allocator_from_database(self.streaming_manager),
+        )
+        streamed = streamer.stream(num_customers)
+        # New customers become eligible for order generation
+        self._max_customer_id = None
+        return streamed
+
+    def close(self) -> None:
+        """Stop following config reloads and close the channels."""
+        self.config.unsubscribe(self._apply_retry_config)
+        self.streaming_manager.close()
 
     def _print_offset_status(self) -> None:
         logger.info("=== Offset Token Status ===")
@@ -138,66 +260,124 @@ class AutomatedIntelligenceStreaming:
         )
 
 
+def reconcile_if_needed(
+    config: ConfigManager, app: AutomatedIntelligenceStreaming
+) -> Optional[Dict[str, Any]]:
+    """
+    Run post-ingestion reconciliation when a paired batch was dropped or never
+    became durable (or reconciliation.always=true). Returns the reconciliation
+    stats, or None when it was skipped or failed.
+    """
+    # Orphans are only possible when a batch was dropped or never became durable
+    needs_reconciliation = (
+        app.committer.has_unresolved
+        or config.get_bool_property("reconciliation.always", False)
+    )
+    if not needs_reconciliation:
+        logger.info("✅ All batches durable on both channels - skipping reconciliation")
+        return None
+
+    logger.info("\n" + "="*60)
+    logger.info("Starting post-ingestion reconciliation...")
+    logger.info("="*60)
+
+    reconciliation_stats = None
+    try:
+        reconciliation_manager = ReconciliationManager(config)
+        reconciliation_stats = reconciliation_manager.reconcile_and_cleanup()
+
+        # Report if any inconsistencies were found
+        if reconciliation_stats["orphaned_orders_found"] > 0 or reconciliation_stats["orphaned_items_found"] > 0:
+            logger.warning(
+                f"⚠️  Data inconsistencies detected and cleaned: "
+                f"{reconciliation_stats['orphaned_orders_deleted']:,} orphaned orders, "
+                f"{reconciliation_stats['orphaned_items_deleted']:,} orphaned order_items"
+            )
+        else:
+            logger.info("✅ No data inconsistencies found - ingestion was atomic")
+
+    except Exception as e:
+        logger.error(f"Reconciliation failed: {e}", exc_info=True)
+        logger.warning("⚠️  Reconciliation failed but ingestion completed. Manual cleanup may be needed.")
+
+    logger.info("="*60 + "\n")
+    return reconciliation_stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stream synthetic orders to Snowflake via Snowpipe Streaming"
+    )
+    parser.add_argument("num_orders", type=int, nargs="?", default=None,
+                        help="Orders to stream (soak mode: optional cap on total orders; "
+                             "with --customers: customers to stream)")
+    parser.add_argument("config_file", nargs="?", default="config_default.properties")
+    parser.add_argument("profile_file", nargs="?", default="profile.json")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Soak mode: target orders/sec (shaped by rate.* properties)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Soak mode: run time in seconds (default: soak.duration.seconds, 0 = until Ctrl+C)")
+    parser.add_argument("--customers", action="store_true",
+                        help="Stream new customers instead of orders")
+    args = parser.parse_args(argv)
+    if args.customers and (args.num_orders is None or args.rate is not None):
+        parser.error("--customers needs a customer count and cannot be combined with --rate")
+    if args.duration is not None and args.rate is None:
+        parser.error("--duration only applies to soak mode; add --rate")
+    return args
+
+
 def main():
+    configure_logging()
     logger.info("Starting Automated Intelligence Snowpipe Streaming")
     
     config = None
     streaming_manager = None
     
     try:
-        config_file = "config_default.properties"
-        profile_file = "profile.json"
-        num_orders = None
-        
-        if len(sys.argv) > 1:
-            num_orders = int(sys.argv[1])
-        if len(sys.argv) > 2:
-            config_file = sys.argv[2]
-        if len(sys.argv) > 3:
-            profile_file = sys.argv[3]
-        
-        config = ConfigManager(config_file, profile_file)
+        args = parse_args()
+        num_orders = args.num_orders
+        
+        config = ConfigManager(args.config_file, args.profile_file)
+        config.install_reload_handler()
+        config.start_watching(config.get_int_property("config.reload.interval.seconds", 0))
         streaming_manager = SnowpipeStreamingManager(config)
         
         app = AutomatedIntelligenceStreaming(config, streaming_manager)
         
-        if num_orders is None:
-            num_orders = config.get_int_property("num.orders.per.batch", 100)
+        if args.customers:
+            app.generate_and_stream_customers(num_orders)
+            if not streaming_manager.wait_for_flush(timeout_seconds=120):
+                logger.warning("Customers channel flush timed out after 120s")
+            logger.info("Application completed successfully")
+            return
         
-        app.generate_and_stream_orders(num_orders)
+        if args.rate is not None:
+            duration = args.duration
+            if duration is None:
+                duration = config.get_int_property("soak.duration.seconds", 0)
+            stop_event = threading.Event()
+            install_stop_handlers(stop_event)
+            app.stream_at_rate(
+                duration if duration > 0 else None,
+                orders_per_second=args.rate,
+                max_orders=num_orders,
+                stop_event=stop_event,
+            )
+        else:
+            if num_orders is None:
+                num_orders = config.get_int_property("num.orders.per.batch", 100)
+            app.generate_and_stream_orders(num_orders)
         
-        logger.info("Waiting for all channel data to flush to Snowflake...")
-        flushed = streaming_manager.wait_for_flush(timeout_seconds=120)
-        if not flushed:
+        logger.info("Waiting for all batches to commit on both channels...")
+        durable = app.wait_for_durable(timeout_seconds=120)
+        if not durable:
             logger.warning(
-                "Channel flush timed out after 120s. "
+                "Paired batches still pending after 120s. "
                 "Reconciliation may report false orphans."
             )
         
-        # Run reconciliation to clean up any orphaned records
-        logger.info("\n" + "="*60)
-        logger.info("Starting post-ingestion reconciliation...")
-        logger.info("="*60)
-        
-        try:
-            reconciliation_manager = ReconciliationManager(config)
-            reconciliation_stats = reconciliation_manager.reconcile_and_cleanup()
-            
-            # Report if any inconsistencies were found
-            if reconciliation_stats["orphaned_orders_found"] > 0 or reconciliation_stats["orphaned_items_found"] > 0:
-                logger.warning(
-                    f"⚠️  Data inconsistencies detected and cleaned: "
-                    f"{reconciliation_stats['orphaned_orders_deleted']:,} orphaned orders, "
-                    f"{reconciliation_stats['orphaned_items_deleted']:,} orphaned order_items"
-                )
-            else:
-                logger.info("✅ No data inconsistencies found - ingestion was atomic")
-                
-        except Exception as e:
-            logger.error(f"Reconciliation failed: {e}", exc_info=True)
-            logger.warning("⚠️  Reconciliation failed but ingestion completed. Manual cleanup may be needed.")
-        
-        logger.info("="*60 + "\n")
+        reconcile_if_needed(config, app)
         
         logger.info("Application completed successfully")
         
@@ -205,6 +385,8 @@ def main():
         logger.error("Application error", exc_info=True)
         sys.exit(1)
     finally:
+        if config is not None:
+            config.stop_watching()
         if streaming_manager is not None:
             streaming_manager.close()
 
@@ -1,19 +1,66 @@
 import json
 import os
-from typing import Dict, Any
+import signal
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Numeric properties checked on load and on every reload: key -> (type, minimum, maximum or None)
+TYPED_PROPERTIES: Dict[str, Tuple[type, float, Optional[float]]] = {
+    "batch.size": (int, 1, None),
+    "batch.timeout.ms": (int, 0, None),
+    "batch.max.bytes": (int, 0, None),
+    "max.client.lag": (int, 0, None),
+    "max.retries": (int, 0, None),
+    "retry.delay.ms": (int, 0, None),
+    "orders.batch.size": (int, 1, None),
+    "customers.batch.size": (int, 1, None),
+    "num.orders.per.batch": (int, 1, None),
+    "generation.interval.ms": (int, 1, None),
+    "paired.max.pending.batches": (int, 1, None),
+    "soak.duration.seconds": (int, 0, None),
+    "config.reload.interval.seconds": (int, 0, None),
+    "rate.orders.per.second": (float, 0.0, None),
+    "rate.ramp.up.seconds": (float, 0.0, None),
+    "rate.diurnal.amplitude": (float, 0.0, 1.0),
+    "rate.diurnal.period.seconds": (float, 0.0, None),
+    "rate.burst.multiplier": (float, 1.0, None),
+    "rate.burst.interval.seconds": (float, 0.0, None),
+    "rate.burst.duration.seconds": (float, 0.0, None),
+}
+
+# Outer append retry settings, re-read by the streaming apps on reload
+RETRY_CONFIG_KEYS = {"max.retries", "retry.delay.ms"}
+
+# Pipes and channels are bound when the clients open; reloading can't move them
+RESTART_REQUIRED_PREFIXES = ("pipe.", "channel.")
+
+_TRUE_VALUES = {"true", "yes", "1", "on"}
+_FALSE_VALUES = {"false", "no", "0", "off"}
+
+ConfigCallback = Callable[[Set[str]], None]
+
 
 class ConfigManager:
     def __init__(self, properties_path: str, profile_path: str):
         self._validate_file_exists(properties_path, "Properties")
         self._validate_file_exists(profile_path, "Profile")
+        self.properties_path = properties_path
+        self._properties_mtime = os.path.getmtime(properties_path)
         self.properties = self._load_properties(properties_path)
         self.profile_config = self._load_profile(profile_path)
         self._validate_required_properties()
         self._validate_required_profile_fields()
+        self._validate_typed_properties(self.properties)
+
+        # Parsed values keyed by (key, type); replaced wholesale on reload
+        self._typed_cache: Dict[Tuple[str, type], Any] = {}
+        self._reload_lock = threading.Lock()
+        self._subscribers: List[Tuple[ConfigCallback, Optional[Set[str]]]] = []
+        self._watch_stop: Optional[threading.Event] = None
+        self._watch_thread: Optional[threading.Thread] = None
     
     def _validate_file_exists(self, path: str, file_type: str) -> None:
         if not os.path.exists(path):
@@ -23,14 +70,16 @@ class ConfigManager:
                 f"Run with: python parallel_streaming_orchestrator.py <orders> <instances> <config_file> <profile_file>"
             )
     
-    def _validate_required_properties(self) -> None:
+    def _validate_required_properties(self, properties: Optional[Dict[str, str]] = None) -> None:
+        if properties is None:
+            properties = self.properties
         required_keys = [
             "pipe.orders.name",
             "pipe.order_items.name",
             "channel.orders.name",
             "channel.order_items.name"
         ]
-        missing = [key for key in required_keys if key not in self.properties]
+        missing = [key for key in required_keys if key not in properties]
         if missing:
             raise ValueError(
                 f"Required properties missing from config file: {', '.join(missing)}\n"
@@ -46,6 +95,23 @@ class ConfigManager:
                 f"Please ensure your profile.json contains all required Snowflake connection details."
             )
 
+    def _validate_typed_properties(self, properties: Dict[str, str]) -> None:
+        errors = []
+        for key, (value_type, minimum, maximum) in TYPED_PROPERTIES.items():
+            if key not in properties:
+                continue
+            try:
+                value = value_type(properties[key])
+            except ValueError:
+                errors.append(f"{key}={properties[key]!r} is not a valid {value_type.__name__}")
+                continue
+            if value < minimum:
+                errors.append(f"{key}={value} must be >= {minimum}")
+            elif maximum is not None and value > maximum:
+                errors.append(f"{key}={value} must be <= {maximum}")
+        if errors:
+            raise ValueError("Invalid configuration values: " + "; ".join(errors))
+
     def _load_properties(self, path: str) -> Dict[str, str]:
         props = {}
         with open(path, "r") as f:
@@ -67,9 +133,128 @@ class ConfigManager:
     def get_property(self, key: str, default: str = None) -> str:
         return self.properties.get(key, default)
 
-    def get_int_property(self, key: str, default: int = None) -> int:
+    def _get_typed(self, key: str, value_type: type, parse: Callable[[str], Any], default: Any) -> Any:
+        cache = self._typed_cache
+        cache_key = (key, value_type)
+        if cache_key in cache:
+            return cache[cache_key]
         value = self.get_property(key)
-        return int(value) if value is not None else default
+        if value is None:
+            return default
+        try:
+            parsed = parse(value)
+        except ValueError:
+            raise ValueError(f"Property {key}={value!r} is not a valid {value_type.__name__}")
+        cache[cache_key] = parsed
+        return parsed
+
+    def get_int_property(self, key: str, default: int = None) -> int:
+        return self._get_typed(key, int, int, default)
+
+    def get_float_property(self, key: str, default: float = None) -> float:
+        return self._get_typed(key, float, float, default)
+
+    def get_bool_property(self, key: str, default: bool = False) -> bool:
+        def parse(value: str) -> bool:
+            lowered = value.lower()
+            if lowered in _TRUE_VALUES:
+                return True
+            if lowered in _FALSE_VALUES:
+                return False
+            raise ValueError(value)
+        return self._get_typed(key, bool, parse, default)
+
+    def subscribe(self, callback: ConfigCallback, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Call `callback(changed_keys)` after a reload that changes any of `keys`
+        (or any property when keys is None). Callbacks run on the reloading thread.
+        """
+        self._subscribers.append((callback, set(keys) if keys is not None else None))
+
+    def unsubscribe(self, callback: ConfigCallback) -> None:
+        self._subscribers = [(cb, keys) for cb, keys in self._subscribers if cb != callback]
+
+    def reload(self) -> Set[str]:
+        """
+        Re-read the properties file and notify subscribers of changed keys.
+        Invalid or incomplete files are rejected and the current values kept.
+        Returns the set of changed keys.
+        """
+        with self._reload_lock:
+            try:
+                self._properties_mtime = os.path.getmtime(self.properties_path)
+                properties = self._load_properties(self.properties_path)
+                self._validate_required_properties(properties)
+                self._validate_typed_properties(properties)
+            except (OSError, ValueError) as e:
+                logger.error(f"Config reload rejected, keeping current values: {e}")
+                return set()
+
+            previous = self.properties
+            changed = {
+                key for key in set(previous) | set(properties)
+                if previous.get(key) != properties.get(key)
+            }
+            if not changed:
+                return changed
+            self.properties = properties
+            self._typed_cache = {}
+            logger.info(f"Config reloaded, changed: {', '.join(sorted(changed))}")
+            restart_only = sorted(k for k in changed if k.startswith(RESTART_REQUIRED_PREFIXES))
+            if restart_only:
+                logger.warning(
+                    f"Changed {', '.join(restart_only)} only take effect when channels are reopened"
+                )
+
+        for callback, keys in list(self._subscribers):
+            if keys is None or keys & changed:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    logger.error(f"Config change callback failed: {e}", exc_info=True)
+        return changed
+
+    def check_for_changes(self) -> Set[str]:
+        """Reload if the properties file was modified since it was last read."""
+        try:
+            mtime = os.path.getmtime(self.properties_path)
+        except OSError:
+            return set()
+        if mtime == self._properties_mtime:
+            return set()
+        return self.reload()
+
+    def start_watching(self, interval_seconds: float) -> None:
+        """Poll the properties file for changes on a daemon thread."""
+        if self._watch_thread is not None or interval_seconds <= 0:
+            return
+        self._watch_stop = threading.Event()
+
+        def _watch():
+            while not self._watch_stop.wait(interval_seconds):
+                self.check_for_changes()
+
+        self._watch_thread = threading.Thread(target=_watch, name="config-watch", daemon=True)
+        self._watch_thread.start()
+        logger.info(f"Watching {self.properties_path} for changes every {interval_seconds:.0f}s")
+
+    def stop_watching(self) -> None:
+        if self._watch_thread is None:
+            return
+        self._watch_stop.set()
+        self._watch_thread.join(timeout=5)
+        self._watch_thread = None
+
+    def install_reload_handler(self) -> None:
+        """Reload on SIGHUP (main thread only, where the platform has SIGHUP)."""
+        if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+            return
+
+        def _handler(signum, frame):
+            # Reload off the signal frame so a reload already holding the lock can't deadlock
+            threading.Thread(target=self.reload, name="config-reload", daemon=True).start()
+
+        signal.signal(signal.SIGHUP, _handler)
 
     def get_snowflake_user(self) -> str:
         return self.profile_config["user"]
@@ -0,0 +1,71 @@
+"""
+Bulk customer generation over Snowpipe Streaming.
+
+Seeds the CUSTOMERS table directly from the client (no generate_customers()
+stored procedure needed). Customer IDs come from a shared IdRangeAllocator, so
+any number of parallel streamers can run without colliding, and each batch
+carries its ID range as the offset token (customer_<first> .. customer_<last>).
+"""
+import logging
+import time
+from typing import List, Optional
+
+from config_manager import ConfigManager
+from data_generator import DataGenerator
+from id_tracker import IdRangeAllocator
+from models import Customer
+from snowpipe_streaming_manager import SnowpipeStreamingManager
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerStreamer:
+    def __init__(
+        self,
+        config: ConfigManager,
+        streaming_manager: SnowpipeStreamingManager,
+        allocator: IdRangeAllocator,
+        name: str = "customers",
+    ):
+        self.config = config
+        self.streaming_manager = streaming_manager
+        self.allocator = allocator
+        self.name = name
+
+    @staticmethod
+    def allocator_from_database(streaming_manager: SnowpipeStreamingManager) -> IdRangeAllocator:
+        """Start allocating after the highest CUSTOMER_ID already in Snowflake."""
+        max_customer_id = streaming_manager.get_max_customer_id()
+        logger.info(f"New customer IDs start at {max_customer_id + 1}")
+        return IdRangeAllocator(max_customer_id)
+
+    def _generate_batch(self, batch_size: int) -> List[Customer]:
+        first_id, last_id = self.allocator.reserve(batch_size)
+        return [DataGenerator.generate_customer(customer_id) for customer_id in range(first_id, last_id + 1)]
+
+    def stream(self, num_customers: int, batch_size: Optional[int] = None) -> int:
+        """Generate and stream `num_customers` customers. Returns the number streamed."""
+        if batch_size is None:
+            batch_size = self.config.get_int_property("customers.batch.size", 10000)
+        logger.info(
+            f"[{self.name}] Streaming {num_customers:,} customers "
+            f"({batch_size:,} per append_rows call)"
+        )
+        start = time.time()
+        streamed = 0
+
+        while streamed < num_customers:
+            customers = self._generate_batch(min(batch_size, num_customers - streamed))
+            self.streaming_manager.insert_customers(customers)
+            streamed += len(customers)
+            logger.info(
+                f"[{self.name}] Progress: {streamed:,}/{num_customers:,} customers "
+                f"(IDs up to {customers[-1].customer_id})"
+            )
+
+        duration = time.time() - start
+        rate = streamed / duration if duration > 0 else 0.0
+        logger.info(
+            f"[{self.name}] Streamed {streamed:,} customers in {duration:.1f}s ({rate:,.0f}/sec)"
+        )
+        return streamed
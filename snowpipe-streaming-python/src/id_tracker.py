@@ -1,6 +1,6 @@
 import logging
 from threading import Lock
-from typing import Optional
+from typing import Optional, Tuple
 from snowpipe_streaming_manager import SnowpipeStreamingManager
 
 logger = logging.getLogger(__name__)
@@ -51,3 +51,23 @@ class IDTracker:
             start_id = self.order_item_id_counter
             self.order_item_id_counter += count - 1
             return start_id
+
+
+class IdRangeAllocator:
+    """
+    Hands out contiguous, non-overlapping ID ranges above a starting point.
+    Shared by parallel workers so each batch gets IDs no other worker uses.
+    """
+
+    def __init__(self, last_used_id: int):
+        self.last_used_id = last_used_id
+        self.lock = Lock()
+
+    def reserve(self, count: int) -> Tuple[int, int]:
+        """Reserve `count` IDs and return the inclusive (first, last) range."""
+        if count <= 0:
+            raise ValueError("Reservation count must be positive")
+        with self.lock:
+            first_id = self.last_used_id + 1
+            self.last_used_id += count
+            return first_id, self.last_used_id
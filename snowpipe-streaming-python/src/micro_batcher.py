@@ -0,0 +1,363 @@
+"""
+Time-based micro-batching in front of the append_rows calls.
+
+A batch is flushed on whichever comes first: row count, estimated byte size or
+age of the oldest buffered record (batch.timeout.ms). This keeps a slow trickle
+of orders (rate-limited or event-driven feeds) from waiting indefinitely for a
+full orders.batch.size batch. A flush that fails with one of the `requeue_on`
+errors keeps its records buffered (ahead of anything added since) for the next
+attempt; any other failure drops them. Every flush is recorded so the
+latency/throughput tradeoff can be tuned alongside max.client.lag.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Generic, List, Optional, Set, Tuple, Type, TypeVar
+
+from config_manager import ConfigManager
+from models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FLUSH_REASON_ROWS = "rows"
+FLUSH_REASON_BYTES = "bytes"
+FLUSH_REASON_TIMEOUT = "timeout"
+FLUSH_REASON_MANUAL = "manual"
+
+# Properties an OrderMicroBatcher picks up on config reload
+BATCHER_CONFIG_KEYS = {"orders.batch.size", "batch.max.bytes", "batch.timeout.ms"}
+
+
+def estimate_row_bytes(row: Dict[str, Any]) -> int:
+    """Rough wire size of a row (JSON encoded), good enough for flush thresholds."""
+    return len(json.dumps(row, default=str))
+
+
+@dataclass
+class FlushRecord:
+    reason: str
+    records: int
+    rows: int
+    bytes: int
+    oldest_age_ms: float
+    flush_duration_ms: float
+    success: bool
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Buffers records and hands them to `flush_fn` in batches.
+
+    `row_count_fn` / `size_fn` give the row count and estimated bytes of one
+    record, so a record can be a compound unit (e.g. an order with its items).
+    A background thread enforces the timeout; errors raised on it are re-raised
+    on the next add() / flush() / close().
+
+    Requeueing is opt-in: if `flush_fn` raises one of `requeue_on`, the records
+    go back to the head of the buffer and are retried by the next flush (the
+    timer waits one timeout before retrying). Only list errors that `flush_fn`
+    raises before writing anything - a retry resends every record of the
+    batch. Records of any other failed flush are dropped (and counted).
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[T]], None],
+        max_rows: int,
+        max_bytes: int,
+        timeout_ms: int,
+        row_count_fn: Callable[[T], int] = lambda record: 1,
+        size_fn: Callable[[T], int] = lambda record: 0,
+        name: str = "batcher",
+        history_size: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+        start_timer: bool = True,
+        requeue_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        if max_rows <= 0:
+            raise ValueError("max_rows must be positive")
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout_ms = timeout_ms
+        self.row_count_fn = row_count_fn
+        self.size_fn = size_fn
+        self.name = name
+        self.requeue_on = requeue_on
+        self._clock = clock
+
+        self._buffer: List[T] = []
+        self._buffer_rows = 0
+        self._buffer_bytes = 0
+        self._oldest: Optional[float] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+        # _lock guards the buffer; _flush_lock serializes flushes so batches keep order
+        self._lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+
+        self.flush_history: Deque[FlushRecord] = deque(maxlen=history_size)
+        self._totals = {
+            "flushes": 0,
+            "records": 0,
+            "rows": 0,
+            "bytes": 0,
+            "failed_flushes": 0,
+            "dropped_rows": 0,
+        }
+        # Flush counts per trigger, e.g. "timeout_flushes"
+        for reason in (FLUSH_REASON_ROWS, FLUSH_REASON_BYTES, FLUSH_REASON_TIMEOUT, FLUSH_REASON_MANUAL):
+            self._totals[f"{reason}_flushes"] = 0
+
+        self._timer: Optional[threading.Thread] = None
+        if start_timer and timeout_ms > 0:
+            self._timer = threading.Thread(
+                target=self._timer_loop, name=f"{name}-flush-timer", daemon=True
+            )
+            self._timer.start()
+
+    def _raise_pending_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def add(self, records: List[T]) -> None:
+        """Buffer records, flushing inline if a row or byte threshold is reached."""
+        self._raise_pending_error()
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        if not records:
+            return
+        reason = None
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = self._clock()
+            for record in records:
+                self._buffer.append(record)
+                self._buffer_rows += self.row_count_fn(record)
+                self._buffer_bytes += self.size_fn(record)
+            if self._buffer_rows >= self.max_rows:
+                reason = FLUSH_REASON_ROWS
+            elif self.max_bytes > 0 and self._buffer_bytes >= self.max_bytes:
+                reason = FLUSH_REASON_BYTES
+            self._lock.notify_all()
+        if reason is not None:
+            self._flush(reason)
+
+    def flush(self) -> None:
+        """Flush whatever is buffered now."""
+        self._raise_pending_error()
+        self._flush(FLUSH_REASON_MANUAL)
+
+    def poll(self) -> bool:
+        """Flush if the oldest record has exceeded the timeout. Returns True if a flush ran."""
+        with self._lock:
+            due = self._oldest is not None and (
+                (self._clock() - self._oldest) * 1000 >= self.timeout_ms
+            )
+        if due:
+            self._flush(FLUSH_REASON_TIMEOUT)
+        return due
+
+    def _flush(self, reason: str) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                records = self._buffer
+                rows, size, oldest = self._buffer_rows, self._buffer_bytes, self._oldest
+                self._buffer = []
+                self._buffer_rows = 0
+                self._buffer_bytes = 0
+                self._oldest = None
+
+            start = self._clock()
+            oldest_age_ms = (start - oldest) * 1000 if oldest is not None else 0.0
+            success = False
+            try:
+                self.flush_fn(records)
+                success = True
+            except Exception as e:
+                if isinstance(e, self.requeue_on):
+                    self._requeue(records, rows, size, oldest)
+                else:
+                    self._totals["dropped_rows"] += rows
+                    logger.error(f"[{self.name}] flush failed, {rows} rows dropped: {e}")
+                raise
+            finally:
+                record = FlushRecord(
+                    reason=reason,
+                    records=len(records),
+                    rows=rows,
+                    bytes=size,
+                    oldest_age_ms=oldest_age_ms,
+                    flush_duration_ms=(self._clock() - start) * 1000,
+                    success=success,
+                )
+                self._record_flush(record)
+
+    def _requeue(self, records: List[T], rows: int, size: int, oldest: Optional[float]) -> None:
+        """Put the records of a failed flush back ahead of anything buffered since."""
+        with self._lock:
+            self._buffer[:0] = records
+            self._buffer_rows += rows
+            self._buffer_bytes += size
+            if oldest is not None and (self._oldest is None or oldest < self._oldest):
+                self._oldest = oldest
+            self._lock.notify_all()
+
+    def _record_flush(self, record: FlushRecord) -> None:
+        self.flush_history.append(record)
+        self._totals["flushes"] += 1
+        self._totals[f"{record.reason}_flushes"] += 1
+        if record.success:
+            self._totals["records"] += record.records
+            self._totals["rows"] += record.rows
+            self._totals["bytes"] += record.bytes
+        else:
+            self._totals["failed_flushes"] += 1
+        logger.debug(
+            f"[{self.name}] flush ({record.reason}): {record.records} records, {record.rows} rows, "
+            f"{record.bytes:,} bytes, oldest {record.oldest_age_ms:.0f}ms, "
+            f"took {record.flush_duration_ms:.0f}ms"
+        )
+
+    def _timer_loop(self) -> None:
+        retry_at: Optional[float] = None
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if self._oldest is None:
+                    self._lock.wait()
+                    continue
+                remaining = self.timeout_ms / 1000.0 - (self._clock() - self._oldest)
+                if retry_at is not None:
+                    # The kept records are already past the timeout; don't retry in a tight loop
+                    remaining = max(remaining, retry_at - self._clock())
+                if remaining > 0:
+                    self._lock.wait(remaining)
+                    continue
+            try:
+                self.poll()
+                retry_at = None
+            except Exception as e:
+                logger.error(f"[{self.name}] timed flush failed: {e}")
+                self._error = e
+                retry_at = self._clock() + self.timeout_ms / 1000.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Totals plus latency/size stats over the recent flush history."""
+        history = list(self.flush_history)
+        metrics: Dict[str, Any] = dict(self._totals)
+        metrics["buffered_rows"] = self._buffer_rows
+        if history:
+            ages = sorted(r.oldest_age_ms for r in history)
+            durations = sorted(r.flush_duration_ms for r in history)
+            metrics["avg_rows_per_flush"] = sum(r.rows for r in history) / len(history)
+            metrics["avg_bytes_per_flush"] = sum(r.bytes for r in history) / len(history)
+            metrics["max_buffer_age_ms"] = ages[-1]
+            metrics["p50_buffer_age_ms"] = ages[len(ages) // 2]
+            metrics["avg_flush_duration_ms"] = sum(durations) / len(durations)
+            metrics["max_flush_duration_ms"] = durations[-1]
+        return metrics
+
+    def log_metrics(self) -> None:
+        m = self.get_metrics()
+        if not m["flushes"]:
+            logger.info(f"[{self.name}] no flushes")
+            return
+        logger.info(
+            f"[{self.name}] {m['flushes']} flushes "
+            f"(rows: {m['rows_flushes']}, bytes: {m['bytes_flushes']}, "
+            f"timeout: {m['timeout_flushes']}, manual: {m['manual_flushes']}) | "
+            f"avg {m['avg_rows_per_flush']:.0f} rows / {m['avg_bytes_per_flush'] / 1024:.0f} KB per flush | "
+            f"buffer age p50 {m['p50_buffer_age_ms']:.0f}ms, max {m['max_buffer_age_ms']:.0f}ms"
+        )
+
+    def close(self, flush: bool = True) -> None:
+        """
+        Flush the remainder and stop the timer thread. With flush=False (the
+        caller is giving up after an error) buffered records are left unsent.
+        """
+        try:
+            if flush:
+                self._flush(FLUSH_REASON_MANUAL)
+        finally:
+            with self._lock:
+                self._closed = True
+                self._lock.notify_all()
+            if self._timer is not None:
+                self._timer.join(timeout=5)
+        if not flush:
+            if self._buffer_rows:
+                logger.warning(f"[{self.name}] closed with {self._buffer_rows} rows not flushed")
+            return
+        self._raise_pending_error()
+
+
+class OrderMicroBatcher(MicroBatcher):
+    """
+    Micro-batcher whose unit is an order together with its order items, so a
+    flush always carries both halves of every order it contains.
+
+    orders.batch.size bounds the number of orders per flush; batch.max.bytes
+    bounds the estimated size of orders plus items.
+    """
+
+    def __init__(self, insert_fn: Callable[[List[Order], List[OrderItem]], None], **kwargs):
+        self.insert_fn = insert_fn
+        kwargs.setdefault("size_fn", self._unit_bytes)
+        super().__init__(self._flush_units, **kwargs)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: ConfigManager,
+        insert_fn: Callable[[List[Order], List[OrderItem]], None],
+        **kwargs,
+    ) -> "OrderMicroBatcher":
+        return cls(
+            insert_fn,
+            max_rows=config.get_int_property("orders.batch.size", 10000),
+            max_bytes=config.get_int_property("batch.max.bytes", 16 * 1024 * 1024),
+            timeout_ms=config.get_int_property("batch.timeout.ms", 5000),
+            **kwargs,
+        )
+
+    def reconfigure(self, config: ConfigManager, changed: Optional[Set[str]] = None) -> None:
+        """Pick up reloaded flush thresholds; the next add() / timer check uses them."""
+        with self._lock:
+            self.max_rows = config.get_int_property("orders.batch.size", self.max_rows)
+            self.max_bytes = config.get_int_property("batch.max.bytes", self.max_bytes)
+            self.timeout_ms = config.get_int_property("batch.timeout.ms", self.timeout_ms)
+            # Wake the timer so a shorter timeout applies to what is already buffered
+            self._lock.notify_all()
+        logger.info(
+            f"[{self.name}] Reconfigured: max {self.max_rows} rows, "
+            f"{self.max_bytes:,} bytes, timeout {self.timeout_ms}ms"
+        )
+
+    @staticmethod
+    def _unit_bytes(unit: Tuple[Order, List[OrderItem]]) -> int:
+        order, items = unit
+        return estimate_row_bytes(order.to_dict()) + sum(
+            estimate_row_bytes(item.to_dict()) for item in items
+        )
+
+    def _flush_units(self, units: List[Tuple[Order, List[OrderItem]]]) -> None:
+        orders = [order for order, _ in units]
+        items = [item for _, order_items in units for item in order_items]
+        self.insert_fn(orders, items)
+
+    def add_orders(self, orders: List[Order], items: List[OrderItem]) -> None:
+        items_by_order: Dict[str, List[OrderItem]] = {}
+        for item in items:
+            items_by_order.setdefault(item.order_id, []).append(item)
+        self.add([(order, items_by_order.get(order.order_id, [])) for order in orders])
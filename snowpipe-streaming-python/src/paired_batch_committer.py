@@ -0,0 +1,256 @@
+"""
+Coordinated two-channel commit for orders and their order items.
+
+Orders and order_items stream through separate channels, so a failure between
+the two appends used to leave orphaned orders that only a full-table
+reconciliation could clean up. Here every batch gets a sequence number that is
+used as the offset token on both channels (order_<seq> / item_<seq>):
+
+  - Orders and items of a batch are appended back to back (no fixed pause).
+  - A batch stays in a local buffer until BOTH channels' latest committed
+    offset tokens cover its sequence number; only then is it durable.
+  - If the items half fails (for any reason - an SDK error after the caller's
+    retries, a dropped connection, a bug in the append path), the batch is
+    kept and its items are retried from the buffer before any later batch's
+    items, so each channel's offsets stay in sequence order and
+    "committed >= seq" remains a valid coverage test.
+  - Once a batch's orders are appended, commit() never raises for it: an items
+    half that exhausts its retries marks the batch unresolved instead. Only an
+    orders-half failure raises, and then nothing of the batch was appended, so
+    the caller can safely send it again.
+
+Reconciliation is then only needed when an items half exhausts its retries or
+a batch never becomes durable.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+ORDER_OFFSET_PREFIX = "order_"
+ITEM_OFFSET_PREFIX = "item_"
+
+
+def parse_batch_seq(offset_token: Any, prefix: str) -> int:
+    """Sequence number from an order_<seq> / item_<seq> token, -1 if absent or not ours."""
+    if not isinstance(offset_token, str) or not offset_token.startswith(prefix):
+        return -1
+    try:
+        return int(offset_token[len(prefix):])
+    except ValueError:
+        return -1
+
+
+class PairedBatch:
+    def __init__(self, seq: int, orders: List[Order], items: List[OrderItem]):
+        self.seq = seq
+        self.orders = orders
+        self.items = items
+        self.orders_appended = False
+        self.items_appended = False
+        self.item_failures = 0
+        self.last_item_error: Optional[Exception] = None
+        self.appended_at: Optional[float] = None
+
+
+class PairedBatchCommitter:
+    """
+    Appends orders + items batches and tracks them until both channels commit.
+
+    `append_orders(orders, seq)` / `append_items(items, seq)` perform one append
+    (including any caller-level retries) and raise on failure.
+    """
+
+    def __init__(
+        self,
+        streaming_manager,
+        append_orders: Callable[[List[Order], int], None],
+        append_items: Callable[[List[OrderItem], int], None],
+        max_pending_batches: int = 20,
+        max_half_retries: int = 3,
+        poll_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.streaming_manager = streaming_manager
+        self.append_orders = append_orders
+        self.append_items = append_items
+        self.max_pending_batches = max_pending_batches
+        self.max_half_retries = max_half_retries
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.RLock()
+        self._pending: List[PairedBatch] = []
+        # Batches whose items half gave up: their orders are left for reconciliation
+        self.unresolved: List[PairedBatch] = []
+        self._next_seq: Optional[int] = None
+        self.stats: Dict[str, Any] = {
+            "batches": 0,
+            "durable_batches": 0,
+            "orders": 0,
+            "items": 0,
+            "item_half_retries": 0,
+            "commit_latencies_ms": [],
+        }
+
+    def _committed_seqs(self):
+        return (
+            parse_batch_seq(self.streaming_manager.get_latest_order_offset(), ORDER_OFFSET_PREFIX),
+            parse_batch_seq(self.streaming_manager.get_latest_order_item_offset(), ITEM_OFFSET_PREFIX),
+        )
+
+    def _allocate_seq(self) -> int:
+        if self._next_seq is None:
+            # Resume after whatever either channel last committed
+            self._next_seq = max(self._committed_seqs()) + 1
+            logger.info(f"Paired batch sequence starts at {self._next_seq}")
+        seq = self._next_seq
+        self._next_seq += 1
+        return seq
+
+    @property
+    def pending_batches(self) -> List[PairedBatch]:
+        with self._lock:
+            return list(self._pending)
+
+    def commit(self, orders: List[Order], items: List[OrderItem]) -> PairedBatch:
+        """
+        Append a batch to both channels. Raises only if the orders half fails
+        (nothing of the batch was appended); an items half that gives up marks
+        the batch unresolved instead.
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_pending_batches:
+                self._wait_for_capacity()
+
+            batch = PairedBatch(self._allocate_seq(), orders, items)
+            # Orders go first: if they fail nothing of this batch exists downstream
+            self.append_orders(orders, batch.seq)
+            batch.orders_appended = True
+            batch.appended_at = self._clock()
+            self._pending.append(batch)
+            self.stats["batches"] += 1
+            self.stats["orders"] += len(orders)
+
+            self._drain_items()
+            return batch
+
+    def _drain_items(self) -> None:
+        """
+        Append outstanding items halves in sequence order, stopping at the first
+        failure that is still to be retried. Never raises.
+        """
+        for batch in list(self._pending):
+            if batch.items_appended:
+                continue
+            try:
+                self.append_items(batch.items, batch.seq)
+            except Exception as e:
+                # Any failure leaves orders without their items: hold the batch either way
+                batch.item_failures += 1
+                batch.last_item_error = e
+                self.stats["item_half_retries"] += 1
+                if batch.item_failures > self.max_half_retries:
+                    logger.error(
+                        f"ATOMICITY VIOLATION: batch {batch.seq} has {len(batch.orders)} orders "
+                        f"appended but {len(batch.items)} order_items failed "
+                        f"{batch.item_failures} times. Reconciliation will clean up."
+                    )
+                    # Give up on this batch only; later items halves may go ahead
+                    self._pending.remove(batch)
+                    self.unresolved.append(batch)
+                    continue
+                logger.warning(
+                    f"Order_items for batch {batch.seq} failed "
+                    f"({batch.item_failures}/{self.max_half_retries}); "
+                    f"kept in local buffer for retry: {e}"
+                )
+                return
+            batch.items_appended = True
+            self.stats["items"] += len(batch.items)
+
+    def poll_durable(self) -> int:
+        """Drop batches both channels have committed. Returns how many became durable."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            orders_seq, items_seq = self._committed_seqs()
+            now = self._clock()
+            durable = [
+                b for b in self._pending
+                if b.items_appended and b.seq <= orders_seq and (not b.items or b.seq <= items_seq)
+            ]
+            for batch in durable:
+                self._pending.remove(batch)
+                self.stats["durable_batches"] += 1
+                if batch.appended_at is not None:
+                    self.stats["commit_latencies_ms"].append((now - batch.appended_at) * 1000)
+            return len(durable)
+
+    def _wait_for_capacity(self, timeout_seconds: float = 120.0) -> None:
+        start = self._clock()
+        while len(self._pending) >= self.max_pending_batches:
+            self._drain_items()
+            self.poll_durable()
+            if len(self._pending) < self.max_pending_batches:
+                return
+            if self._clock() - start >= timeout_seconds:
+                logger.warning(
+                    f"{len(self._pending)} batches still awaiting commit after {timeout_seconds:.0f}s; "
+                    f"continuing with a larger local buffer"
+                )
+                return
+            self._sleep(self.poll_interval)
+
+    def wait_for_durable(self, timeout_seconds: float = 120.0) -> bool:
+        """
+        Retry any held items halves and wait until every batch is committed on
+        both channels. Returns False (and logs what is outstanding) on timeout.
+        """
+        start = self._clock()
+        while True:
+            with self._lock:
+                self._drain_items()
+                self.poll_durable()
+                if not self._pending:
+                    elapsed = self._clock() - start
+                    logger.info(f"All paired batches durable on both channels ({elapsed:.1f}s)")
+                    return True
+            if self._clock() - start >= timeout_seconds:
+                break
+            self._sleep(self.poll_interval)
+
+        orders_seq, items_seq = self._committed_seqs()
+        for batch in self.pending_batches:
+            logger.warning(
+                f"Batch {batch.seq} not durable after {timeout_seconds:.0f}s "
+                f"(items appended: {batch.items_appended}, committed orders: {orders_seq}, "
+                f"committed items: {items_seq}, last items error: {batch.last_item_error})"
+            )
+        return False
+
+    @property
+    def has_unresolved(self) -> bool:
+        """True if reconciliation may be needed: a batch gave up on its items or is still pending."""
+        with self._lock:
+            return bool(self._pending) or bool(self.unresolved)
+
+    def log_stats(self) -> None:
+        latencies = sorted(self.stats["commit_latencies_ms"])
+        summary = (
+            f"Paired commits: {self.stats['durable_batches']}/{self.stats['batches']} batches durable, "
+            f"{self.stats['orders']:,} orders, {self.stats['items']:,} order items, "
+            f"{self.stats['item_half_retries']} items-half retries, "
+            f"{len(self.unresolved)} unresolved"
+        )
+        if latencies:
+            summary += (
+                f" | commit latency p50 {latencies[len(latencies) // 2]:.0f}ms, "
+                f"max {latencies[-1]:.0f}ms"
+            )
+        logger.info(summary)
@@ -1,51 +1,89 @@
+import argparse
 import logging
 import sys
+import threading
 import time
-from typing import List
+from typing import Any, Dict, List, Optional
 from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from automated_intelligence_streaming import AutomatedIntelligenceStreaming, configure_logging
 from config_manager import ConfigManager
+from customer_streamer import CustomerStreamer
+from id_tracker import IdRangeAllocator
 from snowpipe_streaming_manager import SnowpipeStreamingManager
 from reconciliation_manager import ReconciliationManager
 from data_generator import DataGenerator
-from models import Order, OrderItem
+from rate_limiter import install_stop_handlers
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
 
 class ParallelStreamingOrchestrator:
     @staticmethod
-    def main(total_orders: int, num_instances: int, config_file: str = "config.properties", profile_file: str = "profile.json"):
+    def main(
+        total_orders: int,
+        num_instances: int,
+        config_file: str = "config.properties",
+        profile_file: str = "profile.json",
+        rate: Optional[float] = None,
+        duration: Optional[float] = None,
+        customers: bool = False,
+    ):
         logger.info("=== Parallel Streaming Orchestrator ===")
         logger.info(f"Total orders to generate: {total_orders}")
         logger.info(f"Number of parallel instances: {num_instances}")
         logger.info(f"Using config: {config_file}")
         
         config = None
+        stop_event = None
+        soak = None
         
         try:
             config = ConfigManager(config_file, profile_file)
+            config.install_reload_handler()
+            config.start_watching(config.get_int_property("config.reload.interval.seconds", 0))
+            if customers:
+                ParallelStreamingOrchestrator._stream_customers(total_orders, num_instances, config)
+                return
+            if rate is not None:
+                if duration is None:
+                    duration = config.get_int_property("soak.duration.seconds", 0)
+                stop_event = threading.Event()
+                install_stop_handlers(stop_event)
+                soak = {
+                    "rate": rate,
+                    "duration": duration if duration > 0 else None,
+                    "stop_event": stop_event,
+                    "capped": total_orders > 0,
+                }
+            instance_orders = ParallelStreamingOrchestrator._split_orders(
+                total_orders, num_instances, capped=soak is None or soak["capped"]
+            )
+            if not instance_orders:
+                logger.info("No orders to stream")
+                return
+            if soak is not None:
+                # Each running instance sustains the configured shape scaled to its share of the total rate
+                soak["rate_share"] = 1.0 / len(instance_orders)
+                logger.info(
+                    f"Soak mode: {rate:.1f} orders/sec total "
+                    f"({rate * soak['rate_share']:.1f}/sec per instance over {len(instance_orders)} instances), "
+                    f"duration: {'until stopped' if soak['duration'] is None else f'{duration:.0f}s'}"
+                )
             max_customer_id = ParallelStreamingOrchestrator._get_max_customer_id(config)
             
             logger.info(f"Total customers available: {max_customer_id}")
+            if max_customer_id < num_instances:
+                raise ValueError(
+                    f"Need at least {num_instances} customers to partition across instances, "
+                    f"found {max_customer_id}. Stream customers first with --customers."
+                )
             
-            orders_per_instance = total_orders // num_instances
             customer_range_size = max_customer_id // num_instances
             
-            with ThreadPoolExecutor(max_workers=num_instances) as executor:
+            with ThreadPoolExecutor(max_workers=len(instance_orders)) as executor:
                 futures: List[Future] = []
                 
-                for i in range(num_instances):
-                    orders_for_this_instance = (
-                        total_orders - (orders_per_instance * i)
-                        if i == num_instances - 1
-                        else orders_per_instance
-                    )
-                    
+                for i, orders_for_this_instance in instance_orders.items():
                     customer_id_start = (i * customer_range_size) + 1
                     customer_id_end = (
                         max_customer_id
@@ -65,20 +103,24 @@ class ParallelStreamingOrchestrator:
                         customer_id_start,
                         customer_id_end,
                         config,
+                        soak,
                     )
                     futures.append(future)
                 
                 logger.info(
-                    f"All {num_instances} instances submitted. Waiting for completion..."
+                    f"All {len(instance_orders)} instances submitted. Waiting for completion..."
                 )
                 
                 total_orders_generated = 0
                 successful_instances = 0
                 failed_instances = 0
+                unresolved_instances = 0
                 
                 for future in as_completed(futures):
                     try:
                         result = future.result()
+                        if not result["durable"]:
+                            unresolved_instances += 1
                         if result["success"]:
                             total_orders_generated += result["orders_generated"]
                             successful_instances += 1
@@ -94,43 +136,51 @@ class ParallelStreamingOrchestrator:
                             )
                     except Exception as e:
                         failed_instances += 1
+                        unresolved_instances += 1
                         logger.error(f"Instance failed with exception: {e}", exc_info=True)
                 
                 logger.info("=== Parallel Streaming Completed ===")
                 logger.info(
-                    f"Successful instances: {successful_instances}/{num_instances}"
+                    f"Successful instances: {successful_instances}/{len(instance_orders)}"
                 )
                 logger.info(f"Failed instances: {failed_instances}")
                 logger.info(f"Total orders generated: {total_orders_generated}")
                 
-                # Always run reconciliation to clean up any orphaned records
-                # (Even "failed" instances may have inserted partial data before failing)
-                logger.info("\n" + "="*60)
-                logger.info("Starting post-ingestion reconciliation...")
-                logger.info("="*60)
+                # Orphans are only possible when an instance failed or left
+                # batches that never became durable on both channels
+                needs_reconciliation = (
+                    unresolved_instances > 0
+                    or config.get_bool_property("reconciliation.always", False)
+                )
+                if needs_reconciliation:
+                    logger.info("\n" + "="*60)
+                    logger.info("Starting post-ingestion reconciliation...")
+                    logger.info("="*60)
                 
-                try:
-                    reconciliation_manager = ReconciliationManager(config)
-                    reconciliation_stats = reconciliation_manager.reconcile_and_cleanup()
+                    try:
+                        reconciliation_manager = ReconciliationManager(config)
+                        reconciliation_stats = reconciliation_manager.reconcile_and_cleanup()
                     
-                    # Report if any inconsistencies were found
-                    if (reconciliation_stats["orphaned_orders_found"] > 0 or 
-                        reconciliation_stats["orphaned_items_found"] > 0 or
-                        reconciliation_stats["duplicate_orders_found"] > 0):
-                        logger.warning(
-                            f"⚠️  Data inconsistencies detected and cleaned: "
-                            f"{reconciliation_stats['orphaned_orders_deleted']:,} orphaned orders, "
-                            f"{reconciliation_stats['orphaned_items_deleted']:,} orphaned order_items, "
-                            f"{reconciliation_stats['duplicate_orders_deleted']:,} duplicate orders"
-                        )
-                    else:
-                        logger.info("✅ No data inconsistencies found - ingestion was atomic")
+                        # Report if any inconsistencies were found
+                        if (reconciliation_stats["orphaned_orders_found"] > 0 or 
+                            reconciliation_stats["orphaned_items_found"] > 0 or
+                            reconciliation_stats["duplicate_orders_found"] > 0):
+                            logger.warning(
+                                f"⚠️  Data inconsistencies detected and cleaned: "
+                                f"{reconciliation_stats['orphaned_orders_deleted']:,} orphaned orders, "
+                                f"{reconciliation_stats['orphaned_items_deleted']:,} orphaned order_items, "
+                                f"{reconciliation_stats['duplicate_orders_deleted']:,} duplicate orders"
+                            )
+                        else:
+                            logger.info("✅ No data inconsistencies found - ingestion was atomic")
                         
-                except Exception as e:
-                    logger.error(f"Reconciliation failed: {e}", exc_info=True)
-                    logger.warning("⚠️  Reconciliation failed but ingestion completed. Manual cleanup may be needed.")
+                    except Exception as e:
+                        logger.error(f"Reconciliation failed: {e}", exc_info=True)
+                        logger.warning("⚠️  Reconciliation failed but ingestion completed. Manual cleanup may be needed.")
                 
-                logger.info("="*60 + "\n")
+                    logger.info("="*60 + "\n")
+                else:
+                    logger.info("✅ All batches durable on both channels - skipping reconciliation")
                 
                 if failed_instances > 0:
                     sys.exit(1)
@@ -138,6 +188,91 @@ class ParallelStreamingOrchestrator:
         except Exception as e:
             logger.error("Orchestrator error", exc_info=True)
             sys.exit(1)
+        finally:
+            if config is not None:
+                config.stop_watching()
+
+    @staticmethod
+    def _split_orders(total_orders: int, num_instances: int, capped: bool = True) -> Dict[int, int]:
+        """
+        Orders per instance id, for the instances that have any to send (the
+        last instance takes the remainder). Uncapped soak runs start every
+        instance with 0, meaning no cap.
+        """
+        if not capped:
+            return {i: 0 for i in range(num_instances)}
+        orders_per_instance = total_orders // num_instances
+        split = {i: orders_per_instance for i in range(num_instances - 1)}
+        split[num_instances - 1] = total_orders - orders_per_instance * (num_instances - 1)
+        return {i: orders for i, orders in split.items() if orders > 0}
+
+    @staticmethod
+    def _stream_customers(total_customers: int, num_instances: int, config: ConfigManager) -> None:
+        """Stream new customers from parallel instances sharing one ID allocator."""
+        allocator = IdRangeAllocator(ParallelStreamingOrchestrator._get_max_customer_id(config))
+        logger.info(
+            f"Streaming {total_customers:,} customers with {num_instances} instances "
+            f"(new IDs start at {allocator.last_used_id + 1})"
+        )
+        per_instance = total_customers // num_instances
+        start_time = time.time()
+        
+        with ThreadPoolExecutor(max_workers=num_instances) as executor:
+            futures = [
+                executor.submit(
+                    ParallelStreamingOrchestrator._run_customer_instance,
+                    i,
+                    total_customers - per_instance * i if i == num_instances - 1 else per_instance,
+                    allocator,
+                    config,
+                )
+                for i in range(num_instances)
+            ]
+            results = [future.result() for future in futures]
+        
+        streamed = sum(result["customers_generated"] for result in results)
+        failed = [result["instance_id"] for result in results if not result["success"]]
+        duration = time.time() - start_time
+        logger.info("=== Parallel Customer Streaming Completed ===")
+        logger.info(
+            f"Total customers streamed: {streamed:,} in {duration:.1f}s "
+            f"({streamed / duration if duration > 0 else 0:,.0f}/sec)"
+        )
+        logger.info(f"Customer IDs allocated up to: {allocator.last_used_id}")
+        if failed:
+            logger.error(f"Failed instances: {failed}")
+            sys.exit(1)
+
+    @staticmethod
+    def _run_customer_instance(
+        instance_id: int,
+        num_customers: int,
+        allocator: IdRangeAllocator,
+        config: ConfigManager,
+    ) -> dict:
+        streaming_manager = None
+        try:
+            streaming_manager = SnowpipeStreamingManager(config, instance_id)
+            streamer = CustomerStreamer(
+                config, streaming_manager, allocator, name=f"instance {instance_id} customers"
+            )
+            streamed = streamer.stream(num_customers)
+            flushed = streaming_manager.wait_for_flush(timeout_seconds=120)
+            return {
+                "instance_id": instance_id,
+                "customers_generated": streamed,
+                "success": flushed,
+            }
+        except Exception as e:
+            logger.error(f"Instance {instance_id} error: {e}", exc_info=True)
+            return {
+                "instance_id": instance_id,
+                "customers_generated": 0,
+                "success": False,
+            }
+        finally:
+            if streaming_manager is not None:
+                streaming_manager.close()
 
     @staticmethod
     def _run_streaming_instance(
@@ -146,6 +281,7 @@ class ParallelStreamingOrchestrator:
         customer_id_start: int,
         customer_id_end: int,
         config: ConfigManager,
+        soak: Optional[Dict[str, Any]] = None,
     ) -> dict:
         logger.info(
             f"Instance {instance_id} starting: {num_orders} orders, "
@@ -154,17 +290,28 @@ class ParallelStreamingOrchestrator:
         
         start_time = time.time()
         streaming_manager = None
+        app = None
         orders_generated = 0
         
         try:
             streaming_manager = SnowpipeStreamingManager(config, instance_id)
             app = PartitionedStreamingApp(
-                config, streaming_manager, customer_id_start, customer_id_end
+                config, streaming_manager, customer_id_start, customer_id_end, instance_id
             )
             
-            orders_generated = app.generate_and_stream_orders(num_orders)
+            if soak is not None:
+                stats = app.stream_at_rate(
+                    soak["duration"],
+                    soak["rate"],
+                    max_orders=num_orders if soak["capped"] else None,
+                    stop_event=soak["stop_event"],
+                    rate_share=soak["rate_share"],
+                )
+                orders_generated = stats["orders_streamed"]
+            else:
+                orders_generated = app.generate_and_stream_orders(num_orders)
             
-            time.sleep(2)
+            durable = app.wait_for_durable(timeout_seconds=120)
             
             duration_ms = int((time.time() - start_time) * 1000)
             return {
@@ -172,6 +319,7 @@ class ParallelStreamingOrchestrator:
                 "orders_generated": orders_generated,
                 "duration_ms": duration_ms,
                 "success": True,
+                "durable": durable and not app.committer.has_unresolved,
             }
             
         except Exception as e:
@@ -182,9 +330,13 @@ class ParallelStreamingOrchestrator:
                 "orders_generated": orders_generated,
                 "duration_ms": duration_ms,
                 "success": False,
+                "durable": False,
             }
         finally:
-            if streaming_manager is not None:
+            # Instances share one config: drop this instance's reload subscription too
+            if app is not None:
+                app.close()
+            elif streaming_manager is not None:
                 streaming_manager.close()
 
     @staticmethod
@@ -198,130 +350,70 @@ class ParallelStreamingOrchestrator:
                 temp_manager.close()
 
 
-class PartitionedStreamingApp:
+class PartitionedStreamingApp(AutomatedIntelligenceStreaming):
+    """
+    One orchestrator instance: streams orders for its own customer ID range and
+    otherwise behaves exactly like AutomatedIntelligenceStreaming (paired
+    committer, retry/backoff settings, soak mode).
+    """
+
     def __init__(
         self,
         config: ConfigManager,
         streaming_manager: SnowpipeStreamingManager,
         customer_id_start: int,
         customer_id_end: int,
+        instance_id: int = 0,
     ):
-        self.config = config
-        self.streaming_manager = streaming_manager
+        super().__init__(config, streaming_manager)
         self.customer_id_start = customer_id_start
         self.customer_id_end = customer_id_end
+        self.name = f"instance {instance_id}"
+
+    def _get_max_customer_id(self) -> int:
+        # The orchestrator already checked the customer table when it partitioned it
+        return self.customer_id_end
+
+    def _random_customer_id(self) -> int:
+        return DataGenerator.random_customer_id_in_range(self.customer_id_start, self.customer_id_end)
 
     def generate_and_stream_orders(self, num_orders: int) -> int:
         logger.info(
             f"Starting partitioned streaming: {num_orders} orders, "
             f"customer range {self.customer_id_start}-{self.customer_id_end}"
         )
-        
-        batch_size = self.config.get_int_property("orders.batch.size", 10000)
-        logger.info(f"Using batch size: {batch_size} orders per insertRows call")
-        
-        processed_orders = 0
-        max_retries = 3
-        
-        while processed_orders < num_orders:
-            remaining_orders = num_orders - processed_orders
-            current_batch_size = min(batch_size, remaining_orders)
-            
-            # Generate data once for this batch
-            order_batch: List[Order] = []
-            all_order_items: List[OrderItem] = []
-            
-            for i in range(current_batch_size):
-                customer_id = DataGenerator.random_customer_id_in_range(
-                    self.customer_id_start, self.customer_id_end
-                )
-                customer_segment = self.streaming_manager.get_customer_segment(customer_id)
-                order = DataGenerator.generate_order(customer_id, customer_segment)
-                order_batch.append(order)
-                
-                item_count = DataGenerator.random_item_count(customer_segment)
-                order_items = DataGenerator.generate_order_items(
-                    order.order_id, customer_segment, item_count
-                )
-                all_order_items.extend(order_items)
-            
-            # Insert orders and items separately with individual retry logic
-            # This prevents duplicate orders when items fail but orders succeed
-            orders_inserted = False
-            items_inserted = False
-            
-            # Step 1: Insert orders with retry
-            for retry_count in range(max_retries + 1):
-                try:
-                    self.streaming_manager.insert_orders(order_batch)
-                    orders_inserted = True
-                    break
-                except Exception as e:
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"Failed to insert orders after {max_retries + 1} attempts: {e}",
-                            exc_info=True
-                        )
-                        raise
-                    logger.warning(
-                        f"Orders insert failed (attempt {retry_count + 1}/{max_retries + 1}), retrying: {e}"
-                    )
-                    time.sleep(1 * (retry_count + 1))
-            
-            # Step 2: Brief pause before inserting items
-            time.sleep(0.1)
-            
-            # Step 3: Insert order_items with retry
-            for retry_count in range(max_retries + 1):
-                try:
-                    self.streaming_manager.insert_order_items(all_order_items)
-                    items_inserted = True
-                    break
-                except Exception as e:
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"Failed to insert order_items after {max_retries + 1} attempts: {e}",
-                            exc_info=True
-                        )
-                        # Items failed but orders succeeded - reconciliation will clean this up
-                        logger.warning(
-                            f"ATOMICITY VIOLATION: {len(order_batch)} orders inserted but "
-                            f"{len(all_order_items)} order_items failed. Reconciliation will clean up."
-                        )
-                        raise
-                    logger.warning(
-                        f"Order_items insert failed (attempt {retry_count + 1}/{max_retries + 1}), retrying: {e}"
-                    )
-                    time.sleep(1 * (retry_count + 1))
-            
-            # Both succeeded
-            if orders_inserted and items_inserted:
-                processed_orders += current_batch_size
-                logger.info(
-                    f"Progress: {processed_orders}/{num_orders} orders streamed "
-                    f"({len(all_order_items)} order items)"
-                )
-        
-        logger.info(
-            f"Successfully streamed {num_orders} orders "
-            f"(customer range: {self.customer_id_start}-{self.customer_id_end})"
-        )
-        
-        return processed_orders
+        return super().generate_and_stream_orders(num_orders)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(
-            "Usage: python parallel_streaming_orchestrator.py <total_orders> <num_parallel_instances> [config_file] [profile_file]"
-        )
-        print("Example: python parallel_streaming_orchestrator.py 1000000 5")
-        print("Example: python parallel_streaming_orchestrator.py 100000 5 config_staging.properties profile_staging.json")
-        sys.exit(1)
-    
-    total_orders = int(sys.argv[1])
-    num_instances = int(sys.argv[2])
-    config_file = sys.argv[3] if len(sys.argv) > 3 else "config.properties"
-    profile_file = sys.argv[4] if len(sys.argv) > 4 else "profile.json"
+    configure_logging()
+    parser = argparse.ArgumentParser(
+        description="Stream orders with multiple parallel Snowpipe Streaming instances",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python parallel_streaming_orchestrator.py 1000000 5\n"
+            "  python parallel_streaming_orchestrator.py 100000 5 config_staging.properties profile_staging.json\n"
+            "  python parallel_streaming_orchestrator.py 0 4 config_default.properties --rate 2000 --duration 3600\n"
+            "  python parallel_streaming_orchestrator.py 5000000 8 config_default.properties --customers"
+        ),
+    )
+    parser.add_argument("total_orders", type=int,
+                        help="Total orders to stream (soak mode: cap on total orders, 0 = no cap)")
+    parser.add_argument("num_instances", type=int, help="Number of parallel instances")
+    parser.add_argument("config_file", nargs="?", default="config.properties")
+    parser.add_argument("profile_file", nargs="?", default="profile.json")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Soak mode: total target orders/sec, split evenly across instances")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Soak mode: run time in seconds (default: soak.duration.seconds, 0 = until Ctrl+C)")
+    parser.add_argument("--customers", action="store_true",
+                        help="Stream total_orders new customers instead of orders")
+    args = parser.parse_args()
+    if args.duration is not None and args.rate is None:
+        parser.error("--duration only applies to soak mode; add --rate")
     
-    ParallelStreamingOrchestrator.main(total_orders, num_instances, config_file, profile_file)
+    ParallelStreamingOrchestrator.main(
+        args.total_orders, args.num_instances, args.config_file, args.profile_file,
+        rate=args.rate, duration=args.duration, customers=args.customers,
+    )
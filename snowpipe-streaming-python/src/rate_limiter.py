@@ -0,0 +1,349 @@
+"""
+Rate limiting for long-running (soak test) streaming.
+
+TokenBucket paces order generation to a target orders/sec. LoadShape turns a
+base rate into a time-varying target (ramp-up, diurnal wave, burst spikes) so
+the Dynamic Table and Interactive Table pipeline sees realistic continuous load
+instead of a single fixed-count burst.
+"""
+import logging
+import math
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Slack for floating-point refill arithmetic so a wait never ends a hair short
+_TOKEN_EPSILON = 1e-9
+
+# Properties a running SteadyStateRunner picks up on config reload
+RUNNER_CONFIG_KEYS = {
+    "rate.orders.per.second",
+    "rate.ramp.up.seconds",
+    "rate.diurnal.amplitude",
+    "rate.diurnal.period.seconds",
+    "rate.burst.multiplier",
+    "rate.burst.interval.seconds",
+    "rate.burst.duration.seconds",
+    "orders.batch.size",
+    "generation.interval.ms",
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Tokens refill continuously at `rate` per second."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if capacity <= 0:
+            raise ValueError("Token bucket capacity must be positive")
+        self.capacity = float(capacity)
+        self._rate = max(float(rate), 0.0)
+        self._clock = clock
+        self._sleep = sleep
+        # Start empty so a soak run does not open with a capacity-sized burst
+        self._tokens = 0.0
+        self._last_refill = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = max(float(rate), 0.0)
+
+    def set_capacity(self, capacity: float) -> None:
+        if capacity <= 0:
+            raise ValueError("Token bucket capacity must be positive")
+        with self._lock:
+            self._refill()
+            self.capacity = float(capacity)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self._rate)
+        self._last_refill = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """
+        Block until `tokens` are available and consume them.
+
+        Requests larger than the bucket capacity are served in capacity-sized
+        chunks. Returns the total time spent waiting, in seconds. Raises
+        TimeoutError if `max_wait` elapses first (nothing is consumed for the
+        chunk that timed out).
+        """
+        waited = 0.0
+        remaining = float(tokens)
+        while remaining > 0:
+            chunk = min(remaining, self.capacity)
+            while True:
+                with self._lock:
+                    self._refill()
+                    if self._tokens + _TOKEN_EPSILON >= chunk:
+                        self._tokens = max(self._tokens - chunk, 0.0)
+                        break
+                    deficit = chunk - self._tokens
+                    rate = self._rate
+                # A zero rate means "paused": poll until the rate changes
+                delay = deficit / rate if rate > 0 else 0.5
+                if max_wait is not None and waited + delay > max_wait:
+                    raise TimeoutError(
+                        f"Token bucket could not supply {chunk:.0f} tokens within {max_wait:.1f}s"
+                    )
+                self._sleep(delay)
+                waited += delay
+            remaining -= chunk
+        return waited
+
+
+class LoadShape:
+    """
+    Target orders/sec as a function of elapsed seconds.
+
+    rate(t) = base_rate * ramp(t) * diurnal(t) * burst(t)
+      ramp:    linear 0 -> 1 over ramp_up_seconds
+      diurnal: 1 + amplitude * sin(2*pi*t / period), peaking a quarter period in
+      burst:   burst_multiplier for burst_duration_seconds every burst_interval_seconds
+    """
+
+    def __init__(
+        self,
+        base_rate: float,
+        ramp_up_seconds: float = 0.0,
+        diurnal_amplitude: float = 0.0,
+        diurnal_period_seconds: float = 86400.0,
+        burst_multiplier: float = 1.0,
+        burst_interval_seconds: float = 0.0,
+        burst_duration_seconds: float = 0.0,
+    ):
+        if base_rate <= 0:
+            raise ValueError("Base rate must be positive")
+        if not 0.0 <= diurnal_amplitude <= 1.0:
+            raise ValueError("Diurnal amplitude must be between 0 and 1")
+        if burst_multiplier < 1.0:
+            raise ValueError("Burst multiplier must be >= 1")
+        self.base_rate = float(base_rate)
+        self.ramp_up_seconds = max(float(ramp_up_seconds), 0.0)
+        self.diurnal_amplitude = float(diurnal_amplitude)
+        self.diurnal_period_seconds = float(diurnal_period_seconds)
+        self.burst_multiplier = float(burst_multiplier)
+        self.burst_interval_seconds = max(float(burst_interval_seconds), 0.0)
+        self.burst_duration_seconds = max(float(burst_duration_seconds), 0.0)
+
+    @classmethod
+    def from_config(cls, config: ConfigManager, base_rate: Optional[float] = None) -> "LoadShape":
+        if base_rate is None:
+            base_rate = config.get_float_property("rate.orders.per.second", 100.0)
+        return cls(
+            base_rate=base_rate,
+            ramp_up_seconds=config.get_float_property("rate.ramp.up.seconds", 0.0),
+            diurnal_amplitude=config.get_float_property("rate.diurnal.amplitude", 0.0),
+            diurnal_period_seconds=config.get_float_property("rate.diurnal.period.seconds", 86400.0),
+            burst_multiplier=config.get_float_property("rate.burst.multiplier", 1.0),
+            burst_interval_seconds=config.get_float_property("rate.burst.interval.seconds", 0.0),
+            burst_duration_seconds=config.get_float_property("rate.burst.duration.seconds", 0.0),
+        )
+
+    def in_burst(self, elapsed: float) -> bool:
+        if self.burst_interval_seconds <= 0 or self.burst_duration_seconds <= 0:
+            return False
+        if elapsed < self.burst_interval_seconds:
+            return False
+        return (elapsed % self.burst_interval_seconds) < self.burst_duration_seconds
+
+    def rate_at(self, elapsed: float) -> float:
+        rate = self.base_rate
+        if self.ramp_up_seconds > 0 and elapsed < self.ramp_up_seconds:
+            rate *= max(elapsed, 0.0) / self.ramp_up_seconds
+        if self.diurnal_amplitude > 0 and self.diurnal_period_seconds > 0:
+            phase = 2 * math.pi * elapsed / self.diurnal_period_seconds
+            rate *= 1 + self.diurnal_amplitude * math.sin(phase)
+        if self.in_burst(elapsed):
+            rate *= self.burst_multiplier
+        return rate
+
+    def scaled(self, factor: float) -> "LoadShape":
+        """Same shape at `factor` times the base rate (used to split load across instances)."""
+        return LoadShape(
+            base_rate=self.base_rate * factor,
+            ramp_up_seconds=self.ramp_up_seconds,
+            diurnal_amplitude=self.diurnal_amplitude,
+            diurnal_period_seconds=self.diurnal_period_seconds,
+            burst_multiplier=self.burst_multiplier,
+            burst_interval_seconds=self.burst_interval_seconds,
+            burst_duration_seconds=self.burst_duration_seconds,
+        )
+
+
+class SteadyStateRunner:
+    """
+    Drives a batch-streaming callback at the rate given by a LoadShape.
+
+    Every tick (generation.interval.ms) the runner sizes a batch to the current
+    target rate, waits for that many tokens and hands the batch size to
+    `stream_batch`, which generates and streams that many orders.
+    """
+
+    def __init__(
+        self,
+        shape: LoadShape,
+        stream_batch: Callable[[int], Any],
+        max_batch_size: int,
+        tick_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        name: str = "soak",
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("Max batch size must be positive")
+        self.shape = shape
+        self.stream_batch = stream_batch
+        self.max_batch_size = max_batch_size
+        self.tick_seconds = max(tick_seconds, 0.001)
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        self.bucket = TokenBucket(shape.rate_at(0), capacity=max_batch_size, clock=clock, sleep=sleep)
+
+    def reconfigure(self, config: ConfigManager, changed: Set[str], rate_share: float = 1.0) -> None:
+        """
+        Apply reloaded settings without restarting the run. A new
+        rate.orders.per.second replaces the target (times `rate_share`, this
+        runner's fraction of the total); other rate.* keys reshape the current
+        target.
+        """
+        base_rate = self.shape.base_rate
+        if "rate.orders.per.second" in changed:
+            base_rate = config.get_float_property("rate.orders.per.second", base_rate) * rate_share
+        try:
+            shape = LoadShape.from_config(config, base_rate)
+        except ValueError as e:
+            logger.error(f"[{self.name}] Ignoring reloaded rate settings: {e}")
+        else:
+            self.shape = shape
+        max_batch_size = config.get_int_property("orders.batch.size", self.max_batch_size)
+        if max_batch_size != self.max_batch_size:
+            self.bucket.set_capacity(max_batch_size)
+            self.max_batch_size = max_batch_size
+        self.tick_seconds = max(
+            config.get_int_property("generation.interval.ms", int(self.tick_seconds * 1000)) / 1000.0,
+            0.001,
+        )
+        logger.info(
+            f"[{self.name}] Reconfigured: {self.shape.base_rate:.1f} orders/sec base, "
+            f"max batch {self.max_batch_size}, tick {self.tick_seconds:.2f}s"
+        )
+
+    def _batch_size_for(self, rate: float) -> int:
+        return max(1, min(self.max_batch_size, int(round(rate * self.tick_seconds))))
+
+    def run(
+        self,
+        duration_seconds: Optional[float],
+        max_orders: Optional[int] = None,
+        stop_event: Optional[threading.Event] = None,
+        report_interval_seconds: float = 60.0,
+    ) -> Dict[str, Any]:
+        """
+        Stream until duration_seconds elapse, max_orders are sent or stop_event
+        is set (whichever comes first). duration_seconds=None runs until stopped.
+        """
+        logger.info(
+            f"[{self.name}] Steady-state streaming at {self.shape.base_rate:.1f} orders/sec "
+            f"(duration: {'unbounded' if duration_seconds is None else f'{duration_seconds:.0f}s'}, "
+            f"tick: {self.tick_seconds:.2f}s)"
+        )
+        start = self._clock()
+        last_report = start
+        orders_streamed = 0
+        batches = 0
+        throttled_seconds = 0.0
+
+        while True:
+            elapsed = self._clock() - start
+            if duration_seconds is not None and elapsed >= duration_seconds:
+                break
+            if max_orders is not None and orders_streamed >= max_orders:
+                break
+            if stop_event is not None and stop_event.is_set():
+                logger.info(f"[{self.name}] Stop requested")
+                break
+
+            target_rate = self.shape.rate_at(elapsed)
+            self.bucket.set_rate(target_rate)
+            if target_rate <= 0:
+                # Ramp starts at zero: idle one tick rather than waiting forever
+                self._sleep(self.tick_seconds)
+                continue
+
+            batch_size = self._batch_size_for(target_rate)
+            if max_orders is not None:
+                batch_size = min(batch_size, max_orders - orders_streamed)
+            throttled_seconds += self.bucket.acquire(batch_size)
+
+            self.stream_batch(batch_size)
+            orders_streamed += batch_size
+            batches += 1
+
+            now = self._clock()
+            if now - last_report >= report_interval_seconds:
+                achieved = orders_streamed / (now - start) if now > start else 0.0
+                logger.info(
+                    f"[{self.name}] {orders_streamed:,} orders in {now - start:.0f}s | "
+                    f"target {target_rate:.1f}/s | achieved {achieved:.1f}/s"
+                    f"{' | BURST' if self.shape.in_burst(now - start) else ''}"
+                )
+                last_report = now
+
+        duration = self._clock() - start
+        stats = {
+            "orders_streamed": orders_streamed,
+            "batches": batches,
+            "duration_seconds": duration,
+            "target_rate": self.shape.base_rate,
+            "achieved_rate": orders_streamed / duration if duration > 0 else 0.0,
+            "throttled_seconds": throttled_seconds,
+        }
+        logger.info(
+            f"[{self.name}] Steady-state run finished: {orders_streamed:,} orders in "
+            f"{duration:.1f}s ({stats['achieved_rate']:.1f} orders/sec achieved, "
+            f"{self.shape.base_rate:.1f} target)"
+        )
+        return stats
+
+
+def install_stop_handlers(stop_event: threading.Event) -> None:
+    """Let Ctrl+C / SIGTERM end a soak run cleanly (flush and reconcile) instead of aborting."""
+    def _handler(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after the current batch...")
+        stop_event.set()
+
+    if threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGINT, _handler)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _handler)
@@ -2,7 +2,7 @@ import logging
 from typing import List, Dict, Any, Optional
 from snowflake.ingest.streaming import StreamingIngestClient, StreamingIngestChannel
 from snowflake.ingest.streaming.streaming_ingest_error import StreamingIngestError
-from models import Order, OrderItem
+from models import Customer, Order, OrderItem
 from config_manager import ConfigManager
 import snowflake.connector
 from cryptography.hazmat.primitives import serialization
@@ -19,8 +19,13 @@ class SnowpipeStreamingManager:
         self.instance_id = instance_id
         self._last_orders_offset: str | None = None
         self._last_order_items_offset: str | None = None
+        self._last_customers_offset: str | None = None
+        # Customers are streamed only in customer mode; opened on first use
+        self.customers_client = None
+        self.customers_channel = None
         
         channel_suffix = f"_instance_{instance_id}" if instance_id >= 0 else ""
+        self._channel_suffix = channel_suffix
         logger.info(
             f"Creating Snowflake Streaming clients and opening channels"
             f"{' for instance ' + str(instance_id) if instance_id >= 0 else '...'}"
@@ -95,7 +100,7 @@ class SnowpipeStreamingManager:
             "private_key": private_key_obj,
         }
         
-        max_id = 1
+        max_id = 0
         try:
             conn = snowflake.connector.connect(**conn_params)
             cursor = conn.cursor()
@@ -132,6 +137,45 @@ class SnowpipeStreamingManager:
             logger.warning(f"Error getting customer segment: {e}, defaulting to Standard")
             return "Standard"
 
+    def _get_customers_channel(self) -> StreamingIngestChannel:
+        if self.customers_channel is None:
+            pipe_name = self.config.get_property("pipe.customers.name")
+            channel_name = self.config.get_property("channel.customers.name")
+            if not pipe_name or not channel_name:
+                raise ValueError(
+                    "pipe.customers.name and channel.customers.name must be configured "
+                    "to stream customers"
+                )
+            self.customers_client = StreamingIngestClient(
+                client_name=f"CUSTOMERS_CLIENT_{self.instance_id}",
+                db_name=self.config.get_database(),
+                schema_name=self.config.get_schema(),
+                pipe_name=pipe_name,
+                properties=self.properties,
+            )
+            self.customers_channel = self._open_channel(
+                self.customers_client, channel_name + self._channel_suffix
+            )
+        return self.customers_channel
+
+    def insert_customers(self, customers: List[Customer]) -> None:
+        if not customers:
+            return
+        
+        channel = self._get_customers_channel()
+        start_offset = f"customer_{customers[0].customer_id}"
+        end_offset = f"customer_{customers[-1].customer_id}"
+        
+        rows = [customer.to_dict() for customer in customers]
+        
+        self._insert_with_backpressure_retry(
+            channel, rows, start_offset, end_offset, "customers"
+        )
+        self._last_customers_offset = end_offset
+        logger.debug(
+            f"Inserted {len(customers)} customers (offset range: {start_offset} to {end_offset})"
+        )
+
     def insert_order(self, order: Order) -> None:
         row = order.to_dict()
         offset_token = f"order_{order.order_id}"
@@ -139,12 +183,16 @@ class SnowpipeStreamingManager:
         self.orders_channel.append_row(row, offset_token)
         logger.debug(f"Order {order.order_id} inserted with offset {offset_token}")
 
-    def insert_orders(self, orders: List[Order]) -> None:
+    def insert_orders(self, orders: List[Order], batch_seq: Optional[int] = None) -> None:
         if not orders:
             return
         
-        start_offset = f"order_{orders[0].order_id}"
-        end_offset = f"order_{orders[-1].order_id}"
+        if batch_seq is not None:
+            # Paired batches use one monotonic token per batch on both channels
+            start_offset = end_offset = f"order_{batch_seq}"
+        else:
+            start_offset = f"order_{orders[0].order_id}"
+            end_offset = f"order_{orders[-1].order_id}"
         
         rows = [order.to_dict() for order in orders]
         
@@ -156,12 +204,16 @@ class SnowpipeStreamingManager:
             f"Inserted {len(orders)} orders (offset range: {start_offset} to {end_offset})"
         )
 
-    def insert_order_items(self, items: List[OrderItem]) -> None:
+    def insert_order_items(self, items: List[OrderItem], batch_seq: Optional[int] = None) -> None:
         if not items:
             return
         
-        start_offset = f"item_{items[0].order_item_id}"
-        end_offset = f"item_{items[-1].order_item_id}"
+        if batch_seq is not None:
+            # Paired batches use one monotonic token per batch on both channels
+            start_offset = end_offset = f"item_{batch_seq}"
+        else:
+            start_offset = f"item_{items[0].order_item_id}"
+            end_offset = f"item_{items[-1].order_item_id}"
         
         rows = [item.to_dict() for item in items]
         
@@ -244,9 +296,12 @@ class SnowpipeStreamingManager:
     def get_latest_order_item_offset(self) -> Optional[str]:
         return self.order_items_channel.get_latest_committed_offset_token()
 
+    def get_latest_customer_offset(self) -> Optional[str]:
+        return self._get_customers_channel().get_latest_committed_offset_token()
+
     def wait_for_flush(self, timeout_seconds: int = 120, poll_interval: float = 2.0) -> bool:
         """
-        Wait until both channels have committed all in-flight data.
+        Wait until every channel we wrote to has committed all in-flight data.
         Polls each channel's latest committed offset token until it matches
         the last offset we sent, confirming Snowflake has received everything.
 
@@ -265,6 +320,11 @@ class SnowpipeStreamingManager:
                 ("order_items", self.order_items_channel, self._last_order_items_offset)
             )
 
+        if self._last_customers_offset:
+            channels_to_check.append(
+                ("customers", self.customers_channel, self._last_customers_offset)
+            )
+
         if not channels_to_check:
             logger.info("No data was sent — nothing to flush")
             return True
@@ -310,12 +370,16 @@ class SnowpipeStreamingManager:
                 self.orders_channel.close()
             if hasattr(self, "order_items_channel"):
                 self.order_items_channel.close()
+            if getattr(self, "customers_channel", None) is not None:
+                self.customers_channel.close()
             
             logger.info("Closing clients...")
             if hasattr(self, "orders_client"):
                 self.orders_client.close()
             if hasattr(self, "order_items_client"):
                 self.order_items_client.close()
+            if getattr(self, "customers_client", None) is not None:
+                self.customers_client.close()
             
             logger.info("Snowpipe Streaming manager closed successfully")
         except Exception as e:
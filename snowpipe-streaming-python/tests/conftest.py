@@ -0,0 +1,60 @@
+"""
+Shared test setup: stub the snowflake.ingest.*, snowflake.connector and
+cryptography module trees so src/ imports resolve without the SDK installed.
+
+pytest loads this before collecting any test module, so every module sees the
+same stubs (and the same StreamingIngestError class) whatever the order.
+"""
+
+import sys
+import types
+from unittest.mock import MagicMock
+
+# ---------------------------------------------------------------------------
+# snowflake.ingest.streaming
+# ---------------------------------------------------------------------------
+_snowflake = types.ModuleType("snowflake")
+_snowflake.__path__ = []
+_ingest = types.ModuleType("snowflake.ingest")
+_ingest.__path__ = []
+_streaming = types.ModuleType("snowflake.ingest.streaming")
+_streaming.__path__ = []
+_error_mod = types.ModuleType("snowflake.ingest.streaming.streaming_ingest_error")
+
+
+class StreamingIngestError(Exception):
+    """Stub matching the real SDK exception."""
+    pass
+
+
+_error_mod.StreamingIngestError = StreamingIngestError
+_streaming.StreamingIngestClient = MagicMock
+_streaming.StreamingIngestChannel = MagicMock
+_streaming.streaming_ingest_error = _error_mod
+
+for mod_name, mod_obj in [
+    ("snowflake", _snowflake),
+    ("snowflake.ingest", _ingest),
+    ("snowflake.ingest.streaming", _streaming),
+    ("snowflake.ingest.streaming.streaming_ingest_error", _error_mod),
+]:
+    sys.modules.setdefault(mod_name, mod_obj)
+
+# ---------------------------------------------------------------------------
+# snowflake.connector and cryptography (used by snowpipe_streaming_manager)
+# ---------------------------------------------------------------------------
+_connector = types.ModuleType("snowflake.connector")
+_connector.connect = MagicMock()
+sys.modules.setdefault("snowflake.connector", _connector)
+
+for name in [
+    "cryptography", "cryptography.hazmat", "cryptography.hazmat.primitives",
+    "cryptography.hazmat.primitives.serialization", "cryptography.hazmat.backends",
+]:
+    sys.modules.setdefault(name, types.ModuleType(name))
+if not hasattr(sys.modules["cryptography.hazmat.backends"], "default_backend"):
+    sys.modules["cryptography.hazmat.backends"].default_backend = MagicMock()
+if not hasattr(sys.modules["cryptography.hazmat.primitives"], "serialization"):
+    sys.modules["cryptography.hazmat.primitives"].serialization = sys.modules[
+        "cryptography.hazmat.primitives.serialization"
+    ]
@@ -1,67 +1,28 @@
 """
 Tests for exponential backoff + jitter in both retry layers:
   - Inner: SnowpipeStreamingManager._insert_with_backpressure_retry
-  - Outer: AutomatedIntelligenceStreaming.generate_and_stream_orders
+  - Outer: AutomatedIntelligenceStreaming.generate_and_stream_orders (and the
+    parallel orchestrator's PartitionedStreamingApp, which inherits it)
+  - How the parallel orchestrator splits an order cap across instances
 
-Runs without the snowflake-ingest SDK installed by stubbing the module tree.
+Runs without the snowflake-ingest SDK installed (conftest.py stubs the module tree).
 """
 
 import sys
 import os
-import types
 import unittest
 from unittest.mock import MagicMock, patch
 
-# ---------------------------------------------------------------------------
-# Stub the snowflake.ingest.* module tree so src/ imports resolve without the SDK
-# ---------------------------------------------------------------------------
-_snowflake = types.ModuleType("snowflake")
-_snowflake.__path__ = []
-_ingest = types.ModuleType("snowflake.ingest")
-_ingest.__path__ = []
-_streaming = types.ModuleType("snowflake.ingest.streaming")
-_streaming.__path__ = []
-_error_mod = types.ModuleType("snowflake.ingest.streaming.streaming_ingest_error")
-
-
-class StreamingIngestError(Exception):
-    """Stub matching the real SDK exception."""
-    pass
-
-
-_error_mod.StreamingIngestError = StreamingIngestError
-_streaming.StreamingIngestClient = MagicMock
-_streaming.StreamingIngestChannel = MagicMock
-_streaming.streaming_ingest_error = _error_mod
-
-for mod_name, mod_obj in [
-    ("snowflake", _snowflake),
-    ("snowflake.ingest", _ingest),
-    ("snowflake.ingest.streaming", _streaming),
-    ("snowflake.ingest.streaming.streaming_ingest_error", _error_mod),
-]:
-    sys.modules.setdefault(mod_name, mod_obj)
-
-# Stub snowflake.connector (used by snowpipe_streaming_manager)
-_connector = types.ModuleType("snowflake.connector")
-_connector.connect = MagicMock()
-sys.modules.setdefault("snowflake.connector", _connector)
-
-# Stub cryptography modules (used by snowpipe_streaming_manager)
-for name in [
-    "cryptography", "cryptography.hazmat", "cryptography.hazmat.primitives",
-    "cryptography.hazmat.primitives.serialization", "cryptography.hazmat.backends",
-]:
-    sys.modules.setdefault(name, types.ModuleType(name))
-
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 # ---------------------------------------------------------------------------
 # Now safe to import the source modules
 # ---------------------------------------------------------------------------
+from snowflake.ingest.streaming.streaming_ingest_error import StreamingIngestError
 from snowpipe_streaming_manager import SnowpipeStreamingManager
-from automated_intelligence_streaming import AutomatedIntelligenceStreaming
+from automated_intelligence_streaming import AutomatedIntelligenceStreaming, parse_args
+from parallel_streaming_orchestrator import ParallelStreamingOrchestrator, PartitionedStreamingApp
 
 
 class TestInnerBackpressureRetry(unittest.TestCase):
@@ -199,7 +160,9 @@ class TestOuterRetry(unittest.TestCase):
     def _make_app(self):
         """Create an AutomatedIntelligenceStreaming with mocked dependencies."""
         mock_config = MagicMock()
-        mock_config.get_int_property.return_value = 100
+        mock_config.get_int_property.side_effect = (
+            lambda key, default=None: 100 if key == "orders.batch.size" else default
+        )
 
         mock_manager = MagicMock()
         mock_manager.get_max_customer_id.return_value = 1000
@@ -277,5 +240,50 @@ class TestOuterRetry(unittest.TestCase):
             self.assertLessEqual(s, 16 + 16 * 0.25)
 
 
+class TestParseArgs(unittest.TestCase):
+
+    def test_duration_requires_rate(self):
+        with patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--duration", "60"])
+        self.assertEqual(parse_args(["--rate", "50", "--duration", "60"]).duration, 60)
+
+
+class TestPartitionedOuterRetry(TestOuterRetry):
+    """The orchestrator's per-instance app retries exactly like the main app."""
+
+    def _make_app(self):
+        app, mock_manager = super()._make_app()
+        app = PartitionedStreamingApp(app.config, mock_manager, 11, 20, instance_id=3)
+        return app, mock_manager
+
+    def test_orders_use_instance_customer_range(self):
+        app, mock_manager = self._make_app()
+
+        app.generate_and_stream_orders(50)
+
+        customer_ids = {
+            order.customer_id
+            for c in mock_manager.insert_orders.call_args_list
+            for order in c.args[0]
+        }
+        self.assertTrue(customer_ids)
+        self.assertTrue(all(11 <= customer_id <= 20 for customer_id in customer_ids))
+        mock_manager.get_max_customer_id.assert_not_called()
+
+
+class TestSplitOrders(unittest.TestCase):
+
+    def test_last_instance_takes_remainder(self):
+        self.assertEqual(ParallelStreamingOrchestrator._split_orders(10, 3), {0: 3, 1: 3, 2: 4})
+
+    def test_instances_with_no_orders_are_left_out(self):
+        # A cap below the instance count must not start uncapped instances
+        self.assertEqual(ParallelStreamingOrchestrator._split_orders(3, 5), {4: 3})
+        self.assertEqual(ParallelStreamingOrchestrator._split_orders(0, 4), {})
+
+    def test_uncapped_soak_starts_every_instance(self):
+        self.assertEqual(ParallelStreamingOrchestrator._split_orders(0, 3, capped=False), {0: 0, 1: 0, 2: 0})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,151 @@
+"""
+Tests for config_manager.py: typed/cached getters, validation, reload with
+change notifications, and subscribers in the rate limiter and micro-batcher.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from config_manager import ConfigManager
+from micro_batcher import OrderMicroBatcher
+from rate_limiter import LoadShape, SteadyStateRunner
+
+BASE_PROPERTIES = """
+pipe.orders.name=ORDERS_PIPE
+pipe.order_items.name=ORDER_ITEMS_PIPE
+channel.orders.name=ORDERS_CHANNEL
+channel.order_items.name=ORDER_ITEMS_CHANNEL
+orders.batch.size=1000
+batch.timeout.ms=5000
+max.retries=3
+rate.orders.per.second=100
+reconciliation.always=false
+"""
+
+PROFILE = {
+    "user": "u", "account": "a", "url": "https://a", "private_key": "k",
+    "database": "D", "schema": "S", "warehouse": "W",
+}
+
+
+class TestConfigManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.properties_path = os.path.join(self.tmpdir.name, "config.properties")
+        self.profile_path = os.path.join(self.tmpdir.name, "profile.json")
+        self._write_properties(BASE_PROPERTIES)
+        with open(self.profile_path, "w") as f:
+            json.dump(PROFILE, f)
+        self.config = ConfigManager(self.properties_path, self.profile_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_properties(self, text):
+        with open(self.properties_path, "w") as f:
+            f.write(text)
+
+    def _update(self, **values):
+        text = BASE_PROPERTIES
+        for key, value in values.items():
+            key = key.replace("_", ".")
+            lines = [l for l in text.splitlines() if not l.startswith(f"{key}=")]
+            text = "\n".join(lines + [f"{key}={value}"]) + "\n"
+        self._write_properties(text)
+
+    def test_typed_getters(self):
+        self.assertEqual(self.config.get_int_property("orders.batch.size"), 1000)
+        self.assertEqual(self.config.get_float_property("rate.orders.per.second"), 100.0)
+        self.assertFalse(self.config.get_bool_property("reconciliation.always", True))
+        self.assertEqual(self.config.get_int_property("missing.key", 7), 7)
+
+    def test_typed_values_cached(self):
+        self.config.get_int_property("orders.batch.size")
+        self.config.properties["orders.batch.size"] = "5"
+        self.assertEqual(self.config.get_int_property("orders.batch.size"), 1000)
+
+    def test_invalid_value_rejected_at_startup(self):
+        self._update(orders_batch_size=0)
+        with self.assertRaises(ValueError):
+            ConfigManager(self.properties_path, self.profile_path)
+
+    def test_diurnal_amplitude_must_be_at_most_one(self):
+        self.config.properties["rate.diurnal.amplitude"] = "1.5"
+        with self.assertRaisesRegex(ValueError, "rate.diurnal.amplitude=1.5 must be <= 1.0"):
+            self.config._validate_typed_properties(self.config.properties)
+        self.config.properties["rate.diurnal.amplitude"] = "1.0"
+        self.config._validate_typed_properties(self.config.properties)
+
+    def test_customers_batch_size_must_be_positive(self):
+        self.config.properties["customers.batch.size"] = "0"
+        with self.assertRaisesRegex(ValueError, "customers.batch.size=0 must be >= 1"):
+            self.config._validate_typed_properties(self.config.properties)
+
+    def test_unparseable_value_names_key(self):
+        self.config.properties["custom.int"] = "abc"
+        with self.assertRaisesRegex(ValueError, "custom.int"):
+            self.config.get_int_property("custom.int")
+
+    def test_reload_notifies_matching_subscribers(self):
+        calls = []
+        self.config.subscribe(lambda changed: calls.append(("batch", changed)), keys=["orders.batch.size"])
+        self.config.subscribe(lambda changed: calls.append(("retry", changed)), keys=["max.retries"])
+
+        self._update(orders_batch_size=2000)
+        changed = self.config.reload()
+
+        self.assertEqual(changed, {"orders.batch.size"})
+        self.assertEqual(calls, [("batch", {"orders.batch.size"})])
+        self.assertEqual(self.config.get_int_property("orders.batch.size"), 2000)
+
+    def test_invalid_reload_keeps_previous_values(self):
+        calls = []
+        self.config.subscribe(calls.append)
+        self._update(max_retries="lots")
+
+        self.assertEqual(self.config.reload(), set())
+        self.assertEqual(self.config.get_int_property("max.retries"), 3)
+        self.assertEqual(calls, [])
+
+    def test_check_for_changes_uses_mtime(self):
+        self.assertEqual(self.config.check_for_changes(), set())
+        self._update(batch_timeout_ms=100)
+        mtime = os.path.getmtime(self.properties_path)
+        os.utime(self.properties_path, (mtime + 5, mtime + 5))
+        self.assertEqual(self.config.check_for_changes(), {"batch.timeout.ms"})
+
+    def test_unsubscribe(self):
+        calls = []
+        self.config.subscribe(calls.append)
+        self.config.unsubscribe(calls.append)
+        self._update(max_retries=5)
+        self.config.reload()
+        self.assertEqual(calls, [])
+
+    def test_runner_and_batcher_reconfigure_on_reload(self):
+        runner = SteadyStateRunner(
+            LoadShape(50.0), lambda n: None, max_batch_size=1000, tick_seconds=1.0,
+        )
+        batcher = OrderMicroBatcher.from_config(self.config, lambda o, i: None, start_timer=False)
+        self.config.subscribe(lambda changed: runner.reconfigure(self.config, changed, 0.5))
+        self.config.subscribe(lambda changed: batcher.reconfigure(self.config, changed))
+
+        self._update(rate_orders_per_second=400, orders_batch_size=250, batch_timeout_ms=200)
+        self.config.reload()
+
+        self.assertEqual(runner.shape.base_rate, 200.0)
+        self.assertEqual(runner.max_batch_size, 250)
+        self.assertEqual(runner.bucket.capacity, 250)
+        self.assertEqual(batcher.max_rows, 250)
+        self.assertEqual(batcher.timeout_ms, 200)
+        batcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for customer streaming: IdRangeAllocator reservations and
+CustomerStreamer batching with unique IDs across parallel streamers.
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from customer_streamer import CustomerStreamer
+from id_tracker import IdRangeAllocator
+
+
+class TestIdRangeAllocator(unittest.TestCase):
+
+    def test_ranges_are_contiguous(self):
+        allocator = IdRangeAllocator(100)
+        self.assertEqual(allocator.reserve(10), (101, 110))
+        self.assertEqual(allocator.reserve(1), (111, 111))
+        self.assertEqual(allocator.last_used_id, 111)
+
+    def test_rejects_empty_reservation(self):
+        with self.assertRaises(ValueError):
+            IdRangeAllocator(0).reserve(0)
+
+    def test_concurrent_reservations_never_overlap(self):
+        allocator = IdRangeAllocator(0)
+        ranges = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(200):
+                reserved = allocator.reserve(7)
+                with lock:
+                    ranges.append(reserved)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ids = [i for first, last in ranges for i in range(first, last + 1)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(max(ids), 8 * 200 * 7)
+
+
+class TestCustomerStreamer(unittest.TestCase):
+
+    def _make(self, allocator, batch_size=4):
+        config = MagicMock()
+        config.get_int_property.side_effect = lambda key, default=None: (
+            batch_size if key == "customers.batch.size" else default
+        )
+        manager = MagicMock()
+        return CustomerStreamer(config, manager, allocator), manager
+
+    def test_streams_in_batches_with_sequential_ids(self):
+        streamer, manager = self._make(IdRangeAllocator(50))
+
+        self.assertEqual(streamer.stream(10), 10)
+
+        batches = [c.args[0] for c in manager.insert_customers.call_args_list]
+        self.assertEqual([len(b) for b in batches], [4, 4, 2])
+        ids = [c.customer_id for b in batches for c in b]
+        self.assertEqual(ids, list(range(51, 61)))
+
+    def test_parallel_streamers_share_allocator(self):
+        allocator = IdRangeAllocator(0)
+        first, first_manager = self._make(allocator, batch_size=3)
+        second, second_manager = self._make(allocator, batch_size=3)
+
+        first.stream(5)
+        second.stream(5)
+
+        ids = [
+            c.customer_id
+            for manager in (first_manager, second_manager)
+            for call in manager.insert_customers.call_args_list
+            for c in call.args[0]
+        ]
+        self.assertEqual(sorted(ids), list(range(1, 11)))
+
+    def test_allocator_from_database_starts_after_max_id(self):
+        manager = MagicMock()
+        manager.get_max_customer_id.return_value = 0
+        allocator = CustomerStreamer.allocator_from_database(manager)
+        self.assertEqual(allocator.reserve(2), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
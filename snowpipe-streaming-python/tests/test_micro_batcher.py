@@ -0,0 +1,223 @@
+"""
+Tests for micro_batcher.py: flush on row count, byte size or timeout, error
+propagation from the timer thread, opt-in requeue of records across a failed
+flush, and per-flush metrics.
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from micro_batcher import (
+    FLUSH_REASON_BYTES,
+    FLUSH_REASON_MANUAL,
+    FLUSH_REASON_ROWS,
+    FLUSH_REASON_TIMEOUT,
+    MicroBatcher,
+    OrderMicroBatcher,
+)
+from models import Order, OrderItem
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _order(order_id):
+    return Order(order_id, 1, "2026-01-01 00:00:00", "Completed", 100.0, 0.0, 5.0)
+
+
+def _item(item_id, order_id):
+    return OrderItem(item_id, order_id, 1001, "Powder Skis", "Skis", 1, 100.0, 100.0)
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def _batcher(self, flushed, **kwargs):
+        kwargs.setdefault("max_rows", 10)
+        kwargs.setdefault("max_bytes", 0)
+        kwargs.setdefault("timeout_ms", 1000)
+        return MicroBatcher(flushed.append, start_timer=False, **kwargs)
+
+    def test_flush_on_row_count(self):
+        flushed = []
+        batcher = self._batcher(flushed, max_rows=3)
+
+        batcher.add([1, 2])
+        self.assertEqual(flushed, [])
+        batcher.add([3])
+
+        self.assertEqual(flushed, [[1, 2, 3]])
+        self.assertEqual(batcher.flush_history[-1].reason, FLUSH_REASON_ROWS)
+
+    def test_flush_on_bytes(self):
+        flushed = []
+        batcher = self._batcher(flushed, max_bytes=100, size_fn=lambda r: 60)
+
+        batcher.add(["a"])
+        batcher.add(["b"])
+
+        self.assertEqual(flushed, [["a", "b"]])
+        self.assertEqual(batcher.flush_history[-1].reason, FLUSH_REASON_BYTES)
+
+    def test_flush_on_timeout(self):
+        flushed = []
+        clock = FakeClock()
+        batcher = self._batcher(flushed, timeout_ms=500, clock=clock)
+
+        batcher.add([1])
+        self.assertFalse(batcher.poll())
+        clock.now = 0.6
+        self.assertTrue(batcher.poll())
+
+        self.assertEqual(flushed, [[1]])
+        record = batcher.flush_history[-1]
+        self.assertEqual(record.reason, FLUSH_REASON_TIMEOUT)
+        self.assertAlmostEqual(record.oldest_age_ms, 600)
+
+    def test_timer_thread_flushes_trickle(self):
+        flushed = []
+        batcher = MicroBatcher(flushed.append, max_rows=1000, max_bytes=0, timeout_ms=50)
+        try:
+            batcher.add([1])
+            deadline = time.time() + 2
+            while not flushed and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(flushed, [[1]])
+        finally:
+            batcher.close()
+
+    def test_close_flushes_remainder(self):
+        flushed = []
+        batcher = self._batcher(flushed)
+        batcher.add([1, 2])
+
+        batcher.close()
+
+        self.assertEqual(flushed, [[1, 2]])
+        self.assertEqual(batcher.flush_history[-1].reason, FLUSH_REASON_MANUAL)
+        with self.assertRaises(RuntimeError):
+            batcher.add([3])
+
+    def test_background_error_reraised_on_next_add(self):
+        def failing_flush(records):
+            raise ValueError("append failed")
+
+        clock = FakeClock()
+        batcher = MicroBatcher(
+            failing_flush, max_rows=100, max_bytes=0, timeout_ms=10, clock=clock, start_timer=False
+        )
+        batcher.add([1])
+        clock.now = 1.0
+        try:
+            batcher.poll()
+        except ValueError as e:
+            batcher._error = e  # what the timer thread does
+
+        with self.assertRaises(ValueError):
+            batcher.add([2])
+        self.assertEqual(batcher.get_metrics()["failed_flushes"], 1)
+
+    def test_failed_flush_keeps_records_for_retry(self):
+        flushed = []
+        failures = [ValueError("append failed")]
+
+        def flaky_flush(records):
+            if failures:
+                raise failures.pop()
+            flushed.append(records)
+
+        batcher = MicroBatcher(
+            flaky_flush, max_rows=2, max_bytes=0, timeout_ms=1000, start_timer=False, requeue_on=(ValueError,)
+        )
+        with self.assertRaises(ValueError):
+            batcher.add([1, 2])
+        self.assertEqual(batcher.get_metrics()["buffered_rows"], 2)
+
+        batcher.add([3])  # over max_rows again: the kept records go first
+        self.assertEqual(flushed, [[1, 2, 3]])
+        metrics = batcher.get_metrics()
+        self.assertEqual((metrics["failed_flushes"], metrics["rows"], metrics["buffered_rows"]), (1, 3, 0))
+
+    def test_failed_flush_drops_records_unless_requeue_opted_in(self):
+        flushed = []
+        failures = [ConnectionResetError("reset after a partial write")]
+
+        def flaky_flush(records):
+            if failures:
+                raise failures.pop()
+            flushed.append(records)
+
+        batcher = MicroBatcher(
+            flaky_flush, max_rows=2, max_bytes=0, timeout_ms=1000, start_timer=False, requeue_on=(ValueError,)
+        )
+        with self.assertRaises(ConnectionResetError):
+            batcher.add([1, 2])
+
+        batcher.add([3, 4])
+        self.assertEqual(flushed, [[3, 4]])
+        metrics = batcher.get_metrics()
+        self.assertEqual((metrics["dropped_rows"], metrics["buffered_rows"]), (2, 0))
+
+    def test_close_without_flush_leaves_records(self):
+        flushed = []
+        batcher = self._batcher(flushed)
+        batcher.add([1])
+
+        batcher.close(flush=False)
+
+        self.assertEqual(flushed, [])
+
+    def test_metrics(self):
+        flushed = []
+        batcher = self._batcher(flushed, max_rows=2)
+        batcher.add([1, 2, 3, 4])
+        batcher.add([5])
+        batcher.flush()
+
+        metrics = batcher.get_metrics()
+        self.assertEqual(metrics["flushes"], 2)
+        self.assertEqual(metrics["rows"], 5)
+        self.assertEqual(metrics["rows_flushes"], 1)
+        self.assertEqual(metrics["manual_flushes"], 1)
+        self.assertAlmostEqual(metrics["avg_rows_per_flush"], 2.5)
+
+
+class TestOrderMicroBatcher(unittest.TestCase):
+
+    def test_orders_flushed_with_their_items(self):
+        calls = []
+        batcher = OrderMicroBatcher(
+            lambda orders, items: calls.append((orders, items)),
+            max_rows=2, max_bytes=0, timeout_ms=1000, start_timer=False,
+        )
+        orders = [_order("o1"), _order("o2"), _order("o3")]
+        items = [_item("i1", "o1"), _item("i2", "o1"), _item("i3", "o2"), _item("i4", "o3")]
+
+        batcher.add_orders(orders, items)
+        batcher.close()
+
+        self.assertEqual(len(calls), 1)  # 3 orders >= max_rows: one flush of everything
+        flushed_orders, flushed_items = calls[0]
+        self.assertEqual([o.order_id for o in flushed_orders], ["o1", "o2", "o3"])
+        self.assertEqual([i.order_item_id for i in flushed_items], ["i1", "i2", "i3", "i4"])
+
+    def test_byte_estimate_includes_items(self):
+        batcher = OrderMicroBatcher(
+            lambda orders, items: None,
+            max_rows=100, max_bytes=0, timeout_ms=1000, start_timer=False,
+        )
+        with_items = batcher._unit_bytes((_order("o1"), [_item("i1", "o1")]))
+        without_items = batcher._unit_bytes((_order("o1"), []))
+        self.assertGreater(with_items, without_items)
+
+
+if __name__ == "__main__":
+    unittest.main()
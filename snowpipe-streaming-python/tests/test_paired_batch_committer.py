@@ -0,0 +1,217 @@
+"""
+Tests for paired_batch_committer.py: per-batch offset tokens, durability only
+once both channels commit, items-half retry from the local buffer, channel
+ordering, and no resent orders behind an OrderMicroBatcher.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from snowflake.ingest.streaming.streaming_ingest_error import StreamingIngestError
+
+from models import Order, OrderItem
+from micro_batcher import OrderMicroBatcher
+from paired_batch_committer import PairedBatchCommitter, parse_batch_seq
+
+
+class FakeChannels:
+    """Stands in for SnowpipeStreamingManager: records appends, commits on demand."""
+
+    def __init__(self, committed_orders=None, committed_items=None):
+        self.committed_orders = committed_orders
+        self.committed_items = committed_items
+        self.order_appends = []
+        self.item_appends = []
+        self.item_failures = 0
+
+    def append_orders(self, orders, seq):
+        self.order_appends.append(seq)
+
+    def append_items(self, items, seq):
+        if self.item_failures:
+            self.item_failures -= 1
+            raise StreamingIngestError("ReceiverSaturated")
+        self.item_appends.append(seq)
+
+    def commit_all(self):
+        if self.order_appends:
+            self.committed_orders = f"order_{self.order_appends[-1]}"
+        if self.item_appends:
+            self.committed_items = f"item_{self.item_appends[-1]}"
+
+    def get_latest_order_offset(self):
+        return self.committed_orders
+
+    def get_latest_order_item_offset(self):
+        return self.committed_items
+
+
+def _batch(order_id):
+    order = Order(order_id, 1, "2026-01-01 00:00:00", "Completed", 100.0, 0.0, 5.0)
+    item = OrderItem(f"{order_id}-1", order_id, 1001, "Powder Skis", "Skis", 1, 100.0, 100.0)
+    return [order], [item]
+
+
+class TestPairedBatchCommitter(unittest.TestCase):
+
+    def _make(self, channels, **kwargs):
+        kwargs.setdefault("sleep", lambda seconds: None)
+        return PairedBatchCommitter(
+            channels, channels.append_orders, channels.append_items, **kwargs
+        )
+
+    def test_parse_batch_seq(self):
+        self.assertEqual(parse_batch_seq("order_42", "order_"), 42)
+        self.assertEqual(parse_batch_seq(None, "order_"), -1)
+        self.assertEqual(parse_batch_seq("0", "order_"), -1)
+        self.assertEqual(parse_batch_seq("order_abc-uuid", "order_"), -1)
+
+    def test_sequence_resumes_after_committed_offsets(self):
+        channels = FakeChannels("order_7", "item_6")
+        committer = self._make(channels)
+        committer.commit(*_batch("a"))
+        committer.commit(*_batch("b"))
+        self.assertEqual(channels.order_appends, [8, 9])
+        self.assertEqual(channels.item_appends, [8, 9])
+
+    def test_durable_only_when_both_channels_commit(self):
+        channels = FakeChannels()
+        committer = self._make(channels)
+        committer.commit(*_batch("a"))
+
+        channels.committed_orders = "order_0"
+        self.assertEqual(committer.poll_durable(), 0)
+        self.assertEqual(len(committer.pending_batches), 1)
+
+        channels.committed_items = "item_0"
+        self.assertEqual(committer.poll_durable(), 1)
+        self.assertFalse(committer.has_unresolved)
+
+    def test_failed_items_half_retried_from_buffer_in_order(self):
+        channels = FakeChannels()
+        committer = self._make(channels)
+        channels.item_failures = 1
+
+        committer.commit(*_batch("a"))  # items of batch 0 fail and are held
+        self.assertEqual(channels.item_appends, [])
+        committer.commit(*_batch("b"))  # batch 0 items retried before batch 1
+
+        self.assertEqual(channels.order_appends, [0, 1])
+        self.assertEqual(channels.item_appends, [0, 1])
+        self.assertEqual(committer.stats["item_half_retries"], 1)
+
+        channels.commit_all()
+        self.assertTrue(committer.wait_for_durable(timeout_seconds=0))
+
+    def test_later_items_held_behind_failed_batch(self):
+        channels = FakeChannels()
+        committer = self._make(channels)
+        committer.commit(*_batch("a"))
+        channels.item_failures = 2
+        committer.commit(*_batch("b"))
+        committer.commit(*_batch("c"))
+
+        # Batch 2's items must not overtake batch 1's, or item_2 would "cover" batch 1
+        self.assertEqual(channels.item_appends, [0])
+        channels.commit_all()
+        committer.poll_durable()
+        self.assertEqual([b.seq for b in committer.pending_batches], [1, 2])
+
+    def test_items_half_gives_up_after_max_retries(self):
+        channels = FakeChannels()
+        committer = self._make(channels, max_half_retries=1)
+        channels.item_failures = 2
+
+        committer.commit(*_batch("a"))
+        committer.commit(*_batch("b"))  # batch 0 gives up; its orders have landed, so no raise
+
+        self.assertEqual([b.seq for b in committer.unresolved], [0])
+        self.assertEqual(channels.item_appends, [1])
+        self.assertTrue(committer.has_unresolved)
+
+    def test_non_sdk_items_failure_held_for_retry(self):
+        channels = FakeChannels()
+        failures = [ConnectionResetError("connection reset by peer")]
+
+        def flaky_items(items, seq):
+            if failures:
+                raise failures.pop()
+            channels.append_items(items, seq)
+
+        committer = PairedBatchCommitter(
+            channels, channels.append_orders, flaky_items, sleep=lambda seconds: None
+        )
+        committer.commit(*_batch("a"))
+
+        self.assertEqual(channels.item_appends, [])
+        self.assertTrue(committer.has_unresolved)
+        batch = committer.pending_batches[0]
+        self.assertEqual(batch.item_failures, 1)
+        self.assertIsInstance(batch.last_item_error, ConnectionResetError)
+
+        committer.commit(*_batch("b"))
+        self.assertEqual(channels.item_appends, [0, 1])
+        channels.commit_all()
+        self.assertTrue(committer.wait_for_durable(timeout_seconds=0))
+
+    def test_orders_failure_leaves_nothing_pending(self):
+        channels = FakeChannels()
+
+        def failing_orders(orders, seq):
+            raise StreamingIngestError("ReceiverSaturated")
+
+        committer = PairedBatchCommitter(channels, failing_orders, channels.append_items)
+        with self.assertRaises(StreamingIngestError):
+            committer.commit(*_batch("a"))
+        self.assertEqual(committer.pending_batches, [])
+        self.assertEqual(channels.item_appends, [])
+
+    def test_wait_for_durable_times_out(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        channels = FakeChannels()
+        committer = self._make(channels, clock=lambda: now[0], sleep=sleep, poll_interval=1.0)
+        committer.commit(*_batch("a"))
+
+        self.assertFalse(committer.wait_for_durable(timeout_seconds=3))
+        self.assertTrue(committer.has_unresolved)
+
+
+class TestBatcherWithCommitter(unittest.TestCase):
+
+    def test_items_give_up_does_not_resend_orders(self):
+        channels = FakeChannels()
+        appended_order_ids = []
+
+        def append_orders(orders, seq):
+            appended_order_ids.extend(order.order_id for order in orders)
+            channels.append_orders(orders, seq)
+
+        committer = PairedBatchCommitter(
+            channels, append_orders, channels.append_items, max_half_retries=1, sleep=lambda seconds: None
+        )
+        batcher = OrderMicroBatcher(
+            committer.commit, max_rows=1, max_bytes=0, timeout_ms=0, start_timer=False,
+            requeue_on=(Exception,),  # as the streaming app configures it
+        )
+        channels.item_failures = 4  # batches 0 and 1 each fail twice and give up
+
+        for order_id in ("o1", "o2", "o3"):
+            batcher.add_orders(*_batch(order_id))
+        batcher.close()
+
+        self.assertEqual(appended_order_ids, ["o1", "o2", "o3"])
+        self.assertEqual([b.seq for b in committer.unresolved], [0, 1])
+        self.assertEqual(channels.item_appends, [2])
+        self.assertTrue(committer.has_unresolved)
+        self.assertEqual(batcher.get_metrics()["failed_flushes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Tests for the soak-test rate limiting in rate_limiter.py:
+  - TokenBucket pacing
+  - LoadShape ramp / diurnal / burst shaping
+  - SteadyStateRunner batch sizing and stop conditions
+
+Uses a fake clock so no test actually sleeps.
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rate_limiter import LoadShape, SteadyStateRunner, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock whose sleep() just advances time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_starts_empty_and_waits_for_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=100, clock=clock, sleep=clock.sleep)
+
+        waited = bucket.acquire(20)
+
+        self.assertAlmostEqual(waited, 2.0)
+        self.assertAlmostEqual(clock.now, 2.0)
+
+    def test_refill_capped_at_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+        clock.now = 100.0
+
+        self.assertTrue(bucket.try_acquire(5))
+        self.assertFalse(bucket.try_acquire(1))
+
+    def test_request_larger_than_capacity_served_in_chunks(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+
+        waited = bucket.acquire(35)
+
+        self.assertAlmostEqual(waited, 3.5)
+
+    def test_max_wait_raises_timeout(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=100, clock=clock, sleep=clock.sleep)
+
+        with self.assertRaises(TimeoutError):
+            bucket.acquire(50, max_wait=5)
+
+    def test_set_rate_keeps_accrued_tokens(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=100, clock=clock, sleep=clock.sleep)
+        clock.now = 1.0
+        bucket.set_rate(1000)
+
+        self.assertTrue(bucket.try_acquire(10))
+        self.assertFalse(bucket.try_acquire(1))
+
+
+class TestLoadShape(unittest.TestCase):
+
+    def test_flat_rate(self):
+        shape = LoadShape(base_rate=50)
+        self.assertEqual(shape.rate_at(0), 50)
+        self.assertEqual(shape.rate_at(10_000), 50)
+
+    def test_linear_ramp(self):
+        shape = LoadShape(base_rate=100, ramp_up_seconds=60)
+        self.assertEqual(shape.rate_at(0), 0)
+        self.assertAlmostEqual(shape.rate_at(30), 50)
+        self.assertEqual(shape.rate_at(60), 100)
+
+    def test_diurnal_peak_and_trough(self):
+        shape = LoadShape(base_rate=100, diurnal_amplitude=0.5, diurnal_period_seconds=400)
+        self.assertAlmostEqual(shape.rate_at(100), 150)
+        self.assertAlmostEqual(shape.rate_at(300), 50)
+
+    def test_burst_windows(self):
+        shape = LoadShape(
+            base_rate=10, burst_multiplier=4, burst_interval_seconds=100, burst_duration_seconds=10
+        )
+        self.assertEqual(shape.rate_at(5), 10)  # no burst before the first interval
+        self.assertEqual(shape.rate_at(105), 40)
+        self.assertEqual(shape.rate_at(115), 10)
+        self.assertEqual(shape.rate_at(205), 40)
+
+    def test_scaled_preserves_shape(self):
+        shape = LoadShape(base_rate=100, ramp_up_seconds=10).scaled(0.25)
+        self.assertAlmostEqual(shape.rate_at(5), 12.5)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            LoadShape(base_rate=0)
+        with self.assertRaises(ValueError):
+            LoadShape(base_rate=10, diurnal_amplitude=1.5)
+        with self.assertRaises(ValueError):
+            LoadShape(base_rate=10, burst_multiplier=0.5)
+
+
+class TestSteadyStateRunner(unittest.TestCase):
+
+    def _runner(self, shape, batches, max_batch_size=1000, tick_seconds=1.0):
+        clock = FakeClock()
+        runner = SteadyStateRunner(
+            shape,
+            batches.append,
+            max_batch_size=max_batch_size,
+            tick_seconds=tick_seconds,
+            clock=clock,
+            sleep=clock.sleep,
+        )
+        return runner, clock
+
+    def test_sustains_target_rate(self):
+        batches = []
+        runner, clock = self._runner(LoadShape(base_rate=100), batches)
+
+        stats = runner.run(duration_seconds=10)
+
+        self.assertEqual(set(batches), {100})
+        self.assertEqual(stats["orders_streamed"], sum(batches))
+        self.assertAlmostEqual(stats["achieved_rate"], 100, delta=1)
+
+    def test_batch_size_capped(self):
+        batches = []
+        runner, _ = self._runner(LoadShape(base_rate=5000), batches, max_batch_size=500)
+
+        runner.run(duration_seconds=2)
+
+        self.assertTrue(batches)
+        self.assertLessEqual(max(batches), 500)
+
+    def test_max_orders_stops_run(self):
+        batches = []
+        runner, _ = self._runner(LoadShape(base_rate=100), batches)
+
+        stats = runner.run(duration_seconds=None, max_orders=250)
+
+        self.assertEqual(stats["orders_streamed"], 250)
+        self.assertEqual(batches, [100, 100, 50])
+
+    def test_stop_event(self):
+        stop = threading.Event()
+        batches = []
+
+        def stream_batch(n):
+            batches.append(n)
+            if len(batches) == 3:
+                stop.set()
+
+        clock = FakeClock()
+        runner = SteadyStateRunner(
+            LoadShape(base_rate=10), stream_batch, max_batch_size=100,
+            tick_seconds=1.0, clock=clock, sleep=clock.sleep,
+        )
+        runner.run(duration_seconds=None, stop_event=stop)
+
+        self.assertEqual(len(batches), 3)
+
+    def test_ramp_starts_idle(self):
+        batches = []
+        runner, clock = self._runner(LoadShape(base_rate=100, ramp_up_seconds=10), batches)
+
+        runner.run(duration_seconds=20)
+
+        self.assertEqual(clock.sleeps[0], 1.0)  # rate is 0 at t=0: idle one tick
+        self.assertLess(batches[0], 100)
+        self.assertEqual(batches[-1], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,7 @@ def render_ingestion_dashboard(schema: str, orders_table: str, order_items_table
         # All-time totals (same as Summary page)
         col1, col2, col3, col4, col5 = st.columns(5)
 
+        # Exact COUNT(*) here, not the cached ROW_COUNT metadata: this page should track ingestion as it lands
         alltime_orders_result = session.sql(f"SELECT COUNT(*) as cnt FROM AUTOMATED_INTELLIGENCE.{schema}.{orders_table}").collect()
         alltime_orders = alltime_orders_result[0]['CNT'] if alltime_orders_result else 0
 
@@ -2,7 +2,6 @@ import streamlit as st
 import time
 import random
 import traceback
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from shared import get_session, show_header
 
 show_header()
@@ -38,6 +37,11 @@ with col3:
     concurrency = st.number_input("Concurrency level", min_value=1, max_value=500, value=100, step=1,
                                  disabled=st.session_state.test_running)
 
+bind_parameters = st.checkbox(
+    "Bind customer_id as a parameter", value=True, disabled=st.session_state.test_running,
+    help="Send one statement text with a ? placeholder instead of a new SQL string per customer",
+)
+
 # Performance test button
 run_test = st.button("🚀 Run Performance Test", type="primary", disabled=st.session_state.test_running)
 
@@ -70,25 +74,46 @@ if st.session_state.test_running:
             GROUP BY c.customer_id
             """
             
-            def run_single_query(customer_id, query_template, use_interactive_wh=False):
-                try:
-                    actual_query = query_template.replace("{customer_id}", str(customer_id))
-                    
-                    if use_interactive_wh:
-                        session.sql("USE WAREHOUSE automated_intelligence_interactive_wh").collect()
-                    else:
-                        session.sql("USE WAREHOUSE automated_intelligence_wh").collect()
-                    
-                    start = time.time()
-                    results = session.sql(actual_query).collect()
-                    duration = (time.time() - start) * 1000
-                    
-                    # Removed warning - all customer IDs now guaranteed to have orders
+            def run_queries_async(customer_ids, query_template, use_interactive_wh=False, bind=True):
+                """
+                Keep up to `concurrency` queries in flight on the session with
+                collect_nowait() and poll each job until it is done. Returns each
+                query's latency in ms, from submission until it was seen finished.
+                """
+                # Async jobs run on the warehouse that was current when they were submitted
+                if use_interactive_wh:
+                    session.sql("USE WAREHOUSE automated_intelligence_interactive_wh").collect()
+                else:
+                    session.sql("USE WAREHOUSE automated_intelligence_wh").collect()
+                
+                pending = list(customer_ids)
+                in_flight = {}
+                durations = []
+                while pending or in_flight:
+                    while pending and len(in_flight) < concurrency:
+                        customer_id = pending.pop()
+                        if bind:
+                            actual_query = query_template.replace("{customer_id}", "?")
+                            params = [customer_id]
+                        else:
+                            actual_query = query_template.replace("{customer_id}", str(customer_id))
+                            params = None
+                        job = session.sql(actual_query, params=params).collect_nowait()
+                        in_flight[job] = (customer_id, time.time())
                     
-                    return duration
-                except Exception as e:
-                    print(f"Failed for customer_id {customer_id}: {e}")
-                    raise
+                    for job, (customer_id, submitted) in list(in_flight.items()):
+                        if not job.is_done():
+                            continue
+                        del in_flight[job]
+                        try:
+                            job.result()  # raises if the query failed
+                        except Exception as e:
+                            print(f"Failed for customer_id {customer_id}: {e}")
+                            raise
+                        durations.append((time.time() - submitted) * 1000)
+                    if in_flight:
+                        time.sleep(0.005)
+                return durations
             
             run_interactive = warehouse_option in ["Both - Interactive & Standard", "Interactive Only"]
             run_standard = warehouse_option in ["Both - Interactive & Standard", "Standard Only"]
@@ -110,31 +135,19 @@ if st.session_state.test_running:
             
             if run_interactive:
                 queries_used['interactive'] = interactive_query
-                interactive_results = []
                 customer_ids = random.choices(available_customer_ids, k=min(num_queries, len(available_customer_ids)))
                 
-                # Run queries concurrently using ThreadPoolExecutor
-                with ThreadPoolExecutor(max_workers=concurrency) as executor:
-                    futures = [executor.submit(run_single_query, cid, interactive_query, True) 
-                              for cid in customer_ids]
-                    
-                    for future in as_completed(futures):
-                        interactive_results.append(future.result())
+                # Submit asynchronously, up to `concurrency` in flight
+                interactive_results = run_queries_async(customer_ids, interactive_query, True, bind_parameters)
                 
                 results['Interactive Tables + Warehouse'] = interactive_results
             
             if run_standard:
                 queries_used['standard'] = standard_query
-                standard_results = []
                 customer_ids = random.choices(available_customer_ids, k=min(num_queries, len(available_customer_ids)))
                 
-                # Run queries concurrently using ThreadPoolExecutor
-                with ThreadPoolExecutor(max_workers=concurrency) as executor:
-                    futures = [executor.submit(run_single_query, cid, standard_query, False) 
-                              for cid in customer_ids]
-                    
-                    for future in as_completed(futures):
-                        standard_results.append(future.result())
+                # Submit asynchronously, up to `concurrency` in flight
+                standard_results = run_queries_async(customer_ids, standard_query, False, bind_parameters)
                 
                 results['Standard Tables + Warehouse'] = standard_results
             
@@ -142,7 +155,8 @@ if st.session_state.test_running:
                 'results': results,
                 'num_queries': num_queries,
                 'concurrency': concurrency,
-                'queries': queries_used
+                'queries': queries_used,
+                'bound': bind_parameters
             }
             
     except Exception as e:
@@ -211,6 +225,8 @@ if st.session_state.test_results is not None:
                       f"**Test Parameters:** {num_queries} queries | Concurrency: {concurrency}")
     
     with st.expander("🔍 View Queries Used in Test"):
+        if test_data.get('bound'):
+            st.caption("customer_id was sent as a bind parameter (? placeholder), so every query shares one statement text")
         if 'interactive' in queries_used:
             st.markdown("**Interactive Tables + Warehouse Query:**")
             st.code(queries_used['interactive'], language="sql")
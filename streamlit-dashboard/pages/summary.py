@@ -1,6 +1,6 @@
 import streamlit as st
 import plotly.express as px
-from shared import get_session, show_header, format_number
+from shared import get_session, get_row_counts, show_header, format_number
 
 show_header()
 st.subheader("📈 Summary")
@@ -13,23 +13,11 @@ def render_summary_dashboard(schema: str, orders_table: str, order_items_table:
     try:
         col1, col2, col3, col4, col5 = st.columns(5)
 
-        alltime_orders_query = f"""
-        SELECT COUNT(*) as cnt FROM AUTOMATED_INTELLIGENCE.{schema}.{orders_table}
-        """
-        alltime_orders_result = session.sql(alltime_orders_query).collect()
-        alltime_orders = alltime_orders_result[0]['CNT'] if alltime_orders_result else 0
-
-        alltime_items_query = f"""
-        SELECT COUNT(*) as cnt FROM AUTOMATED_INTELLIGENCE.{schema}.{order_items_table}
-        """
-        alltime_items_result = session.sql(alltime_items_query).collect()
-        alltime_items = alltime_items_result[0]['CNT'] if alltime_items_result else 0
-
-        alltime_customers_query = """
-        SELECT COUNT(*) as cnt FROM AUTOMATED_INTELLIGENCE.RAW.CUSTOMERS
-        """
-        alltime_customers_result = session.sql(alltime_customers_query).collect()
-        alltime_customers = alltime_customers_result[0]['CNT'] if alltime_customers_result else 0
+        # One metadata query (cached) instead of three COUNT(*) scans
+        row_counts = get_row_counts(((schema, orders_table), (schema, order_items_table), ("RAW", "CUSTOMERS")))
+        alltime_orders = row_counts[f"{schema}.{orders_table}"]
+        alltime_items = row_counts[f"{schema}.{order_items_table}"]
+        alltime_customers = row_counts["RAW.CUSTOMERS"]
 
         alltime_revenue_query = f"""
         SELECT ROUND(SUM(total_amount), 2) as total_revenue
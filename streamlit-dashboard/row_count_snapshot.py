@@ -0,0 +1 @@
+../pipeline/snapshot.py
\ No newline at end of file
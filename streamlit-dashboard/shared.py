@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+from row_count_snapshot import take_snapshot
 
 def format_number(num, include_decimals=True):
     """Format large numbers with K, M, B suffixes"""
@@ -39,6 +40,17 @@ def get_session():
         st.session_state.session = conn.session()
     return st.session_state.session
 
+@st.cache_data(ttl=30, show_spinner=False)
+def get_row_counts(tables):
+    """Row counts from table metadata for (schema, table) pairs, e.g. {"RAW.ORDERS": 1234}"""
+    session = get_session()
+    snapshot = take_snapshot(
+        lambda sql: session.sql(sql).collect(),
+        "AUTOMATED_INTELLIGENCE",
+        [(f"{schema}.{table}", schema, table) for schema, table in tables],
+    )
+    return {label: count or 0 for label, count in snapshot.rows()}
+
 def load_custom_css():
     """Load custom CSS file"""
     import os
@@ -0,0 +1 @@
+../pipeline/warehouses.py
\ No newline at end of file